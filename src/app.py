@@ -2,6 +2,7 @@
 Пример использования библиотеки
 """
 from src.library_sim import Book, Library, run_simulation
+from src.library_sim.cli import build_parser
 
 
 def example_basic_usage():
@@ -76,27 +77,21 @@ def start_simulation(steps: int = 20, seed: int | None = None):
     run_simulation(steps=steps, seed=seed)
     
 
-def app():
-    print("Выберите тип симуляции библиотеки")
-    print("="*60)
-    print("1. Базовый пример использования\n" \
-    "2. Пример симуляции\n" \
-    "3. Симуляция с входными данными\n")
-
-    type = input("Тип симуляции: ")
-
-    match type:
-        case "1":
-            example_basic_usage()
+def app(argv=None) -> int:
+    """
+    Запуск из командной строки: подкоманды src.library_sim.cli
+    и example basic|simulation для примеров использования
+    """
+    def add_examples(commands):
+        example = commands.add_parser('example', help="примеры использования")
+        example.add_argument('name', choices=list(EXAMPLES))
+        example.set_defaults(handler=lambda args: EXAMPLES[args.name]() or 0)
 
-        case "2":
-            example_simulation()
+    args = build_parser(add_examples).parse_args(argv)
+    return args.handler(args)
 
-        case "3":
-            print("Введите входные данные: ")
-            steps = int(input("Количество шагов симуляции: "))
-            print("\n")
-            seed = int(input("Сид: "))
-            print("\n")  
 
-            run_simulation(steps=steps, seed=seed)
\ No newline at end of file
+EXAMPLES = {
+    'basic': example_basic_usage,
+    'simulation': example_simulation,
+}
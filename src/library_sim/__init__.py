@@ -1,11 +1,40 @@
-from .book import Book, RegularBook, ReferenceBook, FictionBook
-from .my_collections import BookCollection, IndexDict
-from .library import Library
-from .simulation import run_simulation
-
-__all__ = [
-    'Book', 'RegularBook', 'ReferenceBook', 'FictionBook',
-    'BookCollection', 'IndexDict',
-    'Library',
-    'run_simulation'
-]
\ No newline at end of file
+"""
+Пакет библиотеки. Подмодули загружаются при первом обращении к имени,
+поэтому импорт пакета не тянет за собой симуляцию, SQLite и остальное
+"""
+import importlib
+
+# Имя -> подмодуль, в котором оно определено
+_EXPORTS = {
+    'Book': 'book', 'RegularBook': 'book', 'ReferenceBook': 'book', 'FictionBook': 'book',
+    'BookCollection': 'my_collections', 'IndexDict': 'my_collections',
+    'ScoredBookCollection': 'my_collections', 'TextIndex': 'ranking',
+    'DuplicateIndex': 'dedup',
+    'Bitmap': 'bitmap', 'Q': 'query',
+    'LoanHistory': 'history', 'PatronRegistry': 'patrons',
+    'StorageBackend': 'storage', 'MemoryStorage': 'storage', 'SQLiteStorage': 'storage',
+    'CowStorage': 'storage', 'TieredStorage': 'tiered',
+    'Library': 'library', 'Transaction': 'transactions', 'TransactionError': 'transactions',
+    'CatalogDigest': 'sync', 'CatalogDelta': 'sync',
+    'run_simulation': 'simulation', 'replay_simulation': 'simulation',
+    'EventHandler': 'events', 'register_event': 'events',
+    'SimulationTrace': 'trace',
+    'run_differential': 'differential', 'Canary': 'differential',
+    'CatalogArrays': 'analytics',
+    'LibraryServer': 'server',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,164 @@
+"""
+Векторная аналитика по каталогу на NumPy (необязательная зависимость:
+pip install library-simulation[analytics])
+"""
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - проверяется при создании CatalogArrays
+    np = None
+
+from .feed import ChangeEvent, ADDED, REMOVED, BORROWED, RETURNED
+from .my_collections import IndexDict
+
+GROUP_KEYS = ('genre', 'type', 'year', 'decade')
+VALUE_FIELDS = ('year', 'borrowed')
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("Для аналитики нужен numpy: pip install library-simulation[analytics]")
+
+
+class CatalogArrays:
+    """
+    Колонки каталога в массивах NumPy, индексированных номером слота
+    IndexDict: год, код жанра, код типа, признак выдачи.
+    Строятся один раз и поддерживаются по ленте изменений
+    """
+
+    def __init__(self, indexes: IndexDict, capacity: int = 1024):
+        _require_numpy()
+        self._indexes = indexes
+        self._size = 0  # Номер последнего занятого слота + 1
+        self.year = np.zeros(capacity, dtype=np.int32)
+        self.genre = np.full(capacity, -1, dtype=np.int32)
+        self.type = np.full(capacity, -1, dtype=np.int16)
+        self.borrowed = np.zeros(capacity, dtype=bool)
+        self.valid = np.zeros(capacity, dtype=bool)
+        self._codes: Dict[str, Dict[str, int]] = {'genre': {}, 'type': {}}
+        self._labels: Dict[str, List[str]] = {'genre': [], 'type': []}
+
+        for slot, book in indexes.iter_slots():
+            self._set(slot, book)
+        self._subscription = indexes.subscribe(self._apply, from_seq=indexes.feed.last_seq)
+
+    def close(self) -> None:
+        """Прекратить синхронизацию с каталогом"""
+        self._subscription.close()
+
+    def __len__(self) -> int:
+        return int(self.valid[:self._size].sum())
+
+    def _code(self, field: str, label: str) -> int:
+        codes = self._codes[field]
+        code = codes.get(label)
+        if code is None:
+            code = codes[label] = len(self._labels[field])
+            self._labels[field].append(label)
+        return code
+
+    def _reserve(self, slot: int) -> None:
+        capacity = len(self.valid)
+        if slot < capacity:
+            return
+        new_capacity = max(slot + 1, capacity * 2)
+        for name in ('year', 'genre', 'type', 'borrowed', 'valid'):
+            old = getattr(self, name)
+            fill = -1 if name in ('genre', 'type') else 0
+            new = np.full(new_capacity, fill, dtype=old.dtype)
+            new[:capacity] = old
+            setattr(self, name, new)
+
+    def _set(self, slot: int, book) -> None:
+        self._reserve(slot)
+        self.year[slot] = book.year
+        self.genre[slot] = self._code('genre', book.genre)
+        self.type[slot] = self._code('type', type(book).__name__)
+        self.borrowed[slot] = not book.is_available
+        self.valid[slot] = True
+        if slot >= self._size:
+            self._size = slot + 1
+
+    def _apply(self, events: List[ChangeEvent]) -> None:
+        """Применить пакет событий из ленты IndexDict"""
+        for event in events:
+            if event.kind == ADDED:
+                self._set(event.slot, event.book)
+            elif event.kind == REMOVED:
+                self.valid[event.slot] = False
+            elif event.kind in (BORROWED, RETURNED):
+                self.borrowed[event.slot] = event.kind == BORROWED
+            else:
+                self._set(event.slot, event.book)
+
+    def _mask(self) -> 'np.ndarray':
+        return self.valid[:self._size]
+
+    def _values(self, field: str) -> 'np.ndarray':
+        if field not in VALUE_FIELDS:
+            raise KeyError(f"Поле должно быть одним из {VALUE_FIELDS}")
+        return getattr(self, field)[:self._size][self._mask()]
+
+    def _groups(self, by: str) -> Tuple['np.ndarray', List]:
+        """Коды групп для каждой книги и подписи групп"""
+        if by in ('genre', 'type'):
+            codes = getattr(self, by)[:self._size][self._mask()]
+            return codes, self._labels[by]
+        if by in ('year', 'decade'):
+            years = self._values('year')
+            if by == 'decade':
+                years = years // 10 * 10
+            labels, codes = np.unique(years, return_inverse=True)
+            return codes, labels.tolist()
+        raise KeyError(f"Группировка должна быть одной из {GROUP_KEYS}")
+
+    def count_by(self, by: str) -> Dict:
+        """Количество книг в каждой группе"""
+        codes, labels = self._groups(by)
+        counts = np.bincount(codes, minlength=len(labels))
+        return {labels[i]: int(count) for i, count in enumerate(counts) if count}
+
+    def mean_by(self, by: str, field: str = 'borrowed') -> Dict:
+        """Среднее поля по группам (для borrowed - доля выданных книг)"""
+        codes, labels = self._groups(by)
+        values = self._values(field).astype(np.float64)
+        counts = np.bincount(codes, minlength=len(labels))
+        sums = np.bincount(codes, weights=values, minlength=len(labels))
+        return {labels[i]: float(sums[i] / counts[i]) for i in range(len(labels)) if counts[i]}
+
+    def histogram(self, field: str = 'year', bins: int = 10,
+                  by: Optional[str] = None) -> Tuple[object, 'np.ndarray']:
+        """
+        Гистограмма поля. Без by - (counts, edges), с by - словарь
+        группа -> counts при общих для всех групп границах edges
+        """
+        values = self._values(field)
+        edges = np.histogram_bin_edges(values, bins=bins)
+        if by is None:
+            counts, _ = np.histogram(values, bins=edges)
+            return counts, edges
+        codes, labels = self._groups(by)
+        result = {}
+        for code, label in enumerate(labels):
+            selected = values[codes == code]
+            if len(selected):
+                result[label], _ = np.histogram(selected, bins=edges)
+        return result, edges
+
+    def percentile(self, q, field: str = 'year', by: Optional[str] = None):
+        """Перцентили поля, при by - по группам"""
+        values = self._values(field)
+        if by is None:
+            return np.percentile(values, q)
+        codes, labels = self._groups(by)
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+        bounds = np.searchsorted(sorted_codes, np.arange(len(labels) + 1))
+        result = {}
+        for code, label in enumerate(labels):
+            group = values[order[bounds[code]:bounds[code + 1]]]
+            if len(group):
+                result[label] = np.percentile(group, q)
+        return result
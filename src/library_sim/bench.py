@@ -0,0 +1,172 @@
+"""
+Нагрузочные тесты горячих путей Library на синтетических каталогах.
+Результаты сохраняются в JSON и сравниваются с базовым запуском:
+
+    python -m src.library_sim.bench --sizes 10000 1000000 --output bench.json
+    python -m src.library_sim.bench --sizes 10000 --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from itertools import combinations
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .library import Library
+from .simulation import run_simulation
+from .synthetic import generate_books
+
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+SEARCH_FIELDS = ('author', 'year', 'genre')
+# Метрики, для которых меньшее значение лучше; остальные - операции в секунду
+LOWER_IS_BETTER = {'build_seconds', 'peak_memory_mb', 'import_construct_ms'}
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_STARTUP_SCRIPT = (
+    "import time; start = time.perf_counter(); "
+    "from src.library_sim import Library; Library(); "
+    "print((time.perf_counter() - start) * 1000)"
+)
+
+
+def _rate(operation: Callable, arguments: Iterable) -> float:
+    """Операций в секунду для последовательных вызовов operation"""
+    arguments = list(arguments)
+    start = time.perf_counter()
+    for args in arguments:
+        operation(*args)
+    elapsed = time.perf_counter() - start
+    return len(arguments) / elapsed if elapsed > 0 else float('inf')
+
+
+def bench_catalog(size: int, seed: int = 0, ops: int = 1000,
+                  simulation_steps: int = 200, memory: bool = True) -> Dict[str, float]:
+    """Замеры всех горячих путей на каталоге из size книг"""
+    rng = random.Random(seed)
+    results: Dict[str, float] = {}
+
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    library = Library(f"Бенчмарк {size}")
+    library.add_books(generate_books(size, seed))
+    results['build_seconds'] = time.perf_counter() - start
+    if memory:
+        results['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+
+    sample = [library.books[rng.randrange(len(library.books))] for _ in range(ops)]
+    extra = list(generate_books(ops, seed + 1, start=size))
+    keyword_ops = max(3, ops // 100)
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        results['add_book'] = _rate(library.add_book, ((book,) for book in extra))
+        results['remove_book'] = _rate(library.remove_book, ((book.isbn,) for book in extra))
+
+        for width in range(1, len(SEARCH_FIELDS) + 1):
+            for fields in combinations(SEARCH_FIELDS, width):
+                name = f"search_books[{'+'.join(fields)}]"
+                queries = [{field: getattr(book, field) for field in fields} for book in sample]
+                results[name] = _rate(lambda query: library.search_books(**query),
+                                      ((query,) for query in queries))
+
+        words = [book.title.split()[0].lower() for book in sample[:keyword_ops]]
+        results['search_by_keyword'] = _rate(library.search_by_keyword, ((word,) for word in words))
+
+        isbns = list(dict.fromkeys(book.isbn for book in sample))
+        results['borrow_book'] = _rate(library.borrow_book, ((isbn,) for isbn in isbns))
+        results['return_book'] = _rate(library.return_book, ((isbn,) for isbn in isbns))
+        results['print_status'] = _rate(library.print_status, (() for _ in range(max(1, ops // 10))))
+
+        start = time.perf_counter()
+        run_simulation(steps=simulation_steps, seed=seed, library=library)
+        results['run_simulation'] = simulation_steps / (time.perf_counter() - start)
+
+    return results
+
+
+def measure_startup(repeat: int = 5) -> float:
+    """Время импорта пакета и создания Library в новом процессе, мс (лучшее из repeat)"""
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', _STARTUP_SCRIPT], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return min(timings)
+
+
+def run_benchmarks(sizes: Iterable[int] = DEFAULT_SIZES, seed: int = 0, ops: int = 1000,
+                   simulation_steps: int = 200, memory: bool = True) -> Dict:
+    """Замеры для каждого размера каталога вместе с описанием окружения"""
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': seed,
+            'ops': ops,
+            'simulation_steps': simulation_steps,
+        },
+        'results': {'startup': {'import_construct_ms': measure_startup()}},
+    }
+    for size in sizes:
+        report['results'][str(size)] = bench_catalog(size, seed, ops, simulation_steps, memory)
+    return report
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float = 0.2) -> List[str]:
+    """Список регрессий относительно базового запуска (допуск - доля от базы)"""
+    regressions = []
+    for size, metrics in report['results'].items():
+        base_metrics = baseline.get('results', {}).get(size)
+        if not base_metrics:
+            continue
+        for name, value in metrics.items():
+            base = base_metrics.get(name)
+            if not base:
+                continue
+            if name in LOWER_IS_BETTER:
+                worse = value > base * (1 + tolerance)
+            else:
+                worse = value < base * (1 - tolerance)
+            if worse:
+                regressions.append(f"{size}: {name} {base:.4g} -> {value:.4g}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(description="Нагрузочные тесты библиотеки")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ops', type=int, default=1000, help="операций на замер")
+    parser.add_argument('--steps', type=int, default=200, help="шагов симуляции")
+    parser.add_argument('--no-memory', action='store_true', help="не замерять пиковую память")
+    parser.add_argument('--output', help="файл для сохранения результатов JSON")
+    parser.add_argument('--baseline', help="базовый JSON для сравнения")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sizes, args.seed, args.ops, args.steps, not args.no_memory)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for line in regressions:
+            print(f"РЕГРЕССИЯ {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Сжатое битовое множество номеров слотов (по мотивам roaring bitmap)
+"""
+from typing import Dict, Iterable, Iterator
+
+CHUNK_SHIFT = 16
+CHUNK_MASK = (1 << CHUNK_SHIFT) - 1
+
+
+if hasattr(int, 'bit_count'):
+    _popcount = int.bit_count
+else:
+    def _popcount(value: int) -> int:
+        """Количество единичных битов"""
+        return bin(value).count('1')
+
+
+class Bitmap:
+    """
+    Множество неотрицательных целых, разбитое на фрагменты по 65536 бит.
+    Каждый фрагмент - обычный int, пустые фрагменты не хранятся,
+    поэтому вставка и удаление не копируют всю маску
+    """
+
+    __slots__ = ('_chunks',)
+
+    def __init__(self, values: Iterable[int] = ()):
+        self._chunks: Dict[int, int] = {}
+        if values:
+            self.update(values)
+
+    @classmethod
+    def _from_chunks(cls, chunks: Dict[int, int]) -> 'Bitmap':
+        bitmap = cls()
+        bitmap._chunks = chunks
+        return bitmap
+
+    def update(self, values: Iterable[int]) -> None:
+        """Добавить несколько чисел (сборка масок выполняется один раз на фрагмент)"""
+        grouped: Dict[int, bytearray] = {}
+        for value in values:
+            key = value >> CHUNK_SHIFT
+            buffer = grouped.get(key)
+            if buffer is None:
+                buffer = grouped[key] = bytearray((CHUNK_MASK + 1) // 8)
+            low = value & CHUNK_MASK
+            buffer[low >> 3] |= 1 << (low & 7)
+        for key, buffer in grouped.items():
+            bits = int.from_bytes(buffer, 'little')
+            self._chunks[key] = self._chunks.get(key, 0) | bits
+
+    def add(self, value: int) -> None:
+        """Добавить число"""
+        key = value >> CHUNK_SHIFT
+        self._chunks[key] = self._chunks.get(key, 0) | (1 << (value & CHUNK_MASK))
+
+    def discard(self, value: int) -> None:
+        """Удалить число, если оно есть"""
+        key = value >> CHUNK_SHIFT
+        bits = self._chunks.get(key)
+        if bits is None:
+            return
+        bits &= ~(1 << (value & CHUNK_MASK))
+        if bits:
+            self._chunks[key] = bits
+        else:
+            del self._chunks[key]
+
+    def copy(self) -> 'Bitmap':
+        """Копия множества"""
+        return self._from_chunks(dict(self._chunks))
+
+    def __contains__(self, value: int) -> bool:
+        bits = self._chunks.get(value >> CHUNK_SHIFT, 0)
+        return bool(bits >> (value & CHUNK_MASK) & 1)
+
+    def __len__(self) -> int:
+        return sum(_popcount(bits) for bits in self._chunks.values())
+
+    def __bool__(self) -> bool:
+        return bool(self._chunks)
+
+    def __iter__(self) -> Iterator[int]:
+        """Числа в порядке возрастания"""
+        for key in sorted(self._chunks):
+            base = key << CHUNK_SHIFT
+            # Строка битов от младшего к старшему: поиск единиц выполняется в C
+            digits = bin(self._chunks[key])[:1:-1]
+            pos = digits.find('1')
+            while pos != -1:
+                yield base + pos
+                pos = digits.find('1', pos + 1)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Bitmap):
+            return NotImplemented
+        return self._chunks == other._chunks
+
+    def __and__(self, other: 'Bitmap') -> 'Bitmap':
+        small, large = (self, other) if len(self._chunks) <= len(other._chunks) else (other, self)
+        chunks = {}
+        for key, bits in small._chunks.items():
+            common = bits & large._chunks.get(key, 0)
+            if common:
+                chunks[key] = common
+        return self._from_chunks(chunks)
+
+    def __or__(self, other: 'Bitmap') -> 'Bitmap':
+        chunks = dict(self._chunks)
+        for key, bits in other._chunks.items():
+            chunks[key] = chunks.get(key, 0) | bits
+        return self._from_chunks(chunks)
+
+    def __sub__(self, other: 'Bitmap') -> 'Bitmap':
+        chunks = {}
+        for key, bits in self._chunks.items():
+            rest = bits & ~other._chunks.get(key, 0)
+            if rest:
+                chunks[key] = rest
+        return self._from_chunks(chunks)
+
+    def __repr__(self) -> str:
+        return f"Bitmap({len(self)} элементов, {len(self._chunks)} фрагм.)"
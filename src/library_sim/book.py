@@ -49,6 +49,12 @@ class Book(ABC):
             return True
         return False
     
+    def copy(self) -> 'Book':
+        """Независимая копия книги (без вызова __init__)"""
+        book = object.__new__(type(self))
+        book.__dict__.update(self.__dict__)
+        return book
+    
     @property
     def is_available(self) -> bool:
         """Проверка доступности книги - общее свойство"""
@@ -0,0 +1,327 @@
+"""
+Командная строка библиотеки без интерактивного ввода. Результаты
+печатаются в stdout в формате JSON, журнал симуляции - в stderr:
+
+    python -m src.library_sim.cli simulate --steps 1000 --seed 1 --runs 8 --parallel 4 --quiet
+    python -m src.library_sim.cli simulate --steps 1000 --seed 1 --trace run.trace --quiet
+    python -m src.library_sim.cli simulate --steps 100000 --seed 1 --patrons 1000000 --quiet
+    python -m src.library_sim.cli replay run.trace --quiet
+    python -m src.library_sim.cli save catalog.jsonl --synthetic 100000
+    python -m src.library_sim.cli query --catalog catalog.jsonl --author "Автор 7" --limit 5
+    python -m src.library_sim.cli batch ops.jsonl --catalog catalog.jsonl --save catalog.jsonl
+    python -m src.library_sim.cli stats --catalog catalog.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from typing import Callable, Dict, List, Optional
+
+from .library import Library
+from .ops import execute, find_books, parse_filters
+from .synthetic import generate_books
+
+
+def _print_json(payload) -> None:
+    print(json.dumps(payload, ensure_ascii=False))
+
+
+def _make_library(workload: str = 'seed', seed: Optional[int] = 0) -> Library:
+    """
+    Библиотека для команды: 'seed' - начальный набор книг,
+    'synthetic:N' - синтетический каталог из N книг, иначе путь к каталогу JSON Lines
+    """
+    if workload == 'seed':
+        library = Library()
+    elif workload.startswith('synthetic:'):
+        library = Library()
+        library.add_books(generate_books(int(workload.split(':', 1)[1]), seed))
+    else:
+        library = Library.from_catalog(workload)
+    library.verbose = False
+    return library
+
+
+def _open_library(args) -> Library:
+    return _make_library(args.catalog or 'seed')
+
+
+def _catalog_stats(library: Library) -> Dict:
+    total = len(library.storage)
+    available = library.storage.count_available()
+    types, genres = Counter(), Counter()
+    for book in library.storage:
+        types[type(book).__name__] += 1
+        genres[book.genre] += 1
+    return {
+        'name': library.name,
+        'total': total,
+        'available': available,
+        'borrowed': total - available,
+        'types': dict(types),
+        'genres': dict(genres.most_common()),
+        'indexes': library.indexes.get_index_names() if hasattr(library.indexes, 'get_index_names') else [],
+        'borrow_events': library.history.count('borrow'),
+    }
+
+
+def catalog_digest(library: Library) -> str:
+    """Отпечаток состояния каталога для сравнения результатов запусков"""
+    import hashlib
+    digest = hashlib.sha256()
+    for book in sorted(library.storage, key=lambda book: book.isbn):
+        digest.update(json.dumps(book.to_dict(), ensure_ascii=False, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _run_logged(quiet: bool, function, *args, **kwargs):
+    """Выполнить функцию, направив ее вывод в stderr (или никуда при quiet)"""
+    stream = open(os.devnull, 'w') if quiet else sys.stderr
+    try:
+        with redirect_stdout(stream):
+            return function(*args, **kwargs)
+    finally:
+        if quiet:
+            stream.close()
+
+
+def _run_report(library: Library, steps: int, seconds: float) -> Dict:
+    return {
+        'steps': steps,
+        'seconds': seconds,
+        'steps_per_second': steps / seconds if seconds > 0 else None,
+        'total': len(library.storage),
+        'available': library.storage.count_available(),
+        'digest': catalog_digest(library),
+    }
+
+
+def simulate_once(steps: int, seed: Optional[int], workload: str = 'seed',
+                  quiet: bool = False, trace_path: Optional[str] = None, patrons: int = 0,
+                  search_batch: int = 1) -> Dict:
+    """Один запуск симуляции; журнал идет в stderr (или никуда при quiet)"""
+    from .simulation import SEARCH_EVENTS, count_operations, run_simulation
+
+    library = _make_library(workload, seed)
+    library.verbose = not quiet
+    start = time.perf_counter()
+    trace = _run_logged(quiet, run_simulation, steps=steps, seed=seed, library=library,
+                        patrons=patrons, batch=dict.fromkeys(SEARCH_EVENTS, search_batch))
+    seconds = time.perf_counter() - start
+    if trace_path:
+        trace.save(trace_path)
+    report = {'seed': seed, **_run_report(library, steps, seconds)}
+    operations = count_operations(trace)
+    report['operations'] = operations
+    report['operations_per_second'] = operations / seconds if seconds > 0 else None
+    if patrons:
+        report['patrons'] = library.patrons.stats()
+    return report
+
+
+def _trace_path(template: Optional[str], seed: Optional[int], runs: int) -> Optional[str]:
+    if not template or runs == 1:
+        return template
+    return f"{template}.{seed}"
+
+
+def cmd_simulate(args) -> int:
+    seeds = [None if args.seed is None else args.seed + run for run in range(args.runs)]
+    jobs = [(args.steps, seed, args.workload, args.quiet, _trace_path(args.trace, seed, args.runs),
+             args.patrons, args.search_batch) for seed in seeds]
+    if args.parallel > 1 and args.runs > 1:
+        with ProcessPoolExecutor(max_workers=args.parallel) as pool:
+            futures = [pool.submit(simulate_once, *job) for job in jobs]
+            runs = [future.result() for future in futures]
+    else:
+        runs = [simulate_once(*job) for job in jobs]
+    _print_json({'runs': runs})
+    return 0
+
+
+def cmd_replay(args) -> int:
+    from .simulation import replay_simulation
+    from .trace import SimulationTrace
+
+    trace = SimulationTrace.load(args.trace)
+    library = _make_library(args.workload, trace.seed)
+    library.verbose = not args.quiet
+    start = time.perf_counter()
+    _run_logged(args.quiet, replay_simulation, trace, library)
+    report = {'trace': args.trace, 'seed': trace.seed,
+              **_run_report(library, len(trace), time.perf_counter() - start)}
+    _print_json(report)
+    if args.expect and report['digest'] != args.expect:
+        print(f"Состояние каталога отличается: {report['digest']} != {args.expect}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def cmd_load(args) -> int:
+    start = time.perf_counter()
+    library = _make_library(args.path)
+    _print_json({'path': args.path, 'books': len(library.storage),
+                 'seconds': time.perf_counter() - start})
+    return 0
+
+
+def cmd_save(args) -> int:
+    workload = f'synthetic:{args.synthetic}' if args.synthetic else (args.catalog or 'seed')
+    library = _make_library(workload, args.seed)
+    _print_json({'path': args.path, 'books': library.save_catalog(args.path)})
+    return 0
+
+
+def cmd_query(args) -> int:
+    filters = {name: value for name, value in (('author', args.author), ('year', args.year),
+                                               ('genre', args.genre), ('keyword', args.keyword),
+                                               ('limit', args.limit)) if value is not None}
+    for condition in args.where:
+        name, separator, value = condition.partition('=')
+        if not separator:
+            raise SystemExit(f"Условие должно иметь вид поле=значение: {condition}")
+        filters[name] = value
+    books = find_books(_open_library(args), **parse_filters(filters))
+    if args.jsonl:
+        for book in books:
+            _print_json(book.to_dict())
+    else:
+        _print_json({'count': len(books), 'books': [book.to_dict() for book in books]})
+    return 0
+
+
+def cmd_batch(args) -> int:
+    """Операции JSON Lines из файла или stdin; результаты - JSON Lines в stdout"""
+    library = _open_library(args)
+    source = sys.stdin if args.path in (None, '-') else open(args.path, encoding='utf-8')
+    failed = 0
+    write = sys.stdout.write
+    try:
+        for line in source:
+            if not line.strip():
+                continue
+            try:
+                result = execute(library, json.loads(line))
+            except ValueError as error:
+                result = {'ok': False, 'error': f"Некорректный JSON: {error}"}
+            failed += not result['ok']
+            write(json.dumps(result, ensure_ascii=False) + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    if args.save:
+        library.save_catalog(args.save)
+    return 1 if failed and args.strict else 0
+
+
+def cmd_bench(args) -> int:
+    from .bench import main as bench_main
+    return bench_main(args.bench_args)
+
+
+def cmd_check(args) -> int:
+    """Дифференциальная проверка: код возврата 1 при расхождениях с эталоном"""
+    from .differential import run_differential
+    library = _make_library(args.catalog or f'synthetic:{args.books}', args.seed)
+    report = run_differential(args.ops, args.seed, library, verify_every=args.verify_every,
+                              sample=args.sample)
+    _print_json(report.to_dict())
+    return 0 if report.ok else 1
+
+
+def cmd_stats(args) -> int:
+    _print_json(_catalog_stats(_open_library(args)))
+    return 0
+
+
+def build_parser(extend: Optional[Callable] = None) -> argparse.ArgumentParser:
+    """Разбор аргументов; extend(commands) может добавить свои подкоманды"""
+    parser = argparse.ArgumentParser(prog='library-sim', description="Библиотека: командная строка")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def with_catalog(command):
+        command.add_argument('--catalog', help="каталог JSON Lines (иначе начальный набор книг)")
+        return command
+
+    simulate = commands.add_parser('simulate', help="запуск симуляции")
+    simulate.add_argument('--steps', type=int, default=20)
+    simulate.add_argument('--seed', type=int, default=None)
+    simulate.add_argument('--workload', default='seed',
+                          help="seed, synthetic:N или путь к каталогу JSON Lines")
+    simulate.add_argument('--runs', type=int, default=1, help="число запусков (сиды seed, seed+1, ...)")
+    simulate.add_argument('--parallel', type=int, default=1, help="число процессов")
+    simulate.add_argument('--quiet', action='store_true', help="без журнала симуляции")
+    simulate.add_argument('--trace', help="сохранить запись событий (при нескольких запусках - PATH.seed)")
+    simulate.add_argument('--patrons', type=int, default=0,
+                          help="число читателей (добавляет выдачи и возвраты читателями)")
+    simulate.add_argument('--search-batch', type=int, default=1,
+                          help="поисков за одно событие поиска")
+    simulate.set_defaults(handler=cmd_simulate)
+
+    replay = commands.add_parser('replay', help="воспроизвести запись симуляции")
+    replay.add_argument('trace')
+    replay.add_argument('--workload', default='seed',
+                        help="исходный каталог: seed, synthetic:N или путь к каталогу JSON Lines")
+    replay.add_argument('--quiet', action='store_true', help="без журнала симуляции")
+    replay.add_argument('--expect', help="ожидаемый отпечаток каталога (код возврата 1 при отличии)")
+    replay.set_defaults(handler=cmd_replay)
+
+    load = commands.add_parser('load', help="загрузить и проверить каталог")
+    load.add_argument('path')
+    load.set_defaults(handler=cmd_load)
+
+    save = with_catalog(commands.add_parser('save', help="сохранить каталог"))
+    save.add_argument('path')
+    save.add_argument('--synthetic', type=int, help="сохранить синтетический каталог из N книг")
+    save.add_argument('--seed', type=int, default=0)
+    save.set_defaults(handler=cmd_save)
+
+    query = with_catalog(commands.add_parser('query', help="поиск книг"))
+    query.add_argument('--author')
+    query.add_argument('--year', type=int)
+    query.add_argument('--genre')
+    query.add_argument('--keyword')
+    query.add_argument('--limit', type=int)
+    query.add_argument('--where', action='append', default=[], metavar='ПОЛЕ=ЗНАЧЕНИЕ',
+                       help="дополнительное условие, например reference_type=словарь")
+    query.add_argument('--jsonl', action='store_true', help="по книге на строку")
+    query.set_defaults(handler=cmd_query)
+
+    batch = with_catalog(commands.add_parser('batch', help="операции JSON Lines из файла или stdin"))
+    batch.add_argument('path', nargs='?', help="файл операций, по умолчанию stdin")
+    batch.add_argument('--save', help="сохранить каталог после выполнения")
+    batch.add_argument('--strict', action='store_true', help="код возврата 1 при ошибках операций")
+    batch.set_defaults(handler=cmd_batch)
+
+    bench = commands.add_parser('bench', help="нагрузочные тесты (аргументы bench)")
+    bench.add_argument('bench_args', nargs=argparse.REMAINDER)
+    bench.set_defaults(handler=cmd_bench)
+
+    check = with_catalog(commands.add_parser('check', help="сравнение с эталонной моделью и проверка инвариантов"))
+    check.add_argument('--ops', type=int, default=100_000, help="число случайных операций")
+    check.add_argument('--seed', type=int, default=0)
+    check.add_argument('--books', type=int, default=1000, help="размер синтетического каталога")
+    check.add_argument('--verify-every', type=int, default=1000, help="проверка инвариантов каждые N операций")
+    check.add_argument('--sample', type=int, help="проверять инварианты на N случайных книгах")
+    check.set_defaults(handler=cmd_check)
+
+    stats = with_catalog(commands.add_parser('stats', help="статистика каталога"))
+    stats.set_defaults(handler=cmd_stats)
+
+    if extend is not None:
+        extend(commands)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа командной строки"""
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""
+Поиск дубликатов и почти дубликатов книг под разными ISBN
+(одно произведение в разных изданиях) по названию и автору.
+
+Текст книги нормализуется и разбивается на перекрывающиеся тройки
+символов. Подпись MinHash из ROWS * BANDS минимумов хэшей оценивает
+сходство Жаккара двух наборов троек; подпись режется на полосы, и книги
+с совпавшей полосой становятся кандидатами (LSH). Кандидаты отсеиваются
+по оценке сходства из подписей и проверяются точным сходством, поэтому
+попарного сравнения всего каталога нет: время почти линейно по числу
+книг, в памяти на книгу - только подпись
+"""
+import re
+from array import array
+from hashlib import shake_128
+from operator import eq
+from typing import TYPE_CHECKING, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from .feed import ChangeEvent, ADDED, REMOVED
+
+if TYPE_CHECKING:
+    from .book import Book
+    from .my_collections import IndexDict
+
+SHINGLE = 3
+BANDS = 10
+ROWS = 5
+THRESHOLD = 0.7
+MAX_CANDIDATES = 100  # Проверяемых кандидатов на книгу (защита от огромных корзин)
+MAX_CACHE = 200_000   # Запомненных хэшей троек
+SLACK = 0.15          # Запас оценки сходства по подписи перед точной проверкой
+
+_BRACKETS = re.compile(r'\([^)]*\)|\[[^\]]*\]')
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize(text: str) -> str:
+    """Нижний регистр, ё -> е, без пояснений в скобках и знаков препинания"""
+    text = _BRACKETS.sub(' ', str(text).lower().replace('ё', 'е'))
+    return _NON_WORD.sub(' ', text).strip()
+
+
+def _grams(text: str, prefix: str) -> List[str]:
+    text = f" {text} "
+    return [prefix + text[position:position + SHINGLE]
+            for position in range(max(1, len(text) - SHINGLE + 1))]
+
+
+def shingles(book: 'Book') -> FrozenSet[str]:
+    """Тройки символов нормализованных названия и автора (тройки автора помечены)"""
+    return frozenset(_grams(normalize(book.title), '') + _grams(normalize(book.author), '@'))
+
+
+def jaccard(first: FrozenSet[str], second: FrozenSet[str]) -> float:
+    """Сходство Жаккара двух наборов"""
+    if not first and not second:
+        return 1.0
+    common = len(first & second)
+    return common / (len(first) + len(second) - common)
+
+
+class DuplicateIndex:
+    """
+    Индекс LSH по подписям MinHash. Книги добавляются по номеру слота;
+    каждая новая книга сразу сравнивается с кандидатами, найденные
+    пары сходства не ниже threshold образуют кластеры. При переданном
+    indexes индекс строится по IndexDict и поддерживается по его ленте
+    изменений
+    """
+
+    def __init__(self, indexes: Optional['IndexDict'] = None, threshold: float = THRESHOLD,
+                 bands: int = BANDS, rows: int = ROWS):
+        if not 0 < threshold <= 1:
+            raise ValueError("Порог сходства должен быть в (0, 1]")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self._hashes: Dict[str, array] = {}  # Тройка -> ее bands * rows хэшей
+        # По полосе: ключ полосы -> слот (одна книга) или список слотов
+        self._buckets: List[Dict[int, Union[int, List[int]]]] = [{} for _ in range(bands)]
+        self._books: Dict[int, 'Book'] = {}
+        self._signatures: Dict[int, array] = {}  # Слот -> подпись и последним элементом число троек
+        self._similar: Dict[int, Set[int]] = {}  # Слот -> слоты почти дубликатов
+        self._subscription = None
+        if indexes is not None:
+            for slot, book in indexes.iter_slots():
+                self.add(slot, book)
+            self._subscription = indexes.subscribe(self._apply, from_seq=indexes.feed.last_seq)
+
+    def close(self) -> None:
+        """Прекратить синхронизацию с каталогом"""
+        if self._subscription is not None:
+            self._subscription.close()
+            self._subscription = None
+
+    def __len__(self) -> int:
+        return len(self._books)
+
+    def _apply(self, events: List[ChangeEvent]) -> None:
+        """Применить пакет событий из ленты IndexDict"""
+        for event in events:
+            if event.kind == ADDED:
+                self.add(event.slot, event.book)
+            elif event.kind == REMOVED:
+                self.remove(event.slot)
+
+    def _shingle_hashes(self, shingle: str) -> array:
+        hashes = self._hashes.get(shingle)
+        if hashes is None:
+            if len(self._hashes) >= MAX_CACHE:
+                self._hashes.clear()
+            hashes = array('I', shake_128(shingle.encode('utf-8')).digest(4 * self.bands * self.rows))
+            self._hashes[shingle] = hashes
+        return hashes
+
+    def signature(self, items: Iterable[str]) -> List[int]:
+        """Подпись MinHash набора троек: минимум каждого из bands * rows хэшей"""
+        return list(map(min, zip(*map(self._shingle_hashes, items))))
+
+    def _keys(self, signature: Sequence[int]) -> List[int]:
+        rows = self.rows
+        return [hash(tuple(signature[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+
+    def add(self, slot: int, book: 'Book') -> List[int]:
+        """Добавить книгу в слоте, вернуть слоты найденных почти дубликатов"""
+        items = shingles(book)
+        signature = self.signature(items)
+        candidates: Dict[int, None] = {}  # Упорядоченное множество
+        for buckets, key in zip(self._buckets, self._keys(signature)):
+            members = buckets.get(key)
+            if members is None:
+                buckets[key] = slot
+                continue
+            if isinstance(members, int):
+                buckets[key] = members = [members]
+            if len(candidates) < MAX_CANDIDATES:
+                candidates.update(dict.fromkeys(members[-MAX_CANDIDATES:]))
+            members.append(slot)
+        self._books[slot] = book
+        self._signatures[slot] = array('I', signature + [len(items)])
+
+        found = []
+        threshold = self.threshold
+        length = len(signature)
+        size = len(items)
+        for other in candidates:
+            if other == slot:
+                continue
+            known = self._signatures[other]
+            # Сходство не больше отношения меньшего набора к большему
+            if min(size, known[-1]) < threshold * max(size, known[-1]):
+                continue
+            if sum(map(eq, signature, known)) < (threshold - SLACK) * length:
+                continue
+            if jaccard(items, shingles(self._books[other])) >= threshold:
+                found.append(other)
+                self._similar.setdefault(slot, set()).add(other)
+                self._similar.setdefault(other, set()).add(slot)
+        return found
+
+    def remove(self, slot: int) -> None:
+        """Убрать книгу из индекса"""
+        signature = self._signatures.pop(slot, None)
+        if signature is None:
+            return
+        del self._books[slot]
+        for buckets, key in zip(self._buckets, self._keys(signature)):
+            members = buckets.get(key)
+            if members == slot:
+                del buckets[key]
+            elif isinstance(members, list) and slot in members:
+                members.remove(slot)
+                if len(members) == 1:
+                    buckets[key] = members[0]
+        for other in self._similar.pop(slot, ()):
+            neighbours = self._similar[other]
+            neighbours.discard(slot)
+            if not neighbours:
+                del self._similar[other]
+
+    def similar(self, slot: int) -> List['Book']:
+        """Почти дубликаты книги в слоте"""
+        return [self._books[other] for other in sorted(self._similar.get(slot, ()))]
+
+    def clusters(self) -> List[List['Book']]:
+        """
+        Группы книг, связанных цепочками почти дубликатов
+        (компоненты связности), от больших к меньшим
+        """
+        seen: Set[int] = set()
+        groups: List[List[int]] = []
+        for start in self._similar:
+            if start in seen:
+                continue
+            seen.add(start)
+            group = [start]
+            for slot in group:  # Обход в ширину, список растет по ходу
+                for other in self._similar[slot]:
+                    if other not in seen:
+                        seen.add(other)
+                        group.append(other)
+            groups.append(sorted(group))
+        groups.sort(key=lambda group: (-len(group), group[0]))
+        return [[self._books[slot] for slot in group] for group in groups]
+
+    def pairs(self) -> List[Tuple['Book', 'Book', float]]:
+        """Пары почти дубликатов со сходством"""
+        books = self._books
+        return [(books[slot], books[other], jaccard(shingles(books[slot]), shingles(books[other])))
+                for slot, others in sorted(self._similar.items())
+                for other in sorted(others) if slot < other]
+
+
+def find_duplicates(books: Iterable['Book'], threshold: float = THRESHOLD) -> List[List['Book']]:
+    """Кластеры почти дубликатов в произвольном наборе книг (индекс на время вызова)"""
+    index = DuplicateIndex(threshold=threshold)
+    for slot, book in enumerate(books):
+        index.add(slot, book)
+    return index.clusters()
@@ -0,0 +1,337 @@
+"""
+Дифференциальная проверка библиотеки: случайные операции выполняются
+и над Library с индексами, и над наивной эталонной моделью (словарь
+ISBN -> книга, поиск полным перебором), результаты сравниваются.
+
+Canary - выборочная проверка работающей библиотеки: для доли вызовов
+поиска результат сверяется с условием и со случайной выборкой каталога,
+периодически проверяются инварианты на случайной выборке
+(Library.verify(sample=...))
+"""
+import random
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional
+
+from .book import Book, ReferenceBook
+from .my_collections import field_key
+from .query import Q
+from .synthetic import GENRES, generate_books
+
+if TYPE_CHECKING:
+    from .library import Library
+
+SEARCH_METHODS = ('search_books', 'find', 'search_by_keyword')
+MAX_MISMATCHES = 20  # Запоминаемых расхождений
+KEYWORDS = ["война", "мир", "мастер", "город", "1999", "автор 1", "роман"]
+
+
+def _copy(book: Book) -> Book:
+    return Book.from_dict(book.to_dict())
+
+
+def _isbns(books: Iterable[Book]) -> List[str]:
+    return sorted(book.isbn for book in books)
+
+
+class ReferenceModel:
+    """
+    Эталон библиотеки без индексов: словарь ISBN -> копия книги,
+    каждая операция - прямой перебор. Медленно, но очевидно верно
+    """
+
+    def __init__(self, books: Iterable[Book] = ()):
+        self.books: Dict[str, Book] = {book.isbn: _copy(book) for book in books}
+
+    def __len__(self) -> int:
+        return len(self.books)
+
+    def add_book(self, book: Book) -> bool:
+        if book.isbn in self.books:
+            return False
+        self.books[book.isbn] = _copy(book)
+        return True
+
+    def remove_book(self, isbn: str) -> bool:
+        return self.books.pop(isbn, None) is not None
+
+    def _can_borrow(self, isbn: str) -> bool:
+        book = self.books.get(isbn)
+        if book is None or not book.is_available:
+            return False
+        return not (isinstance(book, ReferenceBook) and book.is_for_library_use_only())
+
+    def borrow_book(self, isbn: str) -> bool:
+        return self._can_borrow(isbn) and self.books[isbn].borrow()
+
+    def return_book(self, isbn: str) -> bool:
+        book = self.books.get(isbn)
+        return book is not None and book.return_book()
+
+    def borrow_many(self, isbns: List[str]) -> bool:
+        if len(set(isbns)) != len(isbns) or not all(map(self._can_borrow, isbns)):
+            return False
+        for isbn in isbns:
+            self.books[isbn].borrow()
+        return True
+
+    def return_many(self, isbns: List[str]) -> bool:
+        if len(set(isbns)) != len(isbns) or not all(
+                isbn in self.books and not self.books[isbn].is_available for isbn in isbns):
+            return False
+        for isbn in isbns:
+            self.books[isbn].return_book()
+        return True
+
+    def search_books(self, **predicates: Any) -> List[Book]:
+        predicates = {field: value for field, value in predicates.items() if value is not None}
+        if not predicates:
+            return []
+        keys = [(field_key(field), value) for field, value in predicates.items()]
+        return [book for book in self.books.values() if all(key(book) == value for key, value in keys)]
+
+    def find(self, query: Q) -> List[Book]:
+        return [book for book in self.books.values() if query.matches(book)]
+
+    def search_by_keyword(self, keyword: str) -> List[Book]:
+        return [book for book in self.books.values() if keyword in book]
+
+    def count_available(self) -> int:
+        return sum(1 for book in self.books.values() if book.is_available)
+
+
+class DifferentialReport:
+    """Итог дифференциального прогона"""
+
+    def __init__(self):
+        self.operations = 0
+        self.mismatches: List[str] = []  # Первые MAX_MISMATCHES расхождений
+        self.mismatch_count = 0
+        self.problems: List[str] = []    # Нарушения инвариантов из Library.verify
+        self.seconds = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.mismatch_count == 0 and not self.problems
+
+    def mismatch(self, message: str) -> None:
+        self.mismatch_count += 1
+        if len(self.mismatches) < MAX_MISMATCHES:
+            self.mismatches.append(message)
+
+    def to_dict(self) -> Dict:
+        return {
+            'ok': self.ok,
+            'operations': self.operations,
+            'mismatches': self.mismatch_count,
+            'examples': self.mismatches,
+            'problems': self.problems[:MAX_MISMATCHES],
+            'seconds': round(self.seconds, 3),
+            'operations_per_second': round(self.operations / self.seconds) if self.seconds else 0,
+        }
+
+
+def _random_query(rng: random.Random, year: int) -> Q:
+    query = Q(genre=rng.choice(GENRES))
+    if rng.random() < 0.5:
+        query = query & Q(available=rng.random() < 0.5)
+    if rng.random() < 0.3:
+        query = query | Q(year=year)
+    if rng.random() < 0.2:
+        query = query & ~Q(type="FictionBook")
+    return query
+
+
+def run_differential(operations: int = 10_000, seed: Optional[int] = 0,
+                     library: Optional['Library'] = None, books: int = 200,
+                     verify_every: int = 1000, sample: Optional[int] = None) -> DifferentialReport:
+    """
+    operations случайных операций над library (по умолчанию - новая
+    библиотека с books синтетическими книгами) и эталонной моделью.
+    Каждые verify_every операций проверяются инварианты library:
+    полностью или на выборке sample (быстрый режим для долгих прогонов)
+    """
+    from .library import Library
+    from .storage import MemoryStorage
+
+    rng = random.Random(seed)
+    if library is None:
+        library = Library(storage=MemoryStorage(), populate=False)
+        library.add_books(generate_books(books, seed=seed))
+    library.verbose = False
+    model = ReferenceModel(library.storage)
+    report = DifferentialReport()
+    next_number = 10 ** 9  # Новые ISBN не пересекаются с синтетическим каталогом
+    known = list(model.books)  # ISBN для выбора, включая удаленные
+    started = time.perf_counter()
+
+    def pick() -> str:
+        return known[rng.randrange(len(known))] if known else "000"
+
+    size = max(len(model), 1)  # Каталог держится около исходного размера
+    for step in range(1, operations + 1):
+        if len(known) > 2 * len(model) + 100:
+            known = list(model.books)
+        roll = rng.random()
+        if roll < 0.1 and len(model) < size * 1.2:
+            book = next(generate_books(1, seed=rng.randrange(1 << 30), start=next_number))
+            next_number += 1
+            if rng.random() < 0.1 and model.books:
+                book.isbn = pick()  # Повторный ISBN должен быть отклонен
+            else:
+                known.append(book.isbn)
+            name, args = 'add_book', (book,)
+        elif roll < 0.17:
+            name, args = 'remove_book', (pick(),)
+        elif roll < 0.37:
+            name, args = 'borrow_book', (pick(),)
+        elif roll < 0.52:
+            name, args = 'return_book', (pick(),)
+        elif roll < 0.57:
+            name, args = 'borrow_many', ([pick() for _ in range(rng.randint(1, 4))],)
+        elif roll < 0.62:
+            name, args = 'return_many', ([pick() for _ in range(rng.randint(1, 4))],)
+        elif roll < 0.8:
+            sample_book = model.books.get(pick())
+            predicates = {
+                'author': sample_book.author if sample_book is not None and rng.random() < 0.6 else None,
+                'genre': rng.choice(GENRES) if rng.random() < 0.5 else None,
+                'year': rng.randint(1800, 2024) if rng.random() < 0.2 else None,
+            }
+            if rng.random() < 0.3:
+                predicates['available'] = rng.random() < 0.5
+            mine, theirs = library.search_books(**predicates), model.search_books(**predicates)
+            name, args = 'search_books', (predicates,)
+        elif roll < 0.9:
+            query = _random_query(rng, rng.randint(1800, 2024))
+            mine, theirs = library.find(query), model.find(query)
+            name, args = 'find', (query,)
+        elif roll < 0.97:
+            keyword = rng.choice(KEYWORDS)
+            mine, theirs = library.search_by_keyword(keyword), model.search_by_keyword(keyword)
+            name, args = 'search_by_keyword', (keyword,)
+        else:
+            mine, theirs = library.storage.count_available(), model.count_available()
+            name, args = 'count_available', ()
+
+        if name in SEARCH_METHODS:
+            mine, theirs = _isbns(mine), _isbns(theirs)
+        elif name != 'count_available':
+            mine, theirs = getattr(library, name)(*args), getattr(model, name)(*args)
+        if mine != theirs:
+            report.mismatch(f"шаг {step}: {name}{args!r}: библиотека {mine!r}, эталон {theirs!r}")
+        if len(library.storage) != len(model):
+            report.mismatch(f"шаг {step}: после {name} книг {len(library.storage)}, в эталоне {len(model)}")
+            break
+        report.operations = step
+
+        if verify_every and step % verify_every == 0:
+            report.problems.extend(library.verify(sample, seed=step))
+            if report.problems:
+                break
+
+    if not report.problems:
+        report.problems = library.verify()
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+class Canary:
+    """
+    Выборочная проверка библиотеки в работе. Для доли rate вызовов
+    search_books, find и search_by_keyword каждая найденная книга
+    проверяется по условию поиска, а из sample случайных книг каталога
+    подходящие должны быть найдены: проверка стоит O(результата + sample),
+    а не O(каталога). Раз в verify_every проверенных вызовов инварианты
+    проверяются на sample случайных книгах. Расхождения копятся
+    в mismatches и problems, результаты вызовов не меняются
+    """
+
+    def __init__(self, library: 'Library', rate: float = 0.01, sample: int = 100,
+                 verify_every: int = 100, seed: Optional[int] = None):
+        if not 0 <= rate <= 1:
+            raise ValueError("Доля проверяемых вызовов должна быть в [0, 1]")
+        self.library = library
+        self.rate = rate
+        self.sample = sample
+        self.verify_every = verify_every
+        self.checked = 0
+        self.mismatches: List[str] = []
+        self.problems: List[str] = []
+        self._rng = random.Random(seed)
+        self._installed: Dict[str, tuple] = {}  # Имя метода -> (обертка, прежний атрибут)
+
+    @staticmethod
+    def _predicate(name: str, args: tuple, kwargs: Dict) -> Callable[[Book], bool]:
+        """Условие, которому удовлетворяют книги результата вызова"""
+        if name == 'find':
+            query = args[0] if args else kwargs['query']
+            return query.matches
+        if name == 'search_by_keyword':
+            keyword = args[0] if args else kwargs['keyword']
+            return lambda book: keyword in book
+        predicates = dict(zip(('author', 'year', 'genre'), args), **kwargs)
+        keys = [(field_key(field), value) for field, value in predicates.items() if value is not None]
+        if not keys:
+            return lambda book: False
+        return lambda book: all(key(book) == value for key, value in keys)
+
+    def _check(self, name: str, args: tuple, kwargs: Dict, result) -> None:
+        """Сверить результат с условием и со случайной выборкой каталога"""
+        matches = self._predicate(name, args, kwargs)
+        found = {book.isbn for book in result}
+        extra = sum(1 for book in result if not matches(book)) + len(result) - len(found)
+        storage = self.library.storage
+        missed = 0
+        if len(storage):
+            for _ in range(self.sample):
+                book = storage.random_book(self._rng)
+                if book.isbn not in found and matches(book):
+                    missed += 1
+        if (extra or missed) and len(self.mismatches) < MAX_MISMATCHES:
+            self.mismatches.append(f"{name}{args!r}{kwargs!r}: найдено {len(result)}, "
+                                   f"лишних {extra}, пропущено из выборки {missed}")
+
+    def _wrap(self, name: str, method: Callable) -> Callable:
+        def checked(*args, **kwargs):
+            result = method(*args, **kwargs)
+            if self._installed.get(name, (None,))[0] is checked and self._rng.random() < self.rate:
+                self.checked += 1
+                self._check(name, args, kwargs, result)
+                if self.verify_every and self.checked % self.verify_every == 0:
+                    self.problems.extend(self.library.verify(self.sample, seed=self._rng.randrange(1 << 30)))
+                    del self.problems[MAX_MISMATCHES:]
+            return result
+        checked.__name__ = name
+        return checked
+
+    @property
+    def ok(self) -> bool:
+        return not self.mismatches and not self.problems
+
+    def enable(self) -> 'Canary':
+        """Обернуть методы поиска экземпляра библиотеки (поверх уже установленных оберток)"""
+        for name in SEARCH_METHODS:
+            previous = self.library.__dict__.get(name)
+            wrapper = self._wrap(name, getattr(self.library, name))
+            self._installed[name] = (wrapper, previous)
+            setattr(self.library, name, wrapper)
+        return self
+
+    def disable(self) -> None:
+        """
+        Снять проверку: вместо своих оберток восстанавливается то, что было
+        до enable. Обертка, поверх которой установлена чужая (например,
+        замеры), остается в цепочке, но больше ничего не проверяет
+        """
+        for name, (wrapper, previous) in self._installed.items():
+            if self.library.__dict__.get(name) is not wrapper:
+                continue
+            if previous is None:
+                del self.library.__dict__[name]
+            else:
+                setattr(self.library, name, previous)
+        self._installed = {}
+
+    def stats(self) -> Dict:
+        return {'checked': self.checked, 'mismatches': len(self.mismatches),
+                'problems': len(self.problems), 'ok': self.ok}
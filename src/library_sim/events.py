@@ -0,0 +1,157 @@
+"""
+События симуляции: обработчики с весами, их реестр и таблица
+для выбора события с весами за O(1) (метод псевдонимов).
+
+Обработчик разделяет событие на выбор аргументов генератором запуска
+(аргументы записываются в SimulationTrace) и выполнение над библиотекой.
+Новое событие регистрируется в реестре и попадает в симуляцию без
+изменения основного цикла
+"""
+import random
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    from .library import Library
+
+
+class RunState:
+    """Изменяемое состояние одного запуска при генерации событий"""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.data: Dict[str, Any] = {}   # Состояние обработчиков на время запуска
+        self.batch: Dict[str, int] = {}  # Имя события -> размер пакета на время запуска
+
+
+class EventHandler(ABC):
+    """
+    Тип события симуляции. choose выбирает аргументы только через
+    state.rng (иначе запуск не воспроизводится по seed), apply выполняет
+    событие по записанным аргументам. Событие с batch > 1 выполняет
+    за шаг несколько однотипных операций
+    """
+    name = ""
+    weight = 1.0
+    requires_patrons = False  # Участвует только при популяции читателей
+    batch = 1
+
+    def choose(self, state: RunState, library: 'Library') -> tuple:
+        """Аргументы события"""
+        return ()
+
+    @abstractmethod
+    def apply(self, library: 'Library', *args) -> None:
+        """Выполнить событие"""
+
+    def operations(self, args: tuple) -> int:
+        """Число операций над библиотекой в событии с аргументами args"""
+        return 1
+
+
+class FunctionEvent(EventHandler):
+    """Событие из функций выбора и выполнения"""
+
+    def __init__(self, name: str, apply: Callable[..., None],
+                 choose: Optional[Callable[[RunState, 'Library'], tuple]] = None,
+                 weight: float = 1.0, requires_patrons: bool = False):
+        self.name = name
+        self.weight = weight
+        self.requires_patrons = requires_patrons
+        self._apply = apply
+        self._choose = choose
+
+    def choose(self, state: RunState, library: 'Library') -> tuple:
+        return self._choose(state, library) if self._choose is not None else ()
+
+    def apply(self, library: 'Library', *args) -> None:
+        self._apply(library, *args)
+
+
+# Имя события -> обработчик
+EVENT_HANDLERS: Dict[str, EventHandler] = {}
+
+
+def register_event(handler: EventHandler, replace: bool = False) -> EventHandler:
+    """Зарегистрировать обработчик события"""
+    if not handler.name:
+        raise ValueError("У события должно быть имя")
+    if handler.name in EVENT_HANDLERS and not replace:
+        raise ValueError(f"Событие '{handler.name}' уже зарегистрировано")
+    if handler.weight < 0:
+        raise ValueError("Вес события не может быть отрицательным")
+    EVENT_HANDLERS[handler.name] = handler
+    return handler
+
+
+def unregister_event(name: str) -> Optional[EventHandler]:
+    """Убрать событие из реестра"""
+    return EVENT_HANDLERS.pop(name, None)
+
+
+def simulation_event(name: str, choose: Optional[Callable[[RunState, 'Library'], tuple]] = None,
+                     weight: float = 1.0, requires_patrons: bool = False):
+    """Декоратор регистрации функции выполнения как события name"""
+    def register(apply):
+        register_event(FunctionEvent(name, apply, choose, weight, requires_patrons))
+        return apply
+    return register
+
+
+def handler_for(name: str) -> EventHandler:
+    """Обработчик события по имени (для воспроизведения записи)"""
+    handler = EVENT_HANDLERS.get(name)
+    if handler is None:
+        raise ValueError(f"Событие '{name}' не зарегистрировано")
+    return handler
+
+
+class AliasTable:
+    """
+    Выбор индекса с вероятностью, пропорциональной весу, за O(1):
+    таблица из n ячеек, в каждой - собственный индекс с порогом и
+    псевдоним (метод Уокера - Воуза). Построение O(n)
+    """
+
+    def __init__(self, weights: Sequence[float]):
+        count = len(weights)
+        total = float(sum(weights))
+        if count == 0 or total <= 0:
+            raise ValueError("Нужен хотя бы один положительный вес")
+        scaled = [weight * count / total for weight in weights]
+        self.threshold: List[float] = [1.0] * count
+        self.alias: List[int] = list(range(count))
+        small = [index for index, value in enumerate(scaled) if value < 1.0]
+        large = [index for index, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            low, high = small.pop(), large.pop()
+            self.threshold[low] = scaled[low]
+            self.alias[low] = high
+            scaled[high] -= 1.0 - scaled[low]
+            (small if scaled[high] < 1.0 else large).append(high)
+        # Оставшиеся ячейки (с погрешностью округления) выбирают себя
+
+    def __len__(self) -> int:
+        return len(self.threshold)
+
+    def sample(self, rng: random.Random) -> int:
+        """Случайный индекс (одно обращение к генератору)"""
+        position = rng.random() * len(self.threshold)
+        index = int(position)
+        return index if position - index < self.threshold[index] else self.alias[index]
+
+
+class EventTable:
+    """Предвычисленная таблица выбора обработчиков событий с весами"""
+
+    def __init__(self, handlers: Iterable[EventHandler],
+                 weights: Optional[Dict[str, float]] = None):
+        weights = weights or {}
+        self.handlers = [handler for handler in handlers
+                         if weights.get(handler.name, handler.weight) > 0]
+        self._table = AliasTable([weights.get(handler.name, handler.weight)
+                                  for handler in self.handlers])
+
+    def sample(self, rng: random.Random) -> EventHandler:
+        """Случайный обработчик с учетом весов"""
+        return self.handlers[self._table.sample(rng)]
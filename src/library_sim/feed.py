@@ -0,0 +1,162 @@
+"""
+Лента изменений каталога: типизированные события с порядковыми номерами,
+подписки с пакетной доставкой и возобновлением с номера
+"""
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, List, NamedTuple, Optional
+
+ADDED = 'added'
+REMOVED = 'removed'
+BORROWED = 'borrowed'
+RETURNED = 'returned'
+UPDATED = 'updated'
+
+
+class ChangeEvent(NamedTuple):
+    """Событие изменения каталога"""
+    seq: int      # Монотонно возрастающий номер
+    kind: str     # added, removed, borrowed, returned, updated
+    isbn: str
+    book: object  # Книга (текущий объект, а не снимок)
+    slot: int = -1  # Номер слота книги в IndexDict
+
+
+class Subscription:
+    """Подписка на ленту; события копятся до batch_size и отдаются пакетом"""
+
+    def __init__(self, feed: 'ChangeFeed', callback: Callable[[List[ChangeEvent]], None],
+                 batch_size: int):
+        self._feed = feed
+        self.callback = callback
+        self.batch_size = batch_size
+        self.pending: List[ChangeEvent] = []
+        self.last_seq = 0
+
+    def push(self, event: ChangeEvent) -> None:
+        """Принять событие"""
+        self.pending.append(event)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Доставить накопленные события"""
+        if self.pending:
+            batch, self.pending = self.pending, []
+            self.last_seq = batch[-1].seq
+            self.callback(batch)
+
+    def close(self) -> None:
+        """Отписаться (накопленные события доставляются)"""
+        self.flush()
+        self._feed.unsubscribe(self)
+
+
+class ChangeFeed:
+    """
+    Лента изменений. Последние retention событий хранятся для
+    подписчиков, которые возобновляют чтение с известного номера
+    """
+
+    def __init__(self, retention: int = 100_000):
+        self._events: deque = deque(maxlen=retention)
+        self._subscriptions: List[Subscription] = []
+        self._seq = 0
+
+    @property
+    def last_seq(self) -> int:
+        """Номер последнего события (0, если событий не было)"""
+        return self._seq
+
+    def publish(self, kind: str, book, slot: int = -1) -> ChangeEvent:
+        """Опубликовать событие"""
+        self._seq += 1
+        event = ChangeEvent(self._seq, kind, book.isbn, book, slot)
+        self._events.append(event)
+        for subscription in self._subscriptions:
+            subscription.push(event)
+        return event
+
+    def events_since(self, seq: int) -> List[ChangeEvent]:
+        """Хранимые события с номером больше seq"""
+        if self._events and seq + 1 < self._events[0].seq:
+            raise ValueError(f"События после {seq} уже не хранятся, "
+                             f"самое раннее доступное - {self._events[0].seq}")
+        if seq >= self._seq:
+            return []
+        skip = max(0, seq + 1 - self._events[0].seq) if self._events else 0
+        return [self._events[i] for i in range(skip, len(self._events))]
+
+    def subscribe(self, callback: Callable[[List[ChangeEvent]], None],
+                  from_seq: Optional[int] = None, batch_size: int = 1) -> Subscription:
+        """
+        Подписаться на события. callback получает список событий.
+        from_seq - продолжить после этого номера (хранимые события
+        доставляются сразу), по умолчанию только новые события
+        """
+        subscription = Subscription(self, callback, batch_size)
+        if from_seq is not None:
+            for event in self.events_since(from_seq):
+                subscription.push(event)
+            subscription.flush()
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Отменить подписку"""
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    def flush(self) -> None:
+        """Доставить неполные пакеты всем подписчикам"""
+        for subscription in self._subscriptions:
+            subscription.flush()
+
+    async def stream(self, from_seq: Optional[int] = None, batch_size: int = 1,
+                     max_pending: int = 1024) -> AsyncIterator[List[ChangeEvent]]:
+        """
+        Асинхронный итератор пакетов событий. События публикуются
+        в потоке цикла событий, поэтому используется put_nowait.
+        В очереди не больше max_pending пакетов: при переполнении новые
+        пакеты отбрасываются, и после разбора очереди чтение возобновляется
+        с последнего отданного номера по хранимым событиям (ValueError,
+        если они уже вытеснены из ленты)
+        """
+        import asyncio
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        overflowed = False
+        last = self._seq if from_seq is None else from_seq
+
+        def deliver(batch: List[ChangeEvent]) -> None:
+            nonlocal overflowed
+            if overflowed:
+                return
+            try:
+                queue.put_nowait(batch)
+            except asyncio.QueueFull:
+                overflowed = True
+
+        subscription = self.subscribe(deliver, from_seq, batch_size)
+        try:
+            while True:
+                if overflowed and queue.empty():
+                    missed = self.events_since(last)
+                    overflowed = False
+                    for start in range(0, len(missed), batch_size):
+                        batch = missed[start:start + batch_size]
+                        last = batch[-1].seq
+                        yield batch
+                    continue
+                batch = [event for event in await queue.get() if event.seq > last]
+                if batch:
+                    last = batch[-1].seq
+                    yield batch
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self) -> Dict[str, int]:
+        """Состояние ленты"""
+        return {
+            'last_seq': self._seq,
+            'retained': len(self._events),
+            'subscriptions': len(self._subscriptions),
+        }
@@ -0,0 +1,266 @@
+"""
+Журнал выдач: колоночное хранение событий и агрегаты по часам и дням
+"""
+import os
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+EVENT_BORROW = 0
+EVENT_RETURN = 1
+EVENT_CODES = {'borrow': EVENT_BORROW, 'return': EVENT_RETURN}
+EVENT_NAMES = {code: name for name, code in EVENT_CODES.items()}
+
+HOUR = 3600
+DAY = 86400
+HOURS_PER_DAY = DAY // HOUR
+
+
+class HistoryChunk:
+    """
+    Фрагмент журнала фиксированного размера.
+    Каждая колонка хранится в отдельном массиве
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.book_ids = array('I')
+        self.events = array('B')
+        self.timestamps = array('d')
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def is_full(self) -> bool:
+        """Заполнен ли фрагмент"""
+        return len(self.events) >= self.capacity
+
+    def append(self, book_id: int, event: int, timestamp: float) -> None:
+        """Добавить событие в конец фрагмента"""
+        self.book_ids.append(book_id)
+        self.events.append(event)
+        self.timestamps.append(timestamp)
+
+    def __iter__(self) -> Iterator[Tuple[int, int, float]]:
+        return zip(self.book_ids, self.events, self.timestamps)
+
+    def dump(self, path: str) -> None:
+        """Сохранить фрагмент на диск"""
+        with open(path, 'wb') as f:
+            array('Q', [len(self)]).tofile(f)
+            self.book_ids.tofile(f)
+            self.events.tofile(f)
+            self.timestamps.tofile(f)
+
+    @classmethod
+    def load(cls, path: str) -> 'HistoryChunk':
+        """Загрузить фрагмент с диска"""
+        with open(path, 'rb') as f:
+            size = array('Q')
+            size.fromfile(f, 1)
+            count = size[0]
+            chunk = cls(count)
+            chunk.book_ids.fromfile(f, count)
+            chunk.events.fromfile(f, count)
+            chunk.timestamps.fromfile(f, count)
+        return chunk
+
+
+class LoanHistory:
+    """
+    Журнал выдач и возвратов только на добавление.
+    Сырые события лежат во фрагментах, запросы по интервалам
+    считаются по агрегатам за час и за день
+    """
+
+    def __init__(self, chunk_size: int = 65536, max_chunks_in_memory: int = 16,
+                 spill_dir: Optional[str] = None):
+        self.chunk_size = chunk_size
+        self.max_chunks_in_memory = max_chunks_in_memory
+        self.spill_dir = spill_dir
+        self._chunks: List[HistoryChunk] = [HistoryChunk(chunk_size)]
+        self._spilled: List[str] = []
+        self._dropped = 0
+        self._total = 0
+        self._isbn_ids: Dict[str, int] = {}
+        self._isbns: List[str] = []
+        # Номер часа/дня -> Counter[(событие, жанр)]
+        self._hourly: Dict[int, Counter] = {}
+        self._daily: Dict[int, Counter] = {}
+
+    def __len__(self) -> int:
+        """Количество записанных событий"""
+        return self._total
+
+    def __repr__(self) -> str:
+        return f"LoanHistory({self._total} событий, {len(self._chunks)} фрагм. в памяти)"
+
+    def _book_id(self, isbn: str) -> int:
+        book_id = self._isbn_ids.get(isbn)
+        if book_id is None:
+            book_id = len(self._isbns)
+            self._isbn_ids[isbn] = book_id
+            self._isbns.append(isbn)
+        return book_id
+
+    def record(self, isbn: str, event: str, timestamp: float, genre: str = '') -> None:
+        """Записать событие выдачи ('borrow') или возврата ('return')"""
+        if event not in EVENT_CODES:
+            raise ValueError(f"Неизвестный тип события: {event}")
+        code = EVENT_CODES[event]
+
+        chunk = self._chunks[-1]
+        if chunk.is_full():
+            chunk = self._seal()
+        chunk.append(self._book_id(isbn), code, timestamp)
+        self._total += 1
+
+        key = (code, genre)
+        hour = int(timestamp // HOUR)
+        day = int(timestamp // DAY)
+        self._hourly.setdefault(hour, Counter())[key] += 1
+        self._daily.setdefault(day, Counter())[key] += 1
+
+    def record_many(self, entries: Iterable[Tuple[str, str]], event: str, timestamp: float) -> int:
+        """
+        Записать одно событие для группы книг (пары ISBN, жанр) с общим
+        временем; агрегаты обновляются один раз на группу. Вернуть число записей
+        """
+        if event not in EVENT_CODES:
+            raise ValueError(f"Неизвестный тип события: {event}")
+        code = EVENT_CODES[event]
+        genres: Counter = Counter()
+        chunk = self._chunks[-1]
+        for isbn, genre in entries:
+            if chunk.is_full():
+                chunk = self._seal()
+            chunk.append(self._book_id(isbn), code, timestamp)
+            genres[(code, genre)] += 1
+        count = sum(genres.values())
+        self._total += count
+        if count:
+            self._hourly.setdefault(int(timestamp // HOUR), Counter()).update(genres)
+            self._daily.setdefault(int(timestamp // DAY), Counter()).update(genres)
+        return count
+
+    def _seal(self) -> HistoryChunk:
+        """Закрыть текущий фрагмент и при необходимости вытеснить старые"""
+        chunk = HistoryChunk(self.chunk_size)
+        self._chunks.append(chunk)
+        while len(self._chunks) > self.max_chunks_in_memory:
+            oldest = self._chunks.pop(0)
+            if self.spill_dir is not None:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                path = os.path.join(self.spill_dir, f"chunk_{len(self._spilled):08d}.bin")
+                oldest.dump(path)
+                self._spilled.append(path)
+            else:
+                self._dropped += len(oldest)
+        return chunk
+
+    def iter_events(self, start: Optional[float] = None,
+                    end: Optional[float] = None) -> Iterator[Tuple[str, str, float]]:
+        """
+        Перебор сырых событий (ISBN, событие, время) в интервале [start, end).
+        Вытесненные на диск фрагменты читаются по одному
+        """
+        def chunks():
+            for path in self._spilled:
+                yield HistoryChunk.load(path)
+            yield from self._chunks
+
+        for chunk in chunks():
+            for book_id, code, timestamp in chunk:
+                if start is not None and timestamp < start:
+                    continue
+                if end is not None and timestamp >= end:
+                    continue
+                yield self._isbns[book_id], EVENT_NAMES[code], timestamp
+
+    @property
+    def dropped_events(self) -> int:
+        """Сколько сырых событий было отброшено (агрегаты их учитывают)"""
+        return self._dropped
+
+    def _buckets(self, start: Optional[float], end: Optional[float]) -> Iterator[Counter]:
+        """
+        Агрегаты, покрывающие [start, end) с точностью до часа:
+        неполные дни по краям берутся из часовых агрегатов, остальное из дневных
+        """
+        if start is None:
+            first = min(self._hourly) if self._hourly else 0
+        else:
+            first = int(start // HOUR)
+        if end is None:
+            last = max(self._hourly) + 1 if self._hourly else 0
+        else:
+            last = -int(-end // HOUR)
+        if first >= last:
+            return
+
+        day_first = -(-first // HOURS_PER_DAY)
+        day_last = last // HOURS_PER_DAY
+        if day_first >= day_last:
+            yield from self._range(self._hourly, first, last)
+            return
+
+        yield from self._range(self._hourly, first, day_first * HOURS_PER_DAY)
+        yield from self._range(self._daily, day_first, day_last)
+        yield from self._range(self._hourly, day_last * HOURS_PER_DAY, last)
+
+    @staticmethod
+    def _range(rollup: Dict[int, Counter], first: int, last: int) -> Iterator[Counter]:
+        if last - first > len(rollup):
+            for bucket, counts in rollup.items():
+                if first <= bucket < last:
+                    yield counts
+        else:
+            for bucket in range(first, last):
+                counts = rollup.get(bucket)
+                if counts is not None:
+                    yield counts
+
+    def count(self, event: str = 'borrow', start: Optional[float] = None,
+              end: Optional[float] = None, genre: Optional[str] = None) -> int:
+        """Количество событий в интервале, при необходимости по жанру"""
+        code = EVENT_CODES[event]
+        total = 0
+        for counts in self._buckets(start, end):
+            if genre is None:
+                total += sum(n for (c, _), n in counts.items() if c == code)
+            else:
+                total += counts.get((code, genre), 0)
+        return total
+
+    def count_by_genre(self, event: str = 'borrow', start: Optional[float] = None,
+                       end: Optional[float] = None) -> Dict[str, int]:
+        """Количество событий в интервале с разбивкой по жанрам"""
+        code = EVENT_CODES[event]
+        result: Counter = Counter()
+        for counts in self._buckets(start, end):
+            for (c, genre), n in counts.items():
+                if c == code:
+                    result[genre] += n
+        return dict(result)
+
+    def timeline(self, event: str = 'borrow', start: Optional[float] = None,
+                 end: Optional[float] = None, granularity: str = 'day') -> List[Tuple[int, int]]:
+        """Ряд (начало интервала, количество) по часам ('hour') или дням ('day')"""
+        if granularity == 'hour':
+            rollup, step = self._hourly, HOUR
+        elif granularity == 'day':
+            rollup, step = self._daily, DAY
+        else:
+            raise ValueError("granularity должен быть 'hour' или 'day'")
+        code = EVENT_CODES[event]
+        series = []
+        for bucket in sorted(rollup):
+            bucket_start = bucket * step
+            if start is not None and bucket_start + step <= start:
+                continue
+            if end is not None and bucket_start >= end:
+                continue
+            n = sum(n for (c, _), n in rollup[bucket].items() if c == code)
+            if n:
+                series.append((bucket_start, n))
+        return series
@@ -1,9 +1,31 @@
 """
 Класс Library - основная точка входа для работы с библиотекой
 """
-from typing import Optional, List
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, Optional, List
 from .book import Book, RegularBook, ReferenceBook, FictionBook
-from .my_collections import BookCollection, IndexDict
+from .my_collections import BookCollection, IndexDict, ScoredBookCollection
+from .history import LoanHistory
+from .patrons import PatronRegistry
+from .storage import StorageBackend, MemoryStorage, CowStorage
+from .query import Q
+from .seed import clone_seed_books
+from .transactions import Transaction, TransactionError
+
+if TYPE_CHECKING:
+    from .dedup import DuplicateIndex
+    from .metrics import Metrics
+    from .sync import CatalogDelta
+
+
+def _with_subclasses(cls: type) -> List[type]:
+    """Класс и все его подклассы"""
+    classes = [cls]
+    for subclass in cls.__subclasses__():
+        classes.extend(_with_subclasses(subclass))
+    return classes
 
 
 class Library:
@@ -11,76 +33,248 @@ class Library:
     Основной класс библиотеки
     """
     
-    def __init__(self, name: str = "Главная библиотека"):
+    def __init__(self, name: str = "Главная библиотека", storage: Optional[StorageBackend] = None,
+                 populate: bool = True):
         self.name = name
-        self.books = BookCollection()
-        self.indexes = IndexDict()
-        self._create_initial_books()
+        self._set_storage(storage if storage is not None else MemoryStorage())
+        self.history = LoanHistory()
+        self.patrons = PatronRegistry()
+        self.clock = time.time
+        self.metrics: Optional['Metrics'] = None
+        self.duplicates: Optional['DuplicateIndex'] = None  # Включается track_duplicates()
+        self.verbose = True  # Печатать сообщения об операциях
+        self._lock = threading.RLock()  # Выдачи, возвраты и удаления; транзакция - от проверки до фиксации
+        # Сохраненный каталог не пополняется начальным набором повторно
+        if populate and len(self.storage) == 0:
+            self._create_initial_books()
+    
+    def fork(self, name: Optional[str] = None) -> 'Library':
+        """
+        Ответвление библиотеки с копированием при записи.
+        Каталог в памяти остается у этой библиотеки (с индексами и
+        подписками), ответвление хранит только свои изменения и копии
+        книг, которые меняет библиотека после ответвления. Для каталога
+        без ленты изменений (SQLite) ответвление получает снимок в памяти,
+        а эта библиотека продолжает писать в свое хранилище.
+        Журнал выдач у ответвления свой, реестр читателей копируется
+        """
+        if isinstance(self.storage, CowStorage):
+            storage = self.storage.fork()
+        elif isinstance(self.storage.indexes, IndexDict):
+            storage = CowStorage(self.storage)
+        else:
+            storage = MemoryStorage()
+            storage.add_many(book.copy() for book in self.storage)
+        child = Library(name or self.name, storage=storage, populate=False)
+        child.patrons = self.patrons.copy()
+        child.clock = self.clock
+        child.verbose = self.verbose
+        return child
+    
+    def _say(self, message: str) -> None:
+        """Сообщение об операции (не печатается при verbose = False)"""
+        if self.verbose:
+            print(message)
+    
+    def _set_storage(self, storage: StorageBackend) -> None:
+        self.storage = storage
+        self.books = storage.books
+        self.indexes = storage.indexes
+    
+    def enable_metrics(self, metrics: Optional['Metrics'] = None) -> 'Metrics':
+        """
+        Включить замеры add_book, remove_book, search_books, search_by_keyword,
+        borrow_book и return_book. Без замеров методы не оборачиваются
+        """
+        from . import metrics as _metrics
+        return _metrics.enable(self, metrics)
+    
+    def disable_metrics(self) -> None:
+        """Выключить замеры"""
+        from . import metrics as _metrics
+        _metrics.disable(self)
     
     def _create_initial_books(self) -> None:
-        """Создание начального набора книг разных типов"""
-        initial_books = [
-            # Обычные книги
-            RegularBook("Война и мир", "Лев Толстой", 1869, "роман", "978-5-389-07435-1"),
-            RegularBook("Преступление и наказание", "Федор Достоевский", 1866, "роман", "978-5-17-090665-5"),
-            
-            # Справочные книги
-            ReferenceBook("Толковый словарь", "Владимир Даль", 1880, "словарь", "978-5-17-090689-1", "словарь"),
-            ReferenceBook("Большая энциклопедия", "Коллектив авторов", 2005, "энциклопедия", "978-5-17-080185-2", "энциклопедия"),
-            
-            # Художественная литература
-            FictionBook("Мастер и Маргарита", "Михаил Булгаков", 1967, "фэнтези", "978-5-17-067580-4", "проза"),
-            FictionBook("1984", "Джордж Оруэлл", 1949, "антиутопия", "978-5-17-080115-9", "проза"),
-            FictionBook("Гарри Поттер", "Джоан Роулинг", 1997, "фэнтези", "978-5-389-07429-0", "проза"),
-        ]
-        
-        for book in initial_books:
-            self.add_book(book, silent=True)
+        """Создание начального набора книг разных типов (копии предсобранного каталога)"""
+        self.storage.add_many(clone_seed_books())
+    
+    @classmethod
+    def from_catalog(cls, path: str, name: str = "Главная библиотека",
+                     storage: Optional[StorageBackend] = None) -> 'Library':
+        """Библиотека из сохраненного каталога (без начального набора)"""
+        import json
+        library = cls(name, storage=storage, populate=False)
+        with open(path, encoding='utf-8') as f:
+            library.storage.add_many(Book.from_dict(json.loads(line)) for line in f if line.strip())
+        return library
+    
+    def save_catalog(self, path: str) -> int:
+        """Сохранить каталог в файл JSON Lines, вернуть количество книг"""
+        import json
+        count = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            for book in self.storage:
+                f.write(json.dumps(book.to_dict(), ensure_ascii=False) + "\n")
+                count += 1
+        return count
     
     def add_book(self, book: Book, silent: bool = False) -> bool:
         """Добавить книгу в библиотеку"""
-        if book.isbn in self.indexes:
+        if book.isbn in self.storage:
             if not silent:
-                print(f"Книга с ISBN {book.isbn} уже существует")
+                self._say(f"Книга с ISBN {book.isbn} уже существует")
             return False
         
         # Особые проверки для ReferenceBook
         if isinstance(book, ReferenceBook) and book.is_for_library_use_only():
             if not silent:
-                print(f"Информация: {book.reference_type.capitalize()} '{book.title}' - только для использования в библиотеке")
+                self._say(f"Информация: {book.reference_type.capitalize()} '{book.title}' - только для использования в библиотеке")
         
-        self.books.add(book)
-        self.indexes.add_book(book)
+        self.storage.add(book)
         
         if not silent:
-            print(f"Добавлена книга: {book}")
+            self._say(f"Добавлена книга: {book}")
+            if self.duplicates is not None:
+                similar = self.duplicates.similar(self.storage.indexes.slot_of(book.isbn))
+                if similar:
+                    self._say("Возможные дубликаты: " + ", ".join(f"'{other.title}' ({other.isbn})"
+                                                                for other in similar))
         
         return True
     
-    def borrow_book(self, isbn: str) -> bool:
-        """Выдать книгу с учетом ее типа"""
-        book = self.indexes.get_book_by_isbn(isbn)
-        if not book:
-            print(f"Книга с ISBN {isbn} не найдена")
-            return False
+    def add_books(self, books: Iterable[Book]) -> int:
+        """Массовое добавление книг без вывода, дубликаты ISBN пропускаются"""
+        seen = set()
+        new_books = []
+        for book in books:
+            if book.isbn in seen or book.isbn in self.storage:
+                continue
+            seen.add(book.isbn)
+            new_books.append(book)
+        self.storage.add_many(new_books)
+        return len(new_books)
+    
+    def borrow_book(self, isbn: str, patron: Optional[int] = None) -> bool:
+        """Выдать книгу с учетом ее типа (и лимитов читателя patron, если он указан)"""
+        with self._lock:
+            book = self.storage.get(isbn)
+            if not book:
+                self._say(f"Книга с ISBN {isbn} не найдена")
+                return False
         
-        # Проверка для справочников
-        if isinstance(book, ReferenceBook) and book.is_for_library_use_only():
-            print(f"Ошибка: {book.reference_type.capitalize()} '{book.title}' нельзя выдать на дом")
-            return False
+            # Проверка для справочников
+            if isinstance(book, ReferenceBook) and book.is_for_library_use_only():
+                self._say(f"Ошибка: {book.reference_type.capitalize()} '{book.title}' нельзя выдать на дом")
+                return False
         
-        if book.borrow():
-            print(f"Выдана книга: {book.title}")
-            print(f"Срок возврата: {book.get_loan_period()} дней")
-            print(f"Можно продлить: {'да' if book.can_be_extended() else 'нет'}")
-            return True
-        else:
-            print(f"Предупреждение: Книга '{book.title}' уже выдана")
+            if patron is not None and book.is_available:
+                refusal = self.patrons.check(patron, book)
+                if refusal is not None:
+                    self._say(f"Отказ в выдаче '{book.title}': {refusal}")
+                    return False
+        
+            if book.borrow():
+                self.storage.update(book)
+                now = self.clock()
+                if patron is not None:
+                    self.patrons.checkout(patron, book, now)
+                self.history.record(book.isbn, 'borrow', now, book.genre)
+                self._say(f"Выдана книга: {book.title}")
+                self._say(f"Срок возврата: {book.get_loan_period()} дней")
+                self._say(f"Можно продлить: {'да' if book.can_be_extended() else 'нет'}")
+                return True
+            else:
+                self._say(f"Предупреждение: Книга '{book.title}' уже выдана")
+                return False
+    
+    @contextmanager
+    def transaction(self) -> Iterator[Transaction]:
+        """
+        Пакет выдач и возвратов "все или ничего":
+
+            with library.transaction() as tx:
+                tx.borrow(isbn1, patron=7)
+                tx.return_book(isbn2)
+
+        Каждая операция проверяется при добавлении (TransactionError
+        при отказе), изменения применяются вместе при выходе из блока.
+        Исключение внутри блока отменяет всю транзакцию
+        """
+        with self._lock:
+            tx = Transaction(self)
+            yield tx
+            tx.commit()
+    
+    def borrow_many(self, isbns: Iterable[str], patron: Optional[int] = None) -> bool:
+        """Выдать несколько книг сразу; при любом отказе не выдается ни одна"""
+        isbns = list(isbns)
+        try:
+            with self.transaction() as tx:
+                tx.prefetch(isbns)
+                for isbn in isbns:
+                    tx.borrow(isbn, patron)
+        except TransactionError as error:
+            self._say(f"Выдача отменена: {error}")
             return False
+        self._say(f"Выдано книг: {len(tx)}")
+        return True
+    
+    def return_many(self, isbns: Iterable[str]) -> bool:
+        """Вернуть несколько книг сразу; при любой ошибке не возвращается ни одна"""
+        isbns = list(isbns)
+        try:
+            with self.transaction() as tx:
+                tx.prefetch(isbns)
+                for isbn in isbns:
+                    tx.return_book(isbn)
+        except TransactionError as error:
+            self._say(f"Возврат отменен: {error}")
+            return False
+        self._say(f"Возвращено книг: {len(tx)}")
+        return True
+    
+    def diff(self, other: 'Library', bits: Optional[int] = None) -> 'CatalogDelta':
+        """
+        Дельта, переводящая каталог этой библиотеки в каталог other.
+        Сравниваются только корзины ISBN с различающимися хэшами
+        """
+        from .sync import compute_delta
+        return compute_delta(other.storage.digest(bits), self.storage.digest(bits))
+    
+    def sync_from(self, other: 'Library', bits: Optional[int] = None) -> 'CatalogDelta':
+        """Привести каталог к каталогу other, перенеся только изменения"""
+        from .sync import apply_delta
+        with self._lock:
+            delta = self.diff(other, bits)
+            changed = apply_delta(self, delta)
+        self._say(f"Синхронизация с '{other.name}': изменено книг {changed}")
+        return delta
+    
+    def extend_loan(self, isbn: str) -> bool:
+        """Продлить выдачу книги читателю"""
+        with self._lock:
+            book = self.storage.get(isbn)
+            if not book:
+                self._say(f"Книга с ISBN {isbn} не найдена")
+                return False
+            try:
+                loan = self.patrons.extend(isbn, book)
+            except ValueError as error:
+                self._say(f"Предупреждение: {error}")
+                return False
+            self._say(f"Выдача '{book.title}' продлена, продлений: {loan.extensions}")
+            return True
+    
+    def patron_books(self, patron: int) -> BookCollection:
+        """Книги на руках у читателя"""
+        return BookCollection([self.storage.get(loan.isbn) for loan in self.patrons.loans_of(patron)])
     
     def get_books_by_type(self, book_type: type) -> List[Book]:
-        """Получить книги определенного типа"""
-        return [book for book in self.books if isinstance(book, book_type)]
+        """Получить книги определенного типа (через индекс по типу)"""
+        results = []
+        for cls in _with_subclasses(book_type):
+            results.extend(self.storage.search(type=cls.__name__))
+        return results
     
     def print_books_by_type(self) -> None:
         """Вывести книги сгруппированные по типам"""
@@ -107,64 +301,127 @@ class Library:
     
     def remove_book(self, isbn: str) -> bool:
         """Удалить книгу по ISBN"""
-        book = self.indexes.get_book_by_isbn(isbn)
-        if not book:
-            print(f"Книга с ISBN {isbn} не найдена")
-            return False
+        with self._lock:
+            book = self.storage.get(isbn)
+            if not book:
+                self._say(f"Книга с ISBN {isbn} не найдена")
+                return False
         
-        self.books.remove(book)
-        self.indexes.remove_book(book)
-        print(f"Удалена книга: {book.title}")
-        return True
+            self.storage.remove(book)
+            self.patrons.checkin(book.isbn)
+            self._say(f"Удалена книга: {book.title}")
+            return True
     
     def return_book(self, isbn: str) -> bool:
         """Вернуть книгу"""
-        book = self.indexes.get_book_by_isbn(isbn)
-        if not book:
-            print(f"Книга с ISBN {isbn} не найдена")
-            return False
-        
-        if book.return_book():
-            print(f"Возвращена книга: {book.title}")
-            return True
-        else:
-            print(f"Предупреждение: Книга '{book.title}' не была выдана")
-            return False
-    
-    def search_books(self, author: str = None, year: int = None, genre: str = None) -> BookCollection:
-        """Поиск книг по параметрам"""
-        results = []
+        with self._lock:
+            book = self.storage.get(isbn)
+            if not book:
+                self._say(f"Книга с ISBN {isbn} не найдена")
+                return False
         
-        if author:
-            results.extend(self.indexes.search_by_author(author))
-        
-        if year:
-            if results:
-                results = [book for book in results if book.year == year]
+            if book.return_book():
+                self.storage.update(book)
+                self.patrons.checkin(book.isbn)
+                self.history.record(book.isbn, 'return', self.clock(), book.genre)
+                self._say(f"Возвращена книга: {book.title}")
+                return True
             else:
-                results.extend(self.indexes.search_by_year(year))
-        
-        if genre:
-            if results:
-                results = [book for book in results if book.genre == genre]
-            else:
-                results.extend(self.indexes.search_by_genre(genre))
-        
-        return BookCollection(results)
+                self._say(f"Предупреждение: Книга '{book.title}' не была выдана")
+                return False
+    
+    def search_books(self, author: str = None, year: int = None, genre: str = None,
+                     **filters) -> BookCollection:
+        """
+        Поиск книг по параметрам (условия выполняются хранилищем).
+        Дополнительные условия поле=значение используют объявленные индексы,
+        например reference_type="словарь" или literary_genre="поэзия"
+        """
+        return BookCollection(self.storage.search(author=author, year=year, genre=genre, **filters))
+    
+    def find(self, query: Q) -> BookCollection:
+        """
+        Поиск по логическому запросу, например
+        Q(available=True, genre="фэнтези", type="FictionBook") & ~Q(literary_genre="поэзия")
+        """
+        return BookCollection(self.storage.query(query))
     
     def search_by_keyword(self, keyword: str) -> BookCollection:
         """Поиск по ключевому слову"""
-        return self.books.search_by_keyword(keyword)
+        return BookCollection(self.storage.search_by_keyword(keyword))
+    
+    def search_ranked(self, query: str, k: int = 20,
+                      weights: Optional[Dict[str, float]] = None) -> ScoredBookCollection:
+        """
+        Лучшие k книг по релевантности запросу из нескольких слов
+        (BM25 по названию, автору, жанру и году с весами полей weights)
+        """
+        ranked = self.storage.search_ranked(query, k, weights)
+        return ScoredBookCollection([book for book, _ in ranked], [score for _, score in ranked])
+    
+    def track_duplicates(self, threshold: Optional[float] = None) -> 'DuplicateIndex':
+        """
+        Отслеживать почти дубликаты (MinHash/LSH по названию и автору):
+        каталог индексируется один раз, новые книги сравниваются при добавлении
+        """
+        from .dedup import DuplicateIndex, THRESHOLD
+        indexes = self.storage.indexes
+        if not isinstance(indexes, IndexDict):
+            raise ValueError("Отслеживание дубликатов доступно для каталога в памяти")
+        if self.duplicates is not None:
+            self.duplicates.close()
+        self.duplicates = DuplicateIndex(indexes, threshold or THRESHOLD)
+        return self.duplicates
+    
+    def find_duplicates(self, threshold: Optional[float] = None) -> List[BookCollection]:
+        """
+        Группы книг - вероятных изданий одного произведения под разными ISBN.
+        Без отслеживания (track_duplicates) каталог проверяется целиком за почти линейное время
+        """
+        from .dedup import find_duplicates, THRESHOLD
+        if self.duplicates is not None and threshold in (None, self.duplicates.threshold):
+            clusters = self.duplicates.clusters()
+        else:
+            clusters = find_duplicates(self.storage, threshold or THRESHOLD)
+        return [BookCollection(cluster) for cluster in clusters]
+    
+    def verify(self, sample: Optional[int] = None, seed: Optional[int] = None) -> List[str]:
+        """
+        Проверка инвариантов каталога, индексов и выдач. Возвращает
+        описания нарушений; пустой список - все согласовано.
+        Полная проверка - O(n); sample - проверка sample случайных книг
+        и выдач за время, не зависящее от размера каталога
+        """
+        from random import Random
+        rng = Random(seed)
+        with self._lock:
+            problems = self.storage.verify(sample, rng)
+            problems += self.patrons.verify(sample, rng)
+            if sample is None:
+                loans = [self.patrons.loan(isbn) for isbn in self.patrons._active]
+                available = 0
+                for book in self.storage:
+                    available += book.is_available
+                if available != self.storage.count_available():
+                    problems.append(f"Доступных книг {available}, по индексу {self.storage.count_available()}")
+            else:
+                loans = [self.patrons.random_loan(rng) for _ in range(sample)] if self.patrons.active_loans() else []
+            for loan in loans:
+                book = self.storage.get(loan.isbn)
+                if book is None or book.is_available:
+                    problems.append(f"Книга {loan.isbn} числится у читателя {loan.patron_id}, "
+                                    f"но {'отсутствует в каталоге' if book is None else 'не выдана'}")
+        return list(dict.fromkeys(problems))  # Выборка может повторять книгу
     
     def get_book(self, isbn: str) -> Optional[Book]:
         """Получить книгу по ISBN"""
-        return self.indexes.get_book_by_isbn(isbn)
+        return self.storage.get(isbn)
     
     def print_status(self) -> None:
         """Вывести статус библиотеки"""
-        total = len(self.books)
-        available = len(self.books.get_available_books())
-        borrowed = len(self.books.get_borrowed_books())
+        total = len(self.storage)
+        available = self.storage.count_available()
+        borrowed = total - available
         
         print("\n" + "="*50)
         print(f"СТАТУС БИБЛИОТЕКИ '{self.name}':")
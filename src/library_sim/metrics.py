@@ -0,0 +1,261 @@
+"""
+Метрики операций библиотеки: гистограммы задержек, счетчики попаданий,
+распределение размеров корзин индексов. Выгрузка в словарь или
+текстовый формат Prometheus
+"""
+import os
+import time
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+SUB_BITS = 3  # 8 подкорзин на степень двойки - точность около 12%
+_LINEAR_LIMIT = 1 << (SUB_BITS + 1)
+
+INSTRUMENTED_OPERATIONS = ('add_book', 'remove_book', 'search_books',
+                           'search_by_keyword', 'borrow_book', 'return_book')
+
+
+def _bucket_index(value: int) -> int:
+    """Номер корзины в духе HDR-гистограммы"""
+    if value < _LINEAR_LIMIT:
+        return value
+    shift = value.bit_length() - SUB_BITS - 1
+    return (shift << SUB_BITS) + (value >> shift)
+
+
+def _bucket_bounds(index: int) -> Tuple[int, int]:
+    """Границы значений корзины (включительно)"""
+    if index < _LINEAR_LIMIT:
+        return index, index
+    shift = (index >> SUB_BITS) - 1
+    mantissa = index - (shift << SUB_BITS)
+    return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """
+    Гистограмма задержек в наносекундах с логарифмическими корзинами.
+    Память не зависит от числа замеров
+    """
+
+    def __init__(self):
+        self._counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value: int) -> None:
+        """Записать замер"""
+        index = _bucket_index(value)
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent: float) -> int:
+        """Оценка перцентиля (верхняя граница корзины)"""
+        if not self.count:
+            return 0
+        rank = percent / 100 * self.count
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= rank:
+                return min(_bucket_bounds(index)[1], self.max)
+        return self.max
+
+    def cumulative(self) -> List[Tuple[int, int]]:
+        """Пары (верхняя граница, накопленное количество)"""
+        result, seen = [], 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            result.append((_bucket_bounds(index)[1], seen))
+        return result
+
+
+def _size_distribution(sizes: List[int]) -> Dict[str, int]:
+    """Распределение размеров корзин по степеням двойки"""
+    distribution: Dict[str, int] = {}
+    for size in sizes:
+        bound = 1 << max(0, (size - 1).bit_length())
+        key = f"<={bound}"
+        distribution[key] = distribution.get(key, 0) + 1
+    return dict(sorted(distribution.items(), key=lambda item: int(item[0][2:])))
+
+
+class Metrics:
+    """Набор метрик одной библиотеки"""
+
+    def __init__(self):
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def observe(self, operation: str, nanoseconds: int, hit: bool) -> None:
+        """Записать выполнение операции"""
+        histogram = self.histograms.get(operation)
+        if histogram is None:
+            histogram = self.histograms[operation] = LatencyHistogram()
+        histogram.record(nanoseconds)
+        counters = self.hits if hit else self.misses
+        counters[operation] = counters.get(operation, 0) + 1
+
+    def wrap(self, operation: str, method: Callable) -> Callable:
+        """Обертка метода с замером времени; непустой результат считается попаданием"""
+        @wraps(method)
+        def instrumented(*args, **kwargs):
+            start = time.perf_counter_ns()
+            result = method(*args, **kwargs)
+            self.observe(operation, time.perf_counter_ns() - start, bool(result))
+            return result
+        return instrumented
+
+    def snapshot(self, library=None) -> Dict:
+        """Текущее состояние метрик в виде словаря"""
+        operations = {}
+        for name, histogram in self.histograms.items():
+            operations[name] = {
+                'count': histogram.count,
+                'hits': self.hits.get(name, 0),
+                'misses': self.misses.get(name, 0),
+                'total_ms': histogram.total / 1e6,
+                'p50_us': histogram.percentile(50) / 1e3,
+                'p90_us': histogram.percentile(90) / 1e3,
+                'p99_us': histogram.percentile(99) / 1e3,
+                'max_us': histogram.max / 1e3,
+            }
+        snapshot = {'operations': operations}
+        if library is not None:
+            snapshot['index_buckets'] = self._index_buckets(library)
+        return snapshot
+
+    @staticmethod
+    def _index_buckets(library) -> Dict[str, Dict[str, int]]:
+        indexes = library.indexes
+        if not hasattr(indexes, 'bucket_sizes'):
+            return {}
+        return {name: _size_distribution(indexes.bucket_sizes(name))
+                for name in indexes.get_index_names()}
+
+    def to_prometheus(self, library=None, prefix: str = 'library') -> str:
+        """Метрики в текстовом формате Prometheus"""
+        lines = [
+            f"# HELP {prefix}_operation_seconds Latency of Library operations",
+            f"# TYPE {prefix}_operation_seconds histogram",
+        ]
+        for name, histogram in sorted(self.histograms.items()):
+            for bound, seen in histogram.cumulative():
+                lines.append(f'{prefix}_operation_seconds_bucket{{operation="{name}",'
+                             f'le="{bound / 1e9:.9g}"}} {seen}')
+            lines.append(f'{prefix}_operation_seconds_bucket{{operation="{name}",le="+Inf"}} '
+                         f'{histogram.count}')
+            lines.append(f'{prefix}_operation_seconds_sum{{operation="{name}"}} '
+                         f'{histogram.total / 1e9:.9g}')
+            lines.append(f'{prefix}_operation_seconds_count{{operation="{name}"}} {histogram.count}')
+
+        lines.append(f"# TYPE {prefix}_operation_results_total counter")
+        for name in sorted(self.histograms):
+            lines.append(f'{prefix}_operation_results_total{{operation="{name}",result="hit"}} '
+                         f'{self.hits.get(name, 0)}')
+            lines.append(f'{prefix}_operation_results_total{{operation="{name}",result="miss"}} '
+                         f'{self.misses.get(name, 0)}')
+
+        if library is not None:
+            lines.append(f"# TYPE {prefix}_index_buckets gauge")
+            for index, distribution in sorted(self._index_buckets(library).items()):
+                for size, count in distribution.items():
+                    lines.append(f'{prefix}_index_buckets{{index="{index}",size="{size}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, library=None) -> None:
+        """Записать метрики в файл (атомарно, для node_exporter textfile)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus(library))
+        os.replace(tmp_path, path)
+
+
+class EventProfile:
+    """Суммарное время по типам событий симуляции"""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.operations: Dict[str, int] = {}  # Операций над библиотекой (в пакетах - каждая)
+
+    def add(self, event: str, seconds: float, operations: int = 1) -> None:
+        """Учесть выполнение события"""
+        self.totals[event] = self.totals.get(event, 0.0) + seconds
+        self.counts[event] = self.counts.get(event, 0) + 1
+        self.operations[event] = self.operations.get(event, 0) + operations
+
+    def throughput(self) -> Dict[str, float]:
+        """Шаги и операции в секунду по времени выполнения событий"""
+        seconds = sum(self.totals.values())
+        steps = sum(self.counts.values())
+        operations = sum(self.operations.values())
+        return {'steps': steps, 'operations': operations, 'seconds': seconds,
+                'steps_per_second': steps / seconds if seconds > 0 else 0.0,
+                'operations_per_second': operations / seconds if seconds > 0 else 0.0}
+
+    def report(self) -> str:
+        """Таблица затрат по событиям"""
+        overall = sum(self.totals.values()) or 1.0
+        lines = [f"{'Событие':<26}{'Кол-во':>8}{'Всего, мс':>12}{'Сред., мс':>12}{'Доля':>8}"]
+        for event, total in sorted(self.totals.items(), key=lambda item: -item[1]):
+            count = self.counts[event]
+            lines.append(f"{event:<26}{count:>8}{total * 1e3:>12.3f}"
+                         f"{total * 1e3 / count:>12.3f}{total / overall:>8.1%}")
+        rate = self.throughput()
+        lines.append(f"Шагов: {rate['steps']}, операций: {rate['operations']}, "
+                     f"{rate['steps_per_second']:.0f} шагов/с, "
+                     f"{rate['operations_per_second']:.0f} операций/с")
+        return "\n".join(lines)
+
+
+def enable(library, metrics: Optional[Metrics] = None) -> Metrics:
+    """
+    Включить замеры для экземпляра библиотеки. Обертки ставятся поверх
+    уже установленных (например, Canary), прежние запоминаются
+    """
+    if library.metrics is not None:
+        disable(library)
+    metrics = metrics if metrics is not None else Metrics()
+    for name in INSTRUMENTED_OPERATIONS:
+        previous = library.__dict__.get(name)
+        wrapper = _while_enabled(library, metrics, name, getattr(library, name))
+        wrapper.replaces = previous
+        setattr(library, name, wrapper)
+    library.metrics = metrics
+    return metrics
+
+
+def _while_enabled(library, metrics: Metrics, name: str, method: Callable) -> Callable:
+    """Обертка с замером, пока у библиотеки включены эти метрики; иначе прямой вызов"""
+    timed = metrics.wrap(name, method)
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        if library.metrics is metrics:
+            return timed(*args, **kwargs)
+        return method(*args, **kwargs)
+    wrapper.metrics = metrics
+    return wrapper
+
+
+def disable(library) -> None:
+    """
+    Выключить замеры: вместо своих оберток восстанавливается то, что
+    было до enable. Обертка, поверх которой уже установлена чужая,
+    остается в цепочке, но больше ничего не замеряет
+    """
+    for name in INSTRUMENTED_OPERATIONS:
+        current = library.__dict__.get(name)
+        if current is None or getattr(current, 'metrics', None) is not library.metrics:
+            continue
+        if current.replaces is None:
+            del library.__dict__[name]
+        else:
+            setattr(library, name, current.replaces)
+    library.metrics = None
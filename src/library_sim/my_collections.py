@@ -1,80 +1,428 @@
 """
 Пользовательские коллекции: BookCollection и IndexDict
 """
-from typing import List, Dict, Any, Union, Optional
-from collections import defaultdict
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from collections.abc import Mapping
+from itertools import islice
+from typing import TYPE_CHECKING, List, Dict, Any, Callable, Iterable, Union, Optional
 
 from src.library_sim.book import Book
+from .bitmap import Bitmap
+from .feed import ChangeFeed, ADDED, REMOVED, BORROWED, RETURNED, UPDATED
+
+if TYPE_CHECKING:
+    from random import Random
+    from .query import Q
+
+_EMPTY = array('I')
+MAX_PROBLEMS = 100  # Сообщений о несогласованности в одном отчете
+RANDOM_ATTEMPTS = 32  # Попыток попасть в занятый слот до обхода слотов
 
 
 class BookCollection:
     """
     Пользовательская списковая коллекция книг
-    Поддерживает индексацию, срезы, итерацию
+    Поддерживает индексацию, срезы, итерацию.
+    Удаление - O(1): по таблице ISBN -> позиция (строится при первом
+    удалении) позиция помечается пустой, список уплотняется, когда пустых
+    позиций становится больше половины или нужен доступ по номеру.
+    Повторные экземпляры одного ISBN хранят свои позиции отдельно и
+    удаляются по порядку, как в list.remove
     """
     
     def __init__(self, books: List['Book'] = None):
-        self._books = books if books else []
+        self._books: List[Optional['Book']] = books if books else []
+        self._positions: Optional[Dict[str, int]] = None  # ISBN -> первая позиция
+        self._repeats: Dict[str, List[int]] = {}  # ISBN -> позиции повторов
+        self._holes = 0  # Пустых позиций после удалений
     
     def __len__(self) -> int:
-        return len(self._books)
+        return len(self._books) - self._holes
     
     def __getitem__(self, index: Union[int, slice]) -> Union['Book', 'BookCollection']:
+        if self._holes:
+            self._compact()
         if isinstance(index, slice):
             return BookCollection(self._books[index])
         return self._books[index]
     
     def __iter__(self):
+        if self._holes:
+            return (book for book in self._books if book is not None)
         return iter(self._books)
     
     def __repr__(self) -> str:
         return f"BookCollection({len(self)} книг)"
     
     def __contains__(self, book: 'Book') -> bool:
-        return book in self._books
+        if self._positions is None:
+            self._build_positions()
+        return book.isbn in self._positions
+    
+    def _compact(self) -> None:
+        """Убрать пустые позиции (список меняется на месте)"""
+        self._books[:] = [book for book in self._books if book is not None]
+        self._holes = 0
+        if self._positions is not None:
+            self._build_positions()
+    
+    def _build_positions(self) -> None:
+        self._positions = {}
+        self._repeats = {}
+        for position, book in enumerate(self._books):
+            if book is not None:
+                self._track(book.isbn, position)
+    
+    def _track(self, isbn: str, position: int) -> None:
+        if self._positions.setdefault(isbn, position) != position:
+            self._repeats.setdefault(isbn, []).append(position)
     
     def add(self, book: 'Book') -> None:
         """Добавить книгу"""
         self._books.append(book)
+        if self._positions is not None:
+            self._track(book.isbn, len(self._books) - 1)
     
     def remove(self, book: 'Book') -> bool:
         """Удалить книгу"""
-        if book in self._books:
-            self._books.remove(book)
-            return True
-        return False
+        return self.remove_many((book,)) == 1
+    
+    def remove_many(self, books: Iterable['Book']) -> int:
+        """Удалить несколько книг (список уплотняется не больше одного раза), вернуть число удаленных"""
+        if self._positions is None:
+            self._build_positions()
+        positions, repeats = self._positions, self._repeats
+        removed = 0
+        for book in books:
+            position = positions.pop(book.isbn, None)
+            if position is None:
+                continue
+            self._books[position] = None
+            removed += 1
+            rest = repeats.get(book.isbn)
+            if rest:
+                positions[book.isbn] = rest.pop(0)
+                if not rest:
+                    del repeats[book.isbn]
+        self._holes += removed
+        if self._holes * 2 > len(self._books):
+            self._compact()
+        return removed
     
     def get_available_books(self) -> List['Book']:
         """Получить доступные книги"""
-        return [book for book in self._books if book.is_available]
+        return [book for book in self if book.is_available]
     
     def get_borrowed_books(self) -> List['Book']:
         """Получить выданные книги"""
-        return [book for book in self._books if not book.is_available]
+        return [book for book in self if not book.is_available]
     
     def search_by_keyword(self, keyword: str) -> 'BookCollection':
         """Поиск книг по ключевому слову"""
-        results = [book for book in self._books if keyword in book]
+        results = [book for book in self if keyword in book]
         return BookCollection(results)
     
     def clear(self) -> None:
         """Очистить коллекцию"""
         self._books.clear()
+        self._positions = None
+        self._repeats = {}
+        self._holes = 0
+
+
+class ScoredBookCollection(BookCollection):
+    """
+    Коллекция книг с оценками релевантности (результат ранжированного
+    поиска, книги по убыванию оценки)
+    """
+
+    def __init__(self, books: List['Book'] = None, scores: List[float] = None):
+        super().__init__(books)
+        self.scores = scores if scores is not None else [0.0] * len(self._books)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union['Book', 'ScoredBookCollection']:
+        if isinstance(index, slice):
+            return ScoredBookCollection(self._books[index], self.scores[index])
+        return self._books[index]
+
+    def __repr__(self) -> str:
+        return f"ScoredBookCollection({len(self)} книг)"
+
+    def add(self, book: 'Book', score: float = 0.0) -> None:
+        """Добавить книгу с оценкой"""
+        self._books.append(book)
+        self.scores.append(score)
+
+    def remove(self, book: 'Book') -> bool:
+        """Удалить книгу вместе с ее оценкой"""
+        if book in self._books:
+            del self.scores[self._books.index(book)]
+            self._books.remove(book)
+            return True
+        return False
+
+    def clear(self) -> None:
+        """Очистить коллекцию"""
+        self._books.clear()
+        self.scores.clear()
+
+    def score_of(self, book: 'Book') -> Optional[float]:
+        """Оценка книги (None, если книги нет в результате)"""
+        if book in self._books:
+            return self.scores[self._books.index(book)]
+        return None
+
+    def items(self):
+        """Пары (книга, оценка)"""
+        return zip(self._books, self.scores)
+
+
+def attribute_key(name: str) -> Callable[['Book'], Any]:
+    """Ключ индекса по атрибуту; методы без аргументов вызываются"""
+    def key(book: 'Book') -> Any:
+        value = getattr(book, name, None)
+        if callable(value):
+            value = value()
+        return value
+    return key
+
+
+# Вычисляемые поля книги, доступные в индексах и запросах наравне с атрибутами
+COMPUTED_FIELDS: Dict[str, Union[str, Callable[['Book'], Any]]] = {
+    'type': lambda book: type(book).__name__,
+    'available': 'is_available',
+    'library_use_only': 'is_for_library_use_only',
+}
+
+
+def field_key(name: str) -> Callable[['Book'], Any]:
+    """Ключ для поля запроса: вычисляемое поле или атрибут книги"""
+    computed = COMPUTED_FIELDS.get(name, name)
+    return computed if callable(computed) else attribute_key(computed)
+
+
+def _position(postings: array, slot: int) -> int:
+    """Позиция слота в отсортированном списке (-1, если его нет)"""
+    position = bisect_left(postings, slot)
+    return position if position < len(postings) and postings[position] == slot else -1
+
+
+class HashIndex(dict):
+    """
+    Хэш-индекс: значение -> отсортированный массив номеров слотов книг
+    """
+    kind = 'hash'
+
+    def __init__(self, key: Callable[['Book'], Any], slots: List[Optional['Book']]):
+        super().__init__()
+        self.key = key
+        self._slots = slots
+
+    def insert(self, value: Any, book: 'Book', slot: int) -> None:
+        """Добавить слот книги в корзину значения"""
+        postings = self.get(value)
+        if postings is None:
+            self[value] = array('I', (slot,))
+        elif postings[-1] < slot:
+            postings.append(slot)  # Обычный случай: новые книги получают больший номер
+        else:
+            insort(postings, slot)
+
+    def delete(self, value: Any, book: 'Book', slot: int) -> bool:
+        """Удалить слот книги из корзины значения (False, если его там не было)"""
+        postings = self.get(value)
+        if postings is None:
+            return False
+        position = _position(postings, slot)
+        if position < 0:
+            return False
+        del postings[position]
+        if not postings:
+            del self[value]
+        return True
+
+    def postings(self, value: Any) -> array:
+        """Номера слотов книг с данным значением"""
+        return self.get(value, _EMPTY)
+
+    def lookup(self, value: Any) -> List['Book']:
+        """Книги с данным значением"""
+        slots = self._slots
+        return [slots[slot] for slot in self.get(value, _EMPTY)]
+
+    def relocate(self, book: 'Book', slot: int) -> None:
+        """Перенести книгу к новому значению ключа"""
+        new_value = self.key(book)
+        if new_value is not None and _position(self.get(new_value, _EMPTY), slot) >= 0:
+            return
+        for value, postings in list(self.items()):
+            if _position(postings, slot) >= 0:
+                self.delete(value, book, slot)
+                break
+        if new_value is not None:
+            self.insert(new_value, book, slot)
+
+
+class SortedIndex(HashIndex):
+    """
+    Хэш-индекс с упорядоченными значениями для поиска по диапазону
+    """
+    kind = 'sorted'
+
+    def __init__(self, key: Callable[['Book'], Any], slots: List[Optional['Book']]):
+        super().__init__(key, slots)
+        self._sorted_keys: List[Any] = []
+
+    def insert(self, value: Any, book: 'Book', slot: int) -> None:
+        if value not in self:
+            insort(self._sorted_keys, value)
+        super().insert(value, book, slot)
+
+    def delete(self, value: Any, book: 'Book', slot: int) -> bool:
+        deleted = super().delete(value, book, slot)
+        if value not in self:
+            pos = bisect_left(self._sorted_keys, value)
+            if pos < len(self._sorted_keys) and self._sorted_keys[pos] == value:
+                del self._sorted_keys[pos]
+        return deleted
+
+    def range(self, low: Any = None, high: Any = None) -> List['Book']:
+        """Книги со значениями в диапазоне [low, high]"""
+        start = 0 if low is None else bisect_left(self._sorted_keys, low)
+        stop = len(self._sorted_keys) if high is None else bisect_right(self._sorted_keys, high)
+        slots = self._slots
+        results = []
+        for value in self._sorted_keys[start:stop]:
+            results.extend(slots[slot] for slot in self[value])
+        return results
+
+
+class BitmapIndex(dict):
+    """
+    Битовый индекс: значение -> сжатое множество номеров слотов книг.
+    Подходит для полей с небольшим числом различных значений
+    """
+    kind = 'bitmap'
+
+    def __init__(self, key: Callable[['Book'], Any], slots: List[Optional['Book']]):
+        super().__init__()
+        self.key = key
+        self._slots = slots
+
+    def insert(self, value: Any, book: 'Book', slot: int) -> None:
+        bitmap = self.get(value)
+        if bitmap is None:
+            bitmap = self[value] = Bitmap()
+        bitmap.add(slot)
+
+    def delete(self, value: Any, book: 'Book', slot: int) -> bool:
+        bitmap = self.get(value)
+        if bitmap is None or slot not in bitmap:
+            return False
+        bitmap.discard(slot)
+        if not bitmap:
+            del self[value]
+        return True
+
+    def bitmap(self, value: Any) -> Bitmap:
+        """Множество слотов книг с данным значением"""
+        bitmap = self.get(value)
+        return bitmap.copy() if bitmap is not None else Bitmap()
+
+    def lookup(self, value: Any) -> List['Book']:
+        bitmap = self.get(value)
+        if bitmap is None:
+            return []
+        slots = self._slots
+        return [slots[slot] for slot in bitmap]
+
+    def relocate(self, book: 'Book', slot: int) -> None:
+        """Перенести книгу к новому значению ключа"""
+        new_value = self.key(book)
+        for value, bitmap in self.items():
+            if slot in bitmap:
+                if value == new_value:
+                    return
+                self.delete(value, book, slot)
+                break
+        if new_value is not None:
+            self.insert(new_value, book, slot)
+
+    def relocate_many(self, pairs: List[tuple]) -> None:
+        """Перенести группу книг (пары книга, слот) за один проход по корзинам"""
+        targets: Dict[Any, List[int]] = {}
+        for book, slot in pairs:
+            targets.setdefault(self.key(book), []).append(slot)
+        moved = Bitmap(slot for _, slot in pairs)
+        for value in list(self):
+            remaining = self[value] - moved
+            if remaining:
+                self[value] = remaining
+            else:
+                del self[value]
+        for value, slots in targets.items():
+            if value is None:
+                continue
+            bitmap = self.get(value)
+            if bitmap is None:
+                self[value] = Bitmap(slots)
+            else:
+                bitmap.update(slots)
+
+
+class IsbnIndex(Mapping):
+    """Уникальный индекс ISBN -> Book поверх таблицы ISBN -> номер слота"""
+
+    def __init__(self, slot_of: Dict[str, int], slots: List[Optional['Book']]):
+        self._slot_of = slot_of
+        self._slots = slots
+
+    def __getitem__(self, isbn: str) -> 'Book':
+        return self._slots[self._slot_of[isbn]]
+
+    def __contains__(self, isbn: object) -> bool:
+        return isbn in self._slot_of
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __iter__(self):
+        return iter(self._slot_of)
 
 
 class IndexDict:
     """
     Пользовательская словарная коллекция для индексации книг
     """
+
+    INDEX_KINDS = ('hash', 'sorted', 'bitmap')
     
     def __init__(self):
+        # Книге при добавлении назначается номер слота; индексы хранят номера, а не книги.
+        # Слоты удаленных книг занимаются заново, поэтому их число не больше пика каталога
+        self._slots: List[Optional['Book']] = []  # Номер слота -> Book
+        self._slot_of: Dict[str, int] = {}        # ISBN -> номер слота
+        self._free: List[int] = []                 # Освобожденные слоты, занимаются повторно
         self._indexes = {
-            'isbn': {},  # ISBN -> Book
-            'author': defaultdict(list),  # Author -> List[Book]
-            'year': defaultdict(list),    # Year -> List[Book]
-            'genre': defaultdict(list)    # Genre -> List[Book]
+            'isbn': IsbnIndex(self._slot_of, self._slots),  # ISBN -> Book
         }
+        self._registry: Dict[str, Union[HashIndex, BitmapIndex]] = {}
+        self._volatile: List[str] = []             # Индексы по изменяемым полям
+        self._live = Bitmap()                      # Занятые слоты
         self._change_log = []
+        self._anomalies: deque = deque(maxlen=MAX_PROBLEMS)  # Несогласованности, замеченные по ходу работы
+        self.feed = ChangeFeed()                   # Типизированные события изменений
+
+        self.register_index('author')                      # Author -> List[Book]
+        self.register_index('year', kind='sorted')         # Year -> List[Book]
+        self.register_index('genre', kind='bitmap')        # Genre -> Bitmap
+        self.register_index('type', kind='bitmap')
+        self.register_index('reference_type', kind='bitmap')
+        self.register_index('literary_genre', kind='bitmap')
+        self.register_index('library_use_only', kind='bitmap')
+        self.register_index('available', kind='bitmap', volatile=True)
     
     def __getitem__(self, key: str) -> Dict:
         """Доступ к индексу по имени"""
@@ -89,71 +437,410 @@ class IndexDict:
     
     def __len__(self) -> int:
         """Количество индексированных книг"""
-        return len(self._indexes['isbn'])
+        return len(self._slot_of)
     
     def __contains__(self, isbn: str) -> bool:
         """Проверка наличия книги по ISBN"""
-        return isbn in self._indexes['isbn']
+        return isbn in self._slot_of
     
     def __iter__(self):
         """Итерация по ISBNам"""
-        return iter(self._indexes['isbn'])
+        return iter(self._slot_of)
     
     def _log_change(self, message: str):
         """Логирование изменений"""
         self._change_log.append(message)
+
+    def register_index(self, name: str, key: Union[str, Callable[['Book'], Any], None] = None,
+                       kind: str = 'hash', build: bool = True, volatile: bool = False) -> None:
+        """
+        Объявить индекс по атрибуту или вычисляемому свойству книги.
+        key - имя атрибута или функция от книги (по умолчанию поле name);
+        книги со значением None в индекс не попадают.
+        volatile - значение меняется у существующей книги и
+        пересчитывается в update_book
+        """
+        if name in self._indexes:
+            raise ValueError(f"Индекс '{name}' уже существует")
+        if kind not in self.INDEX_KINDS:
+            raise ValueError(f"Тип индекса должен быть одним из {self.INDEX_KINDS}")
+        if key is None:
+            key_func = field_key(name)
+        else:
+            key_func = attribute_key(key) if isinstance(key, str) else key
+
+        if kind == 'bitmap':
+            index = BitmapIndex(key_func, self._slots)
+        elif kind == 'sorted':
+            index = SortedIndex(key_func, self._slots)
+        else:
+            index = HashIndex(key_func, self._slots)
+
+        if build and kind == 'bitmap':
+            grouped: Dict[Any, List[int]] = {}
+            for slot, book in enumerate(self._slots):
+                if book is not None:
+                    value = key_func(book)
+                    if value is not None:
+                        grouped.setdefault(value, []).append(slot)
+            for value, slots in grouped.items():
+                index[value] = Bitmap(slots)
+        elif build:
+            for slot, book in enumerate(self._slots):
+                if book is not None:
+                    value = key_func(book)
+                    if value is not None:
+                        index.insert(value, book, slot)
+
+        self._indexes[name] = index
+        self._registry[name] = index
+        if volatile:
+            self._volatile.append(name)
+        self._log_change(f"Создан индекс '{name}' ({kind})")
+
+    def drop_index(self, name: str) -> None:
+        """Удалить объявленный индекс"""
+        if name not in self._registry:
+            raise KeyError(f"Индекс '{name}' не найден")
+        del self._registry[name]
+        del self._indexes[name]
+        if name in self._volatile:
+            self._volatile.remove(name)
+        self._log_change(f"Удален индекс '{name}'")
+
+    def slot_of(self, isbn: str) -> Optional[int]:
+        """Номер слота книги (постоянен, пока книга в каталоге)"""
+        return self._slot_of.get(isbn)
+
+    def iter_slots(self):
+        """Пары (номер слота, книга) для всех книг каталога"""
+        for slot, book in enumerate(self._slots):
+            if book is not None:
+                yield slot, book
+
+    def get_index_names(self) -> List[str]:
+        """Имена объявленных индексов"""
+        return list(self._registry)
+
+    def bucket_sizes(self, name: str) -> List[int]:
+        """Размеры корзин индекса (для метрик)"""
+        if name not in self._registry:
+            raise KeyError(f"Индекс '{name}' не найден")
+        return [len(bucket) for bucket in self._registry[name].values()]
     
+    def verify(self, sample: Optional[int] = None, rng: Optional['Random'] = None) -> List[str]:
+        """
+        Проверка согласованности таблицы ISBN, занятых слотов и всех
+        индексов; возвращает описания нарушений (пустой список - все в порядке).
+        Полная проверка - O(числа книг и записей индексов): каждая запись
+        индекса указывает на живую книгу с тем же значением ключа, и записей
+        ровно столько, сколько книг с ключом. sample - проверка только
+        sample случайных слотов, для рабочих экземпляров
+        """
+        problems = list(self._anomalies)
+        if len(self._live) != len(self._slot_of):
+            problems.append(f"Занятых слотов {len(self._live)}, книг в таблице ISBN {len(self._slot_of)}")
+        if sample is not None:
+            if self._slots:
+                if rng is None:
+                    from random import Random
+                    rng = Random()
+                for _ in range(sample):
+                    self._verify_slot(rng.randrange(len(self._slots)), problems)
+            return problems[:MAX_PROBLEMS]
+
+        slots = self._slots
+        for isbn, slot in self._slot_of.items():
+            book = slots[slot] if 0 <= slot < len(slots) else None
+            if book is None or book.isbn != isbn:
+                problems.append(f"ISBN {isbn} указывает на слот {slot} без этой книги")
+        live = [slot for slot, book in enumerate(slots) if book is not None]
+        if len(live) != len(self._slot_of) or any(slot not in self._live for slot in live):
+            problems.append("Множество занятых слотов не совпадает со слотами книг")
+        if len(set(self._free)) != len(slots) - len(live) or any(slots[slot] is not None for slot in self._free):
+            problems.append("Список свободных слотов не совпадает с пустыми слотами")
+
+        missing = False
+        for name, index in self._registry.items():
+            key = index.key
+            expected = sum(1 for slot in live if key(slots[slot]) is not None)
+            entries = 0
+            for value, bucket in index.items():
+                if not bucket:
+                    problems.append(f"Индекс '{name}': пустая корзина {value!r}")
+                if isinstance(bucket, array) and any(a >= b for a, b in zip(bucket, bucket[1:])):
+                    problems.append(f"Индекс '{name}': корзина {value!r} не упорядочена")
+                for slot in bucket:
+                    book = slots[slot] if slot < len(slots) else None
+                    if book is None:
+                        problems.append(f"Индекс '{name}': корзина {value!r} содержит пустой слот {slot}")
+                    elif key(book) != value:
+                        problems.append(f"Индекс '{name}': книга {book.isbn} в корзине {value!r}, "
+                                        f"а ее значение {key(book)!r}")
+                entries += len(bucket)
+                if len(problems) >= MAX_PROBLEMS:
+                    return problems[:MAX_PROBLEMS]
+            if entries != expected:
+                problems.append(f"Индекс '{name}': записей {entries}, книг со значением {expected}")
+                missing = True
+            if isinstance(index, SortedIndex) and index._sorted_keys != sorted(index):
+                problems.append(f"Индекс '{name}': список значений не совпадает с корзинами")
+        if missing:
+            # Недостающие записи ищутся только при расхождении счетчиков
+            for slot in live:
+                self._verify_slot(slot, problems)
+                if len(problems) >= MAX_PROBLEMS:
+                    break
+        return problems[:MAX_PROBLEMS]
+
+    def _verify_slot(self, slot: int, problems: List[str]) -> None:
+        """Проверка одного слота: таблица ISBN и членство во всех индексах"""
+        book = self._slots[slot]
+        if book is None:
+            if slot in self._live:
+                problems.append(f"Пустой слот {slot} помечен занятым")
+            return
+        if self._slot_of.get(book.isbn) != slot:
+            problems.append(f"Книга {book.isbn} в слоте {slot}, а таблица ISBN указывает "
+                            f"на {self._slot_of.get(book.isbn)}")
+        if slot not in self._live:
+            problems.append(f"Слот {slot} книги {book.isbn} не помечен занятым")
+        for name, index in self._registry.items():
+            value = index.key(book)
+            if value is None:
+                continue
+            bucket = index.get(value)
+            if bucket is None:
+                found = False
+            elif isinstance(bucket, Bitmap):
+                found = slot in bucket
+            else:
+                found = _position(bucket, slot) >= 0
+            if not found:
+                problems.append(f"Индекс '{name}': книги {book.isbn} нет в корзине {value!r}")
+
     def add_book(self, book: 'Book') -> None:
         """Добавить книгу во все индексы"""
-        # ISBN (уникальный)
-        self._indexes['isbn'][book.isbn] = book
         self._log_change(f"Добавлена книга: {book.title} (ISBN: {book.isbn})")
-        
-        # Автор
-        self._indexes['author'][book.author].append(book)
-        
-        # Год
-        self._indexes['year'][book.year].append(book)
-        
-        # Жанр
-        self._indexes['genre'][book.genre].append(book)
+
+        if self._free:
+            slot = self._free.pop()
+            self._slots[slot] = book
+        else:
+            slot = len(self._slots)
+            self._slots.append(book)
+        self._slot_of[book.isbn] = slot
+        self._live.add(slot)
+
+        for index in self._registry.values():
+            value = index.key(book)
+            if value is not None:
+                index.insert(value, book, slot)
+        self.feed.publish(ADDED, book, slot)
     
     def remove_book(self, book: 'Book') -> bool:
         """Удалить книгу из всех индексов"""
-        if book.isbn not in self._indexes['isbn']:
+        if book.isbn not in self._slot_of:
             return False
         
         # Удаление из всех индексов
-        del self._indexes['isbn'][book.isbn]
-        
-        if book in self._indexes['author'][book.author]:
-            self._indexes['author'][book.author].remove(book)
-        
-        if book in self._indexes['year'][book.year]:
-            self._indexes['year'][book.year].remove(book)
-        
-        if book in self._indexes['genre'][book.genre]:
-            self._indexes['genre'][book.genre].remove(book)
+        slot = self._slot_of.pop(book.isbn)
+        book = self._slots[slot]
+
+        for name, index in self._registry.items():
+            value = index.key(book)
+            if value is not None and not index.delete(value, book, slot):
+                self._anomalies.append(f"Удаление {book.isbn}: слота {slot} нет в корзине "
+                                       f"{value!r} индекса '{name}'")
+        self._slots[slot] = None
+        self._live.discard(slot)
+        self._free.append(slot)
+        self.feed.publish(REMOVED, book, slot)
         
         self._log_change(f"Удалена книга: {book.title} (ISBN: {book.isbn})")
         return True
+
+    def update_book(self, book: 'Book') -> bool:
+        """Пересчитать индексы по изменяемым полям (например, после выдачи)"""
+        slot = self._slot_of.get(book.isbn)
+        if slot is None:
+            return False
+        availability = self._registry.get('available')
+        was_available = (slot in availability.get(True, ())) if availability is not None else None
+        for name in self._volatile:
+            self._registry[name].relocate(book, slot)
+
+        if was_available is None:
+            self.feed.publish(UPDATED, book, slot)
+        elif was_available != book.is_available:
+            self.feed.publish(RETURNED if book.is_available else BORROWED, book, slot)
+        return True
+
+    def update_many(self, books: Iterable['Book']) -> int:
+        """
+        Пересчитать изменяемые индексы для группы книг: битовые индексы
+        обновляются одним проходом, события публикуются по каждой книге
+        """
+        slot_of = self._slot_of
+        pairs = [(book, slot_of[book.isbn]) for book in books if book.isbn in slot_of]
+        availability = self._registry.get('available')
+        available = availability.get(True, ()) if availability is not None else None
+        was = [slot in available for _, slot in pairs] if available is not None else None
+        for name in self._volatile:
+            index = self._registry[name]
+            if isinstance(index, BitmapIndex):
+                index.relocate_many(pairs)
+            else:
+                for book, slot in pairs:
+                    index.relocate(book, slot)
+
+        for position, (book, slot) in enumerate(pairs):
+            if was is None:
+                self.feed.publish(UPDATED, book, slot)
+            elif was[position] != book.is_available:
+                self.feed.publish(RETURNED if book.is_available else BORROWED, book, slot)
+        return len(pairs)
+
+    def subscribe(self, callback, from_seq: Optional[int] = None, batch_size: int = 1):
+        """Подписка на ленту изменений (см. ChangeFeed.subscribe)"""
+        return self.feed.subscribe(callback, from_seq, batch_size)
+
+    def lookup(self, name: str, value: Any) -> List['Book']:
+        """Книги с данным значением объявленного индекса"""
+        if name not in self._registry:
+            raise KeyError(f"Индекс '{name}' не найден")
+        return self._registry[name].lookup(value)
+
+    def range_search(self, name: str, low: Any = None, high: Any = None) -> List['Book']:
+        """Поиск по диапазону значений упорядоченного индекса"""
+        index = self._registry.get(name)
+        if not isinstance(index, SortedIndex):
+            raise KeyError(f"Индекс '{name}' не является упорядоченным")
+        return index.range(low, high)
+
+    def search(self, **predicates: Any) -> List['Book']:
+        """
+        Поиск по условиям поле=значение (все условия одновременно).
+        Кандидаты берутся из самой маленькой корзины хэш-индекса или из
+        пересечения битовых индексов, остальные поля проверяются по книге
+        """
+        predicates = {field: value for field, value in predicates.items() if value is not None}
+        if not predicates:
+            return []
+
+        hashed = [field for field in predicates
+                  if field in self._registry and not isinstance(self._registry[field], BitmapIndex)]
+        bitmapped = [field for field in predicates
+                     if isinstance(self._registry.get(field), BitmapIndex)]
+
+        if hashed:
+            # Пересечение по номерам слотов: кандидаты из самой короткой корзины,
+            # членство в остальных - двоичным поиском и проверкой бита
+            postings = {field: self._registry[field].postings(predicates[field]) for field in hashed}
+            driver = min(hashed, key=lambda field: len(postings[field]))
+            others = [postings[field] for field in hashed if field != driver]
+            masks = [self._registry[field].get(predicates[field], Bitmap()) for field in bitmapped]
+            candidates: Iterable['Book'] = self._books_of(
+                slot for slot in postings[driver]
+                if all(_position(other, slot) >= 0 for other in others)
+                and all(slot in mask for mask in masks))
+            resolved = set(hashed) | set(bitmapped)
+        elif bitmapped:
+            bits = self._live
+            for field in bitmapped:
+                bits = bits & self._registry[field].get(predicates[field], Bitmap())
+            candidates = self._books_of(bits)
+            resolved = set(bitmapped)
+        else:
+            candidates = (book for book in self._slots if book is not None)
+            resolved = set()
+
+        checks = []
+        for field, value in predicates.items():
+            if field in resolved:
+                continue
+            if field in self._registry:
+                checks.append((self._registry[field].key, value))
+            else:
+                checks.append((field_key(field), value))
+
+        return [book for book in candidates
+                if all(key(book) == value for key, value in checks)]
+
+    def _books_of(self, bits: Iterable[int]) -> List['Book']:
+        """Книги по множеству слотов"""
+        slots = self._slots
+        return [slots[slot] for slot in bits]
+
+    def evaluate(self, query: 'Q') -> Bitmap:
+        """Вычислить логический запрос Q как множество слотов"""
+        if query.op == 'and':
+            result = self.evaluate(query.children[0])
+            for child in query.children[1:]:
+                result = result & self.evaluate(child)
+            return result
+        if query.op == 'or':
+            result = self.evaluate(query.children[0])
+            for child in query.children[1:]:
+                result = result | self.evaluate(child)
+            return result
+        if query.op == 'not':
+            return self._live - self.evaluate(query.children[0])
+
+        index = self._registry.get(query.field)
+        if isinstance(index, BitmapIndex):
+            return index.bitmap(query.value)
+        if index is not None:
+            return Bitmap(index.postings(query.value))
+        key = field_key(query.field)
+        return Bitmap(slot for slot, book in enumerate(self._slots)
+                      if book is not None and key(book) == query.value)
+
+    def query(self, query: 'Q') -> List['Book']:
+        """Книги, удовлетворяющие логическому запросу"""
+        return self._books_of(self.evaluate(query))
+
+    def count(self, query: 'Q') -> int:
+        """Количество книг, удовлетворяющих запросу (без материализации)"""
+        return len(self.evaluate(query))
     
     def search_by_author(self, author: str) -> List['Book']:
         """Поиск книг по автору"""
-        return self._indexes['author'].get(author, [])
+        return self._registry['author'].lookup(author)
     
     def search_by_year(self, year: int) -> List['Book']:
         """Поиск книг по году"""
-        return self._indexes['year'].get(year, [])
+        return self._registry['year'].lookup(year)
     
     def search_by_genre(self, genre: str) -> List['Book']:
         """Поиск книг по жанру"""
-        return self._indexes['genre'].get(genre, [])
+        return self._registry['genre'].lookup(genre)
     
+    def book_at(self, slot: int) -> Optional['Book']:
+        """Книга в слоте (None для освобожденного слота)"""
+        return self._slots[slot]
+
+    def random_book(self, rng: 'Random') -> Optional['Book']:
+        """
+        Случайная книга каталога (None для пустого) - выбор среди занятых
+        слотов. Освобожденные слоты занимаются повторно, поэтому пустых
+        обычно немного; если подряд попадаются только пустые, книга
+        выбирается обходом занятых слотов
+        """
+        slots = self._slots
+        if not self._slot_of:
+            return None
+        for _ in range(RANDOM_ATTEMPTS):
+            book = slots[rng.randrange(len(slots))]
+            if book is not None:
+                return book
+        return next(islice(self.iter_slots(), rng.randrange(len(self._slot_of)), None))[1]
+
     def get_book_by_isbn(self, isbn: str) -> Optional['Book']:
         """Получить книгу по ISBN"""
-        return self._indexes['isbn'].get(isbn)
+        slot = self._slot_of.get(isbn)
+        return self._slots[slot] if slot is not None else None
     
     def get_change_log(self) -> List[str]:
         """Получить лог изменений"""
-        return self._change_log.copy()
\ No newline at end of file
+        return self._change_log.copy()
@@ -0,0 +1,191 @@
+"""
+Операции над библиотекой в виде словарей JSON.
+Общий исполнитель для HTTP-сервера и пакетного режима
+"""
+from typing import Any, Callable, Dict, List
+
+from .book import Book
+from .library import Library
+from .transactions import TransactionError
+
+OPERATIONS: Dict[str, Callable[..., Any]] = {}
+
+
+class OperationError(ValueError):
+    """Ошибка в параметрах операции"""
+
+
+def operation(name: str):
+    """Декоратор регистрации операции под именем name"""
+    def register(handler):
+        OPERATIONS[name] = handler
+        return handler
+    return register
+
+
+def find_books(library: Library, keyword: str = None, limit: int = None,
+               **filters) -> List[Book]:
+    """Книги по условиям поиска и/или ключевому слову"""
+    if keyword is not None:
+        books = list(library.search_by_keyword(keyword))
+        if filters:
+            matching = {book.isbn for book in library.search_books(**filters)}
+            books = [book for book in books if book.isbn in matching]
+    elif filters:
+        books = list(library.search_books(**filters))
+    else:
+        books = list(library.storage)  # Без условий - весь каталог
+    return books if limit is None else books[:int(limit)]
+
+
+def parse_filters(pairs: Dict[str, str]) -> Dict[str, Any]:
+    """Условия поиска из строковых значений (строка запроса, командная строка)"""
+    filters: Dict[str, Any] = {}
+    for name, value in pairs.items():
+        if name in ('year', 'limit'):
+            filters[name] = int(value)
+        elif name == 'available':
+            filters[name] = value.lower() in ('1', 'true', 'yes')
+        else:
+            filters[name] = value
+    return filters
+
+
+@operation('search')
+def _search(library: Library, **args) -> List[dict]:
+    return [book.to_dict() for book in find_books(library, **args)]
+
+
+@operation('rank')
+def _rank(library: Library, query: str, k: int = 20) -> List[dict]:
+    ranked = library.search_ranked(query, int(k))
+    return [{**book.to_dict(), 'score': score} for book, score in ranked.items()]
+
+
+@operation('duplicates')
+def _duplicates(library: Library, threshold: float = None) -> List[List[dict]]:
+    clusters = library.find_duplicates(float(threshold) if threshold is not None else None)
+    return [[book.to_dict() for book in cluster] for cluster in clusters]
+
+
+@operation('get')
+def _get(library: Library, isbn: str) -> dict:
+    book = library.get_book(isbn)
+    if book is None:
+        raise OperationError(f"Книга с ISBN {isbn} не найдена")
+    return book.to_dict()
+
+
+@operation('borrow')
+def _borrow(library: Library, isbn: str, patron: int = None) -> bool:
+    return library.borrow_book(isbn, patron=None if patron is None else int(patron))
+
+
+@operation('borrow_many')
+def _borrow_many(library: Library, isbns: List[str], patron: int = None) -> dict:
+    try:
+        with library.transaction() as tx:
+            tx.prefetch(isbns)
+            for isbn in isbns:
+                tx.borrow(isbn, None if patron is None else int(patron))
+    except TransactionError as error:
+        raise OperationError(f"Выдача отменена: {error}")
+    return tx.summary()
+
+
+@operation('return_many')
+def _return_many(library: Library, isbns: List[str]) -> dict:
+    try:
+        with library.transaction() as tx:
+            tx.prefetch(isbns)
+            for isbn in isbns:
+                tx.return_book(isbn)
+    except TransactionError as error:
+        raise OperationError(f"Возврат отменен: {error}")
+    return tx.summary()
+
+
+@operation('extend')
+def _extend(library: Library, isbn: str) -> bool:
+    return library.extend_loan(isbn)
+
+
+@operation('patron')
+def _patron(library: Library, patron: int) -> dict:
+    patron = int(patron)
+    if patron not in library.patrons:
+        raise OperationError(f"Читатель {patron} не найден")
+    return {'patron': patron, 'name': library.patrons.name(patron),
+            'category': library.patrons.category(patron).name,
+            'loans': [loan.to_dict() for loan in library.patrons.loans_of(patron)]}
+
+
+@operation('register')
+def _register(library: Library, name: str = None, category: str = 'standard') -> int:
+    return library.patrons.add_patron(name, category)
+
+
+@operation('return')
+def _return(library: Library, isbn: str) -> bool:
+    return library.return_book(isbn)
+
+
+def _book_from(data: Any) -> Book:
+    """Книга из объекта JSON"""
+    if not isinstance(data, dict):
+        raise OperationError("Книга должна быть объектом JSON")
+    return Book.from_dict(data)
+
+
+@operation('add')
+def _add(library: Library, book: dict) -> bool:
+    return library.add_book(_book_from(book), silent=True)
+
+
+@operation('bulk')
+def _bulk(library: Library, books: List[dict]) -> int:
+    if not isinstance(books, list):
+        raise OperationError("books должен быть списком книг")
+    return library.add_books([_book_from(book) for book in books])
+
+
+@operation('remove')
+def _remove(library: Library, isbn: str) -> bool:
+    return library.remove_book(isbn)
+
+
+@operation('verify')
+def _verify(library: Library, sample: int = None) -> dict:
+    problems = library.verify(int(sample) if sample is not None else None)
+    return {'ok': not problems, 'problems': problems}
+
+
+@operation('status')
+def _status(library: Library) -> dict:
+    total = len(library.storage)
+    available = library.storage.count_available()
+    return {'name': library.name, 'total': total, 'available': available,
+            'borrowed': total - available, 'patrons': len(library.patrons)}
+
+
+def execute(library: Library, request: dict) -> dict:
+    """
+    Выполнить операцию {"op": имя, ...параметры}.
+    Результат {"ok": true, "result": ...} или {"ok": false, "error": текст}
+    """
+    if not isinstance(request, dict):
+        return {'ok': False, 'error': "Операция должна быть объектом JSON"}
+    args = dict(request)
+    name = args.pop('op', None)
+    handler = OPERATIONS.get(name)
+    if handler is None:
+        return {'ok': False, 'error': f"Неизвестная операция: {name}"}
+    try:
+        return {'ok': True, 'result': handler(library, **args)}
+    except (OperationError, KeyError, TypeError, ValueError) as error:
+        return {'ok': False, 'error': str(error)}
+
+
+def execute_many(library: Library, requests: List[dict]) -> List[dict]:
+    """Выполнить операции по порядку; ошибка одной не прерывает остальные"""
+    return [execute(library, request) for request in requests]
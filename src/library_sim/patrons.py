@@ -0,0 +1,251 @@
+"""
+Читатели библиотеки: реестр с категориями и лимитами выдачи,
+активные выдачи каждого читателя и обратный индекс ISBN -> читатель.
+
+Читатель - номер в реестре, категория хранится в массиве по байту
+на читателя, поэтому реестр вмещает миллионы читателей. Выдачи хранятся
+только для читателей, у которых есть книги на руках
+"""
+from array import array
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Sequence, Set
+
+if TYPE_CHECKING:
+    from random import Random
+    from .book import Book
+
+DAY = 86400
+
+
+class PatronCategory(NamedTuple):
+    """Категория читателя и ее лимиты"""
+    name: str
+    max_loans: int       # Книг на руках одновременно
+    max_loan_days: int   # Сумма сроков выдачи (get_loan_period) книг на руках
+    max_extensions: int  # Продлений одной выдачи (если книгу можно продлевать)
+
+
+CATEGORIES = (
+    PatronCategory('standard', max_loans=5, max_loan_days=70, max_extensions=1),
+    PatronCategory('student', max_loans=3, max_loan_days=42, max_extensions=1),
+    PatronCategory('staff', max_loans=10, max_loan_days=210, max_extensions=2),
+)
+# Доли категорий в сгенерированной популяции
+POPULATION_WEIGHTS = (70, 25, 5)
+
+
+class Loan:
+    """Активная выдача книги"""
+    __slots__ = ('isbn', 'patron_id', 'due', 'period', 'extensions', 'position')
+
+    def __init__(self, isbn: str, patron_id: int, due: float, period: int, position: int):
+        self.isbn = isbn
+        self.patron_id = patron_id
+        self.due = due
+        self.period = period  # Срок выдачи книги в днях
+        self.extensions = 0
+        self.position = position  # Позиция в списке активных выдач
+
+    def to_dict(self) -> Dict:
+        """Конвертация в словарь"""
+        return {'isbn': self.isbn, 'patron': self.patron_id, 'due': self.due,
+                'extensions': self.extensions}
+
+
+class PatronRegistry:
+    """
+    Реестр читателей. Все операции по номеру читателя и по ISBN - O(1)
+    (по числу книг на руках у читателя, ограниченному лимитом)
+    """
+
+    def __init__(self, categories=CATEGORIES):
+        self.categories: List[PatronCategory] = list(categories)
+        self._category_codes = {category.name: code for code, category in enumerate(self.categories)}
+        self._category = array('B')            # Номер читателя -> код категории
+        self._names: Dict[int, str] = {}       # Только для читателей с заданным именем
+        self._loans: Dict[int, Set[str]] = {}  # Номер читателя -> ISBN книг на руках
+        self._borrower: Dict[str, Loan] = {}   # ISBN -> активная выдача
+        self._active: List[str] = []           # ISBN выданных книг (для случайного выбора)
+
+    def __len__(self) -> int:
+        return len(self._category)
+
+    def __contains__(self, patron_id: int) -> bool:
+        return isinstance(patron_id, int) and 0 <= patron_id < len(self._category)
+
+    def copy(self) -> 'PatronRegistry':
+        """Независимая копия реестра и выдач"""
+        registry = PatronRegistry(self.categories)
+        registry._category = array('B', self._category)
+        registry._names = dict(self._names)
+        registry._loans = {patron_id: set(isbns) for patron_id, isbns in self._loans.items()}
+        for isbn, loan in self._borrower.items():
+            copy = Loan(loan.isbn, loan.patron_id, loan.due, loan.period, loan.position)
+            copy.extensions = loan.extensions
+            registry._borrower[isbn] = copy
+        registry._active = list(self._active)
+        return registry
+
+    def _code(self, category: str) -> int:
+        code = self._category_codes.get(category)
+        if code is None:
+            raise ValueError(f"Категория должна быть одной из {list(self._category_codes)}")
+        return code
+
+    def add_patron(self, name: Optional[str] = None, category: str = 'standard') -> int:
+        """Зарегистрировать читателя, вернуть его номер"""
+        patron_id = len(self._category)
+        self._category.append(self._code(category))
+        if name is not None:
+            self._names[patron_id] = name
+        return patron_id
+
+    def add_patrons(self, count: int, rng: Optional['Random'] = None,
+                    weights=POPULATION_WEIGHTS) -> range:
+        """
+        Зарегистрировать count безымянных читателей; категории выбираются
+        случайно с весами weights. Вернуть диапазон их номеров
+        """
+        start = len(self._category)
+        if rng is None:
+            from random import Random
+            rng = Random()
+        codes = range(len(self.categories))
+        self._category.extend(rng.choices(codes, weights[:len(self.categories)], k=count))
+        return range(start, start + count)
+
+    def category(self, patron_id: int) -> PatronCategory:
+        """Категория читателя"""
+        self._require(patron_id)
+        return self.categories[self._category[patron_id]]
+
+    def name(self, patron_id: int) -> str:
+        """Имя читателя (для сгенерированных - по номеру)"""
+        self._require(patron_id)
+        return self._names.get(patron_id, f"Читатель {patron_id}")
+
+    def _require(self, patron_id: int) -> None:
+        if patron_id not in self:
+            raise KeyError(f"Читатель {patron_id} не найден")
+
+    def loans_of(self, patron_id: int) -> List[Loan]:
+        """Активные выдачи читателя"""
+        self._require(patron_id)
+        borrower = self._borrower
+        return [borrower[isbn] for isbn in self._loans.get(patron_id, ())]
+
+    def borrower_of(self, isbn: str) -> Optional[int]:
+        """Номер читателя, у которого книга (None, если не выдана читателю)"""
+        loan = self._borrower.get(isbn)
+        return loan.patron_id if loan is not None else None
+
+    def loan(self, isbn: str) -> Optional[Loan]:
+        """Активная выдача книги"""
+        return self._borrower.get(isbn)
+
+    def active_loans(self) -> int:
+        """Количество книг на руках у читателей"""
+        return len(self._active)
+
+    def random_loan(self, rng: 'Random') -> Optional[Loan]:
+        """Случайная активная выдача"""
+        if not self._active:
+            return None
+        return self._borrower[self._active[rng.randrange(len(self._active))]]
+
+    def check(self, patron_id: int, book: 'Book', pending: Sequence['Book'] = ()) -> Optional[str]:
+        """
+        Причина отказа в выдаче книги читателю (None, если выдать можно).
+        pending - книги, уже отобранные для выдачи этому читателю в той же операции
+        """
+        if patron_id not in self:
+            return f"Читатель {patron_id} не найден"
+        category = self.categories[self._category[patron_id]]
+        current = self.loans_of(patron_id)
+        count = len(current) + len(pending)
+        if count >= category.max_loans:
+            return f"У читателя уже {count} книг (лимит {category.max_loans})"
+        days = (sum(loan.period for loan in current) + sum(other.get_loan_period() for other in pending)
+                + book.get_loan_period())
+        if days > category.max_loan_days:
+            return f"Сумма сроков выдачи {days} дней превышает лимит {category.max_loan_days}"
+        return None
+
+    def checkout(self, patron_id: int, book: 'Book', now: float) -> Loan:
+        """Записать выдачу книги читателю (лимиты проверяются в check)"""
+        self._require(patron_id)
+        if book.isbn in self._borrower:
+            raise ValueError(f"Книга {book.isbn} уже выдана читателю {self.borrower_of(book.isbn)}")
+        period = book.get_loan_period()
+        loan = Loan(book.isbn, patron_id, now + period * DAY, period, len(self._active))
+        self._borrower[book.isbn] = loan
+        self._active.append(book.isbn)
+        self._loans.setdefault(patron_id, set()).add(book.isbn)
+        return loan
+
+    def checkin(self, isbn: str) -> Optional[Loan]:
+        """Закрыть выдачу книги, вернуть ее (None, если книга не была у читателя)"""
+        loan = self._borrower.pop(isbn, None)
+        if loan is None:
+            return None
+        # Удаление из списка активных выдач перестановкой последнего элемента
+        last = self._active.pop()
+        if last != isbn:
+            self._active[loan.position] = last
+            self._borrower[last].position = loan.position
+        isbns = self._loans[loan.patron_id]
+        isbns.discard(isbn)
+        if not isbns:
+            del self._loans[loan.patron_id]
+        return loan
+
+    def extend(self, isbn: str, book: 'Book') -> Loan:
+        """Продлить выдачу на срок выдачи книги"""
+        loan = self._borrower.get(isbn)
+        if loan is None:
+            raise ValueError(f"Книга {isbn} не выдана читателю")
+        if not book.can_be_extended():
+            raise ValueError(f"Книгу '{book.title}' нельзя продлевать")
+        category = self.categories[self._category[loan.patron_id]]
+        if loan.extensions >= category.max_extensions:
+            raise ValueError(f"Выдача уже продлена {loan.extensions} раз (лимит {category.max_extensions})")
+        loan.extensions += 1
+        loan.due += book.get_loan_period() * DAY
+        return loan
+
+    def verify(self, sample: Optional[int] = None, rng: Optional['Random'] = None) -> List[str]:
+        """
+        Согласованность выдач: список активных выдач, обратный индекс
+        ISBN -> выдача и книги на руках у читателей описывают одно и то же.
+        sample - проверка sample случайных активных выдач
+        """
+        problems = []
+        if len(self._active) != len(self._borrower):
+            problems.append(f"Активных выдач {len(self._active)}, в обратном индексе {len(self._borrower)}")
+        if sample is not None:
+            if rng is None:
+                from random import Random
+                rng = Random()
+            positions = [rng.randrange(len(self._active)) for _ in range(sample)] if self._active else []
+        else:
+            positions = range(len(self._active))
+            on_hands = sum(len(isbns) for isbns in self._loans.values())
+            if on_hands != len(self._borrower):
+                problems.append(f"Книг на руках {on_hands}, активных выдач {len(self._borrower)}")
+        for position in positions:
+            isbn = self._active[position]
+            loan = self._borrower.get(isbn)
+            if loan is None or loan.position != position:
+                problems.append(f"Выдача {isbn} не совпадает с позицией {position} в списке выдач")
+            elif isbn not in self._loans.get(loan.patron_id, ()):
+                problems.append(f"Книги {isbn} нет среди книг читателя {loan.patron_id}")
+        return problems
+
+    def stats(self) -> Dict:
+        """Состояние реестра"""
+        return {
+            'patrons': len(self),
+            'categories': {category.name: self._category.count(code)
+                           for code, category in enumerate(self.categories)},
+            'borrowing': len(self._loans),
+            'active_loans': len(self._active),
+        }
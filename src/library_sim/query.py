@@ -0,0 +1,65 @@
+"""
+Логические запросы к каталогу: условия поле=значение с И/ИЛИ/НЕ
+"""
+from typing import Any, Tuple
+
+from .my_collections import field_key
+
+
+class Q:
+    """
+    Условие запроса. Q(genre="фэнтези", type="FictionBook") - все поля
+    одновременно; условия объединяются операторами &, | и ~.
+    IndexDict вычисляет запрос битовыми операциями над индексами
+    """
+
+    __slots__ = ('op', 'field', 'value', 'children')
+
+    def __init__(self, **conditions: Any):
+        if not conditions:
+            raise ValueError("Q требует хотя бы одно условие поле=значение")
+        items = list(conditions.items())
+        if len(items) == 1:
+            self._set('eq', items[0][0], items[0][1], ())
+        else:
+            leaves = tuple(Q(**{field: value}) for field, value in items)
+            self._set('and', None, None, leaves)
+
+    def _set(self, op: str, field: Any, value: Any, children: Tuple['Q', ...]) -> None:
+        self.op = op
+        self.field = field
+        self.value = value
+        self.children = children
+
+    @classmethod
+    def _node(cls, op: str, *children: 'Q') -> 'Q':
+        node = cls.__new__(cls)
+        node._set(op, None, None, children)
+        return node
+
+    def __and__(self, other: 'Q') -> 'Q':
+        return self._node('and', self, other)
+
+    def __or__(self, other: 'Q') -> 'Q':
+        return self._node('or', self, other)
+
+    def __invert__(self) -> 'Q':
+        return self._node('not', self)
+
+    def matches(self, book) -> bool:
+        """Проверка условия на одной книге (без индексов)"""
+        if self.op == 'eq':
+            return field_key(self.field)(book) == self.value
+        if self.op == 'and':
+            return all(child.matches(book) for child in self.children)
+        if self.op == 'or':
+            return any(child.matches(book) for child in self.children)
+        return not self.children[0].matches(book)
+
+    def __repr__(self) -> str:
+        if self.op == 'eq':
+            return f"Q({self.field}={self.value!r})"
+        if self.op == 'not':
+            return f"~{self.children[0]!r}"
+        joiner = ' & ' if self.op == 'and' else ' | '
+        return '(' + joiner.join(repr(child) for child in self.children) + ')'
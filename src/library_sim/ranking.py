@@ -0,0 +1,277 @@
+"""
+Ранжированный поиск по каталогу: BM25 по полям книги с весами
+и отбор лучших K книг алгоритмом WAND.
+
+Обратный индекс хранит для каждого слова отсортированный массив
+номеров слотов и взвешенные частоты. Для каждого слова известна верхняя
+граница его вклада в оценку, поэтому книги, которые не могут попасть
+в первые K, пропускаются без подсчета оценки
+"""
+import heapq
+import math
+import re
+from array import array
+from bisect import bisect_left
+from heapq import merge
+from operator import attrgetter
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from .feed import ChangeEvent, ADDED, REMOVED
+
+if TYPE_CHECKING:
+    from .book import Book
+    from .my_collections import IndexDict
+
+# Поля, по которым Book.__contains__ ищет ключевое слово, и их веса
+FIELD_WEIGHTS = {'title': 3.0, 'author': 2.0, 'genre': 1.5, 'year': 0.5}
+MAX_EXPANSIONS = 64
+_END = 1 << 32  # Больше любого номера слота
+
+_WORD = re.compile(r'\w+')
+
+
+def tokenize(text) -> List[str]:
+    """Слова текста в нижнем регистре"""
+    return _WORD.findall(str(text).lower())
+
+
+class _Cursor:
+    """Позиция в списке слотов одного слова запроса"""
+    __slots__ = ('slots', 'freqs', 'position', 'slot', 'idf', 'bound')
+
+    def __init__(self, slots: array, freqs: array, idf: float, bound: float):
+        self.slots = slots
+        self.freqs = freqs
+        self.position = 0
+        self.slot = slots[0]  # Текущий слот, _END после конца списка
+        self.idf = idf
+        self.bound = bound
+
+    def move(self, position: int) -> None:
+        self.position = position
+        self.slot = self.slots[position] if position < len(self.slots) else _END
+
+
+class TextIndex:
+    """
+    Обратный индекс слов книг для ранжирования BM25.
+    Частота слова в книге - сумма весов полей, где оно встретилось,
+    длина книги - взвешенное число слов. При переданном indexes индекс
+    строится по IndexDict и поддерживается по его ленте изменений
+    (текстовые поля книги в каталоге не меняются, поэтому выдача и
+    возврат индекс не затрагивают)
+    """
+
+    def __init__(self, indexes: Optional['IndexDict'] = None,
+                 weights: Optional[Dict[str, float]] = None,
+                 k1: float = 1.2, b: float = 0.75):
+        self.weights = dict(FIELD_WEIGHTS if weights is None else weights)
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Tuple[array, array]] = {}  # Слово -> (слоты, частоты)
+        self._max_freq: Dict[str, float] = {}    # Слово -> наибольшая частота в книге
+        self._min_length: Dict[str, float] = {}  # Слово -> наименьшая длина книги с ним
+        self._lengths = array('f')  # Номер слота -> взвешенная длина книги
+        self._documents = 0
+        self._total_length = 0.0
+        self._vocabulary: List[str] = []  # Отсортированные слова для поиска по префиксу
+        self._new_words: List[str] = []
+        self._indexes = indexes
+        self._subscription = None
+        if indexes is not None:
+            for slot, book in indexes.iter_slots():
+                self.add(slot, book)
+            self._subscription = indexes.subscribe(self._apply, from_seq=indexes.feed.last_seq)
+
+    def close(self) -> None:
+        """Прекратить синхронизацию с каталогом"""
+        if self._subscription is not None:
+            self._subscription.close()
+            self._subscription = None
+
+    def __len__(self) -> int:
+        return self._documents
+
+    def _apply(self, events: List[ChangeEvent]) -> None:
+        """Применить пакет событий из ленты IndexDict"""
+        for event in events:
+            if event.kind == ADDED:
+                self.add(event.slot, event.book)
+            elif event.kind == REMOVED:
+                self.remove(event.slot, event.book)
+
+    def _terms(self, book: 'Book') -> Tuple[Dict[str, float], float]:
+        """Взвешенные частоты слов книги и ее длина"""
+        freqs: Dict[str, float] = {}
+        length = 0.0
+        for field, weight in self.weights.items():
+            words = tokenize(getattr(book, field, ''))
+            length += weight * len(words)
+            for word in words:
+                freqs[word] = freqs.get(word, 0.0) + weight
+        return freqs, length
+
+    def add(self, slot: int, book: 'Book') -> None:
+        """Проиндексировать книгу в слоте"""
+        freqs, length = self._terms(book)
+        if slot >= len(self._lengths):
+            self._lengths.extend([0.0] * (slot + 1 - len(self._lengths)))
+        self._lengths[slot] = length
+        self._documents += 1
+        self._total_length += length
+        # Частоты и длины хранятся в float32: границы считаются по уже округленным значениям
+        length = self._lengths[slot]
+        for word, freq in zip(freqs, array('f', freqs.values())):
+            entry = self._postings.get(word)
+            if entry is None:
+                self._postings[word] = (array('I', (slot,)), array('f', (freq,)))
+                self._max_freq[word] = freq
+                self._min_length[word] = length
+                self._new_words.append(word)
+                continue
+            slots, weights = entry
+            if slots[-1] < slot:
+                slots.append(slot)  # Обычный случай: новые книги получают больший номер
+                weights.append(freq)
+            else:
+                position = bisect_left(slots, slot)
+                slots.insert(position, slot)
+                weights.insert(position, freq)
+            if freq > self._max_freq[word]:
+                self._max_freq[word] = freq
+            if length < self._min_length[word]:
+                self._min_length[word] = length
+
+    def remove(self, slot: int, book: 'Book') -> None:
+        """
+        Убрать книгу из индекса. Границы слов (наибольшая частота,
+        наименьшая длина) не пересчитываются: оставшаяся граница не меньше
+        настоящей, поэтому отбор остается точным
+        """
+        freqs, length = self._terms(book)
+        for word in freqs:
+            entry = self._postings.get(word)
+            if entry is None:
+                continue
+            slots, weights = entry
+            position = bisect_left(slots, slot)
+            if position < len(slots) and slots[position] == slot:
+                del slots[position]
+                del weights[position]
+                if not slots:
+                    del self._postings[word]
+                    del self._max_freq[word]
+                    del self._min_length[word]
+        self._lengths[slot] = 0.0
+        self._documents -= 1
+        self._total_length -= length
+
+    def expand(self, word: str) -> List[str]:
+        """
+        Слова индекса, начинающиеся с word (само слово первым).
+        Ключевое слово ищется в книге как подстрока, поэтому запрос
+        "мир" находит и "мира"; число вариантов ограничено MAX_EXPANSIONS.
+        Числа (годы, номера) ищутся только целиком
+        """
+        if word.isdigit():
+            return [word] if word in self._postings else []
+        if self._new_words:
+            # Слияние с новыми словами; удаленные и повторно добавленные слова отсеиваются
+            vocabulary: List[str] = []
+            for candidate in merge(self._vocabulary, sorted(self._new_words)):
+                if candidate in self._postings and (not vocabulary or vocabulary[-1] != candidate):
+                    vocabulary.append(candidate)
+            self._vocabulary = vocabulary
+            self._new_words = []
+        words = [word] if word in self._postings else []
+        position = bisect_left(self._vocabulary, word)
+        while position < len(self._vocabulary) and len(words) < MAX_EXPANSIONS:
+            candidate = self._vocabulary[position]
+            if not candidate.startswith(word):
+                break
+            if candidate != word and candidate in self._postings:
+                words.append(candidate)
+            position += 1
+        return words
+
+    def _cursors(self, query: str, average: float) -> List[_Cursor]:
+        cursors = []
+        seen = set()
+        k1, b = self.k1, self.b
+        for term in tokenize(query):
+            for word in self.expand(term):
+                if word in seen:
+                    continue
+                seen.add(word)
+                slots, freqs = self._postings[word]
+                frequency = len(slots)
+                idf = math.log(1 + (self._documents - frequency + 0.5) / (frequency + 0.5))
+                # Оценка растет с частотой и убывает с длиной книги, поэтому граница -
+                # оценка при наибольшей частоте и наименьшей длине
+                top = self._max_freq[word]
+                norm = k1 * (1 - b + b * self._min_length[word] / average)
+                bound = idf * top * (k1 + 1) / (top + norm)
+                cursors.append(_Cursor(slots, freqs, idf, bound))
+        return cursors
+
+    def top_k(self, query: str, k: int = 20) -> List[Tuple[float, int]]:
+        """
+        Лучшие k пар (оценка, номер слота) по убыванию оценки.
+        При равных оценках раньше идут книги с меньшим номером слота
+        """
+        if k <= 0 or not self._documents:
+            return []
+        average = self._total_length / self._documents or 1.0
+        cursors = self._cursors(query, average)
+        k1, b = self.k1, self.b
+        lengths = self._lengths
+        heap: List[Tuple[float, int]] = []  # (оценка, -слот), минимум в корне
+
+        by_slot = attrgetter('slot')
+        while cursors:
+            cursors.sort(key=by_slot)
+            threshold = heap[0][0] if len(heap) == k else -1.0
+            # Опорная книга: первая, на которой сумма границ превышает порог
+            reach = 0.0
+            pivot = -1
+            for position, cursor in enumerate(cursors):
+                reach += cursor.bound
+                if reach > threshold:
+                    pivot = position
+                    break
+            if pivot < 0:
+                break  # Ни одна из оставшихся книг не попадет в первые k
+            slot = cursors[pivot].slot
+            if slot == _END:
+                break
+
+            if cursors[0].slot == slot:
+                norm = k1 * (1 - b + b * lengths[slot] / average)
+                score = 0.0
+                for cursor in cursors:
+                    if cursor.slot != slot:
+                        break
+                    freq = cursor.freqs[cursor.position]
+                    score += cursor.idf * freq * (k1 + 1) / (freq + norm)
+                    cursor.move(cursor.position + 1)
+                if len(heap) < k:
+                    heapq.heappush(heap, (score, -slot))
+                elif score > threshold:
+                    heapq.heapreplace(heap, (score, -slot))
+            else:
+                # Книги до опорной не наберут порог: сдвигаем курсор с наибольшей границей
+                cursor = max((cursor for cursor in cursors[:pivot] if cursor.slot < slot),
+                             key=attrgetter('bound'))
+                cursor.move(bisect_left(cursor.slots, slot, cursor.position))
+
+        return [(score, -negative) for score, negative in sorted(heap, key=lambda item: (-item[0], -item[1]))]
+
+
+def rank_books(books: Iterable['Book'], query: str, k: int = 20,
+               weights: Optional[Dict[str, float]] = None) -> List[Tuple['Book', float]]:
+    """Ранжирование произвольного набора книг (индекс строится на время запроса)"""
+    books = list(books)
+    index = TextIndex(weights=weights)
+    for slot, book in enumerate(books):
+        index.add(slot, book)
+    return [(books[slot], score) for score, slot in index.top_k(query, k)]
@@ -0,0 +1,30 @@
+"""
+Предсобранный начальный каталог библиотеки.
+Прототипы книг создаются один раз при импорте, новые библиотеки
+получают их дешевые копии
+"""
+from typing import List, Tuple
+
+from .book import Book, RegularBook, ReferenceBook, FictionBook
+
+SEED_CATALOG: Tuple[Tuple[type, tuple], ...] = (
+    # Обычные книги
+    (RegularBook, ("Война и мир", "Лев Толстой", 1869, "роман", "978-5-389-07435-1")),
+    (RegularBook, ("Преступление и наказание", "Федор Достоевский", 1866, "роман", "978-5-17-090665-5")),
+
+    # Справочные книги
+    (ReferenceBook, ("Толковый словарь", "Владимир Даль", 1880, "словарь", "978-5-17-090689-1", "словарь")),
+    (ReferenceBook, ("Большая энциклопедия", "Коллектив авторов", 2005, "энциклопедия", "978-5-17-080185-2", "энциклопедия")),
+
+    # Художественная литература
+    (FictionBook, ("Мастер и Маргарита", "Михаил Булгаков", 1967, "фэнтези", "978-5-17-067580-4", "проза")),
+    (FictionBook, ("1984", "Джордж Оруэлл", 1949, "антиутопия", "978-5-17-080115-9", "проза")),
+    (FictionBook, ("Гарри Поттер", "Джоан Роулинг", 1997, "фэнтези", "978-5-389-07429-0", "проза")),
+)
+
+_PROTOTYPES: Tuple[Book, ...] = tuple(cls(*args) for cls, args in SEED_CATALOG)
+
+
+def clone_seed_books() -> List[Book]:
+    """Независимые копии книг начального каталога (без вызова __init__)"""
+    return [prototype.copy() for prototype in _PROTOTYPES]
@@ -0,0 +1,288 @@
+"""
+HTTP/JSON сервер библиотеки на asyncio (только стандартная библиотека).
+
+Маршруты:
+    GET  /status                      - состояние каталога
+    GET  /search?author=..&keyword=.. - поиск (stream=1 или Accept:
+                                        application/x-ndjson - поток JSON Lines)
+    GET  /books/<isbn>                - книга по ISBN
+    GET  /patrons/<номер>             - читатель и его книги на руках
+    POST /borrow                      - {"isbn": ..., "patron": номер (необязательно)}
+    POST /return, /remove, /extend    - {"isbn": ...}
+    POST /borrow_many, /return_many   - {"isbns": [...], "patron": ...} - все или ничего
+    POST /patrons                     - {"name": ..., "category": ...} - регистрация
+    POST /add                         - {"book": {...}}
+    POST /bulk                        - {"books": [...]}
+    POST /batch                       - {"ops": [{"op": ..., ...}, ...]}
+
+Соединения HTTP/1.1 остаются открытыми (keep-alive), пока клиент
+не пришлет Connection: close
+"""
+import argparse
+import asyncio
+import json
+from typing import Dict, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from .library import Library
+from .ops import execute, execute_many, find_books, parse_filters
+
+NDJSON = 'application/x-ndjson'
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+# Маршрут POST -> операция, тело запроса передается ей как параметры
+POST_OPERATIONS = {
+    '/borrow': 'borrow', '/return': 'return', '/remove': 'remove',
+    '/add': 'add', '/bulk': 'bulk', '/extend': 'extend', '/patrons': 'register',
+    '/borrow_many': 'borrow_many', '/return_many': 'return_many',
+}
+
+
+class HttpError(Exception):
+    """Ошибка запроса с кодом ответа"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Request(NamedTuple):
+    """Разобранный HTTP-запрос"""
+    method: str
+    path: str
+    query: Dict[str, str]
+    version: str
+    headers: Dict[str, str]
+    body: bytes
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    def json(self):
+        try:
+            return json.loads(self.body or b'{}')
+        except ValueError as error:
+            raise HttpError(400, f"Некорректный JSON: {error}")
+
+
+class LibraryServer:
+    """Сервер поверх одной библиотеки; операции выполняются в цикле событий по очереди"""
+
+    def __init__(self, library: Library, host: str = '127.0.0.1', port: int = 8080,
+                 stream_chunk: int = 1000, max_body: int = 64 * 1024 * 1024):
+        self.library = library
+        self.host = host
+        self.port = port
+        self.stream_chunk = stream_chunk  # Строк JSON Lines в одном фрагменте ответа
+        self.max_body = max_body
+        self.requests = 0
+        self.connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        """Начать прием соединений (port=0 - любой свободный порт)"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HttpError as error:
+                    await self._send_json(writer, error.status, {'error': str(error)}, False)
+                    break
+                if request is None:
+                    break
+                self.requests += 1
+                keep_alive = request.keep_alive
+                try:
+                    await self._dispatch(request, writer, keep_alive)
+                except HttpError as error:
+                    await self._send_json(writer, error.status, {'error': str(error)}, keep_alive)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as error:
+                    # Ошибка обработчика не должна обрывать соединение без ответа
+                    await self._send_json(writer, 500, {'error': f"Внутренняя ошибка: {error!r}"},
+                                          keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    async def _readline(reader: asyncio.StreamReader) -> bytes:
+        """Строка запроса или заголовка; слишком длинная строка - ошибка 400"""
+        try:
+            return await reader.readline()
+        except (ValueError, asyncio.LimitOverrunError):
+            raise HttpError(400, "Слишком длинная строка заголовка")
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        line = await self._readline(reader)
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode('latin-1').split()
+        except ValueError:
+            raise HttpError(400, "Некорректная строка запроса")
+
+        headers = {}
+        while True:
+            line = await self._readline(reader)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length', 0) or 0)
+        except ValueError:
+            raise HttpError(400, "Некорректный Content-Length")
+        if length < 0:
+            raise HttpError(400, "Некорректный Content-Length")
+        if length > self.max_body:
+            raise HttpError(413, "Слишком большое тело запроса")
+        try:
+            body = await reader.readexactly(length) if length else b''
+        except asyncio.IncompleteReadError:
+            raise HttpError(400, "Тело запроса короче Content-Length")
+
+        parts = urlsplit(target)
+        return Request(method.upper(), unquote(parts.path), dict(parse_qsl(parts.query)),
+                       version, headers, body)
+
+    async def _dispatch(self, request: Request, writer: asyncio.StreamWriter,
+                        keep_alive: bool) -> None:
+        path, method = request.path.rstrip('/') or '/', request.method
+
+        if path == '/search':
+            self._require(method, 'GET')
+            query = dict(request.query)
+            stream = query.pop('stream', '') in ('1', 'true') or \
+                NDJSON in request.headers.get('accept', '')
+            try:
+                books = find_books(self.library, **parse_filters(query))
+            except (TypeError, ValueError) as error:
+                raise HttpError(400, str(error))
+            if stream:
+                await self._send_stream(writer, books, keep_alive)
+            else:
+                await self._send_json(writer, 200, {'books': [book.to_dict() for book in books]},
+                                      keep_alive)
+        elif path == '/status':
+            self._require(method, 'GET')
+            await self._send_result(writer, execute(self.library, {'op': 'status'}), keep_alive)
+        elif path.startswith('/books/'):
+            self._require(method, 'GET')
+            result = execute(self.library, {'op': 'get', 'isbn': path[len('/books/'):]})
+            status = 200 if result['ok'] else 404
+            await self._send_json(writer, status, result, keep_alive)
+        elif path.startswith('/patrons/'):
+            self._require(method, 'GET')
+            result = execute(self.library, {'op': 'patron', 'patron': path[len('/patrons/'):]})
+            status = 200 if result['ok'] else 404
+            await self._send_json(writer, status, result, keep_alive)
+        elif path == '/batch':
+            self._require(method, 'POST')
+            payload = request.json()
+            ops = payload.get('ops') if isinstance(payload, dict) else payload
+            if not isinstance(ops, list):
+                raise HttpError(400, "Ожидается список операций ops")
+            await self._send_json(writer, 200, {'results': execute_many(self.library, ops)},
+                                  keep_alive)
+        elif path in POST_OPERATIONS:
+            self._require(method, 'POST')
+            payload = request.json()
+            if not isinstance(payload, dict):
+                raise HttpError(400, "Ожидается объект JSON")
+            result = execute(self.library, {**payload, 'op': POST_OPERATIONS[path]})
+            await self._send_result(writer, result, keep_alive)
+        else:
+            raise HttpError(404, f"Неизвестный путь: {request.path}")
+
+    @staticmethod
+    def _require(method: str, expected: str) -> None:
+        if method != expected:
+            raise HttpError(405, f"Ожидается метод {expected}")
+
+    async def _send_result(self, writer: asyncio.StreamWriter, result: dict,
+                           keep_alive: bool) -> None:
+        await self._send_json(writer, 200 if result['ok'] else 400, result, keep_alive)
+
+    @staticmethod
+    def _head(status: int, content_type: str, keep_alive: bool,
+              extra: Tuple[str, ...] = ()) -> bytes:
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                 f"Content-Type: {content_type}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}", *extra]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload,
+                         keep_alive: bool) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        writer.write(self._head(status, 'application/json; charset=utf-8', keep_alive,
+                                (f"Content-Length: {len(body)}",)) + body)
+        await writer.drain()
+
+    async def _send_stream(self, writer: asyncio.StreamWriter, books, keep_alive: bool) -> None:
+        """Книги строками JSON Lines фрагментами chunked-кодирования"""
+        writer.write(self._head(200, f"{NDJSON}; charset=utf-8", keep_alive,
+                                ("Transfer-Encoding: chunked",)))
+        for start in range(0, len(books), self.stream_chunk):
+            chunk = "".join(json.dumps(book.to_dict(), ensure_ascii=False) + "\n"
+                            for book in books[start:start + self.stream_chunk]).encode('utf-8')
+            writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="HTTP/JSON сервер библиотеки")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--catalog', help="каталог JSON Lines (иначе начальный набор книг)")
+    args = parser.parse_args(argv)
+
+    library = Library.from_catalog(args.catalog) if args.catalog else Library()
+    library.verbose = False
+    server = LibraryServer(library, args.host, args.port)
+
+    async def run():
+        await server.start()
+        print(f"Сервер библиотеки '{library.name}' на http://{server.host}:{server.port}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
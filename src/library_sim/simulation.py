@@ -1,201 +1,423 @@
 """
-Модуль для псевдослучайной симуляции работы библиотеки
+Модуль для псевдослучайной симуляции работы библиотеки.
+
+Каждое событие разделено на выбор параметров (генератор случайных
+чисел запуска) и выполнение над библиотекой. Выбранные параметры
+записываются в SimulationTrace, которую можно воспроизвести без
+повторной генерации случайностей. Встроенные события регистрируются
+в реестре events.EVENT_HANDLERS наравне с пользовательскими
 """
 import random
-from typing import Optional
+import time
+from typing import Dict, Iterable, Optional, Sequence
 from .book import RegularBook, ReferenceBook, FictionBook
+from .events import (EVENT_HANDLERS, EventHandler, EventTable, FunctionEvent, RunState,
+                     handler_for, register_event)
 from .library import Library
+from .metrics import EventProfile
+from .trace import SimulationTrace
+
+# События согласно требованиям + демонстрация наследования
+EVENTS = (
+    "add_book",              # 1. Добавление новой книги
+    "remove_random_book",    # 2. Удаление случайной книги
+    "search_by_author",      # 3. Поиск по автору
+    "search_by_genre",       # 3. Поиск по жанру
+    "search_by_year",        # 3. Поиск по году
+    "update_index",          # 4. Обновление индекса
+    "try_nonexistent",       # 5. Попытка получить несуществующую книгу
+    "demonstrate_inheritance", # Дополнительно: демонстрация наследования
+)
+
+# Поиски, которые можно выполнять пакетами (run_simulation(batch=...))
+SEARCH_EVENTS = ("search_by_author", "search_by_genre", "search_by_year")
+
+# События читателей (при заданной популяции читателей)
+PATRON_EVENTS = (
+    "patron_borrow",         # Выдача книги читателю с учетом лимитов
+    "patron_return",         # Возврат книги читателем
+    "patron_loans",          # Запрос "какие книги у читателя"
+)
+
+# Данные для добавления книг (всех типов)
+NEW_BOOKS_DATA = (
+    # RegularBook
+    ("Собачье сердце", "Михаил Булгаков", 1925, "сатира", "978-5-389-06535-9", "regular"),
+    ("Улисс", "Джеймс Джойс", 1922, "модернизм", "978-5-389-03948-0", "regular"),
+
+    # ReferenceBook
+    ("Энциклопедия науки", "Коллектив авторов", 2020, "энциклопедия", "978-5-17-090699-0", "reference"),
+    ("Словарь русского языка", "Сергей Ожегов", 1990, "словарь", "978-5-17-080195-1", "reference"),
+
+    # FictionBook
+    ("О дивный новый мир", "Олдос Хаксли", 1932, "антиутопия", "978-5-17-090689-1", "fiction"),
+    ("Властелин колец", "Дж. Р. Р. Толкин", 1954, "фэнтези", "978-5-17-080185-2", "fiction"),
+)
+
+AUTHORS = ["Лев Толстой", "Михаил Булгаков", "Джордж Оруэлл", "Джоан Роулинг"]
+GENRES = ["роман", "фэнтези", "антиутопия", "сатира", "энциклопедия", "словарь"]
+YEARS = [1869, 1925, 1949, 1967, 1997, 2020]
+FAKE_ISBNS = ["000-0-00-000000-0", "999-9-99-999999-9", "123-4-56-789012-3"]
+
+
+# Выбор параметров события: (состояние, библиотека) -> аргументы для записи
+
+def _choose_add_book(state: RunState, library: Library) -> tuple:
+    new_books_data = state.data.setdefault("new_books_data", list(NEW_BOOKS_DATA))
+    if not new_books_data:
+        return ()
+    rng = state.rng
+    title, author, year, genre, isbn, book_type = entry = rng.choice(new_books_data)
+    new_books_data.remove(entry)
+    if book_type == "reference":
+        extra = rng.choice(["справочник", "энциклопедия", "словарь"])
+    elif book_type == "fiction":
+        extra = rng.choice(["проза", "поэзия", "драма"])
+    else:
+        extra = None
+    return (book_type, title, author, year, genre, isbn, extra)
+
+
+def _choose_remove_random_book(state: RunState, library: Library) -> tuple:
+    book = library.storage.random_book(state.rng)
+    return (book.isbn,) if book is not None else ()
+
+
+def _choose_inheritance(state: RunState, library: Library) -> tuple:
+    chosen = []
+    for book_type in (RegularBook, ReferenceBook, FictionBook):
+        books = library.get_books_by_type(book_type)
+        chosen.append(state.rng.choice(books).isbn if books else None)
+    return tuple(chosen)
+
+
+def _choose_patron_borrow(state: RunState, library: Library) -> tuple:
+    if len(library.patrons) == 0 or len(library.storage) == 0:
+        return ()
+    patron = state.rng.randrange(len(library.patrons))
+    return (patron, library.storage.random_book(state.rng).isbn)
+
+
+def _choose_patron_return(state: RunState, library: Library) -> tuple:
+    loan = library.patrons.random_loan(state.rng)
+    return (loan.isbn,) if loan is not None else ()
+
+
+def _choose_patron_loans(state: RunState, library: Library) -> tuple:
+    # Чаще спрашивают читатели, у которых есть книги
+    loan = library.patrons.random_loan(state.rng)
+    if loan is not None and state.rng.random() < 0.5:
+        return (loan.patron_id,)
+    if len(library.patrons) == 0:
+        return ()
+    return (state.rng.randrange(len(library.patrons)),)
+
+
+# Выполнение события с записанными аргументами
+
+def _apply_add_book(library: Library, *args) -> None:
+    """1. ДОБАВЛЕНИЕ НОВОЙ КНИГИ"""
+    if not args:
+        print("Нет новых книг для добавления")
+        return
+    book_type, title, author, year, genre, isbn, extra = args
+
+    # Создаем книгу нужного типа (демонстрация наследования)
+    if book_type == "reference":
+        new_book = ReferenceBook(title, author, year, genre, isbn, extra)
+    elif book_type == "fiction":
+        new_book = FictionBook(title, author, year, genre, isbn, extra)
+    else:
+        new_book = RegularBook(title, author, year, genre, isbn)
+    library.add_book(new_book)
+
+
+def _apply_remove_random_book(library: Library, *args) -> None:
+    """2. УДАЛЕНИЕ СЛУЧАЙНОЙ КНИГИ"""
+    if not args:
+        print("Нет книг для удаления")
+        return
+    library.remove_book(args[0])
+
+
+def _apply_search_by_author(library: Library, author: str) -> None:
+    """3. ПОИСК ПО АВТОРУ"""
+    results = library.search_books(author=author)
+    print(f"Поиск книг автора '{author}': найдено {len(results)} книг")
+    for i, book in enumerate(results[:2], 1):
+        print(f"  {i}. {book.title} ({book.__class__.__name__})")
+
+
+def _apply_search_by_genre(library: Library, genre: str) -> None:
+    """3. ПОИСК ПО ЖАНРУ"""
+    results = library.search_books(genre=genre)
+    print(f"Поиск книг жанра '{genre}': найдено {len(results)} книг")
+    for i, book in enumerate(results[:2], 1):
+        print(f"  {i}. {book.title} ({book.author})")
+
+
+def _apply_search_by_year(library: Library, year: int) -> None:
+    """3. ПОИСК ПО ГОДУ"""
+    results = library.search_books(year=year)
+    print(f"Поиск книг {year} года: найдено {len(results)} книг")
+    for i, book in enumerate(results[:2], 1):
+        print(f"  {i}. {book.title} ({book.genre})")
+
+
+def _apply_update_index(library: Library) -> None:
+    """4. ОБНОВЛЕНИЕ ИНДЕКСА"""
+    print("Обновление индексов библиотеки...")
+    # Показываем статистику индексов
+    indexes = library.indexes
+    stats = {
+        'Всего книг в индексе ISBN': len(indexes['isbn']),
+        'Уникальных авторов': len(indexes['author']),
+        'Уникальных годов издания': len(indexes['year']),
+        'Уникальных жанров': len(indexes['genre']),
+    }
+
+    print("Статистика индексов:")
+    for key, value in stats.items():
+        print(f"  {key}: {value}")
+
+    # Показываем последние изменения
+    change_log = indexes.get_change_log()
+    if change_log:
+        print(f"Последние изменения ({min(3, len(change_log))} из {len(change_log)}):")
+        for change in change_log[-3:]:
+            print(f"  - {change}")
+
+
+def _apply_try_nonexistent(library: Library, fake_isbn: str) -> None:
+    """5. ПОПЫТКА ПОЛУЧИТЬ НЕСУЩЕСТВУЮЩУЮ КНИГУ"""
+    print(f"Попытка выдать книгу с несуществующим ISBN {fake_isbn}")
+    library.borrow_book(fake_isbn)
+
+
+def _apply_inheritance(library: Library, regular: Optional[str], reference: Optional[str],
+                       fiction: Optional[str]) -> None:
+    """ДОПОЛНИТЕЛЬНО: ДЕМОНСТРАЦИЯ НАСЛЕДОВАНИЯ"""
+    print("Демонстрация наследования (разные типы книг):")
+
+    book = library.get_book(regular) if regular else None
+    if book is not None:
+        print(f"  Обычная книга: {book.title}")
+        print(f"    Срок выдачи: {book.get_loan_period()} дней, Можно продлить: {'да' if book.can_be_extended() else 'нет'}")
+
+    book = library.get_book(reference) if reference else None
+    if book is not None:
+        print(f"  Справочник: {book.title}")
+        print(f"    Срок выдачи: {book.get_loan_period()} дней, Можно продлить: {'да' if book.can_be_extended() else 'нет'}")
+        print(f"    Только в библиотеке: {'да' if book.is_for_library_use_only() else 'нет'}")
+
+    book = library.get_book(fiction) if fiction else None
+    if book is not None:
+        print(f"  Художественная: {book.title}")
+        print(f"    Срок выдачи: {book.get_loan_period()} дней, Можно продлить: {'да' if book.can_be_extended() else 'нет'}")
+        print(f"    Популярный жанр: {'да' if book.is_popular_genre() else 'нет'}")
 
 
-def run_simulation(steps: int = 20, seed: Optional[int] = None) -> None:
+def _apply_populate_patrons(library: Library, count: int, seed: int) -> None:
+    """РЕГИСТРАЦИЯ ЧИТАТЕЛЕЙ"""
+    patrons = library.patrons.add_patrons(count, random.Random(seed))
+    print(f"Зарегистрировано читателей: {len(patrons)}, всего: {len(library.patrons)}")
+
+
+def _apply_patron_borrow(library: Library, *args) -> None:
+    """ВЫДАЧА КНИГИ ЧИТАТЕЛЮ"""
+    if not args:
+        print("Нет читателей или книг для выдачи")
+        return
+    patron, isbn = args
+    print(f"{library.patrons.name(patron)} берет книгу {isbn}")
+    library.borrow_book(isbn, patron=patron)
+
+
+def _apply_patron_return(library: Library, *args) -> None:
+    """ВОЗВРАТ КНИГИ ЧИТАТЕЛЕМ"""
+    if not args:
+        print("Нет книг на руках у читателей")
+        return
+    library.return_book(args[0])
+
+
+def _apply_patron_loans(library: Library, *args) -> None:
+    """КНИГИ НА РУКАХ У ЧИТАТЕЛЯ"""
+    if not args:
+        print("Нет читателей")
+        return
+    books = library.patron_books(args[0])
+    print(f"У читателя {library.patrons.name(args[0])} книг на руках: {len(books)}")
+    for i, book in enumerate(books[:2], 1):
+        print(f"  {i}. {book.title}")
+
+
+class SearchEvent(EventHandler):
     """
-    Запуск псевдослучайной симуляции работы библиотеки
+    Поиск по полю каталога. За шаг выполняется batch поисков;
+    повторяющиеся в пакете значения ищутся один раз
     """
-    if seed is not None:
-        random.seed(seed)
-        print(f"\nНачало симуляции с seed={seed}")
-    else:
-        print(f"\nНачало случайной симуляции")
-    
-    library = Library(name="Симуляционная библиотека")
-    
-    # События согласно требованиям + демонстрация наследования
-    events = [
-        "add_book",              # 1. Добавление новой книги
-        "remove_random_book",    # 2. Удаление случайной книги
-        "search_by_author",      # 3. Поиск по автору
-        "search_by_genre",       # 3. Поиск по жанру
-        "search_by_year",        # 3. Поиск по году
-        "update_index",          # 4. Обновление индекса
-        "try_nonexistent",       # 5. Попытка получить несуществующую книгу
-        "demonstrate_inheritance", # Дополнительно: демонстрация наследования
-    ]
-    
-    # Данные для добавления книг (всех типов)
-    new_books_data = [
-        # RegularBook
-        ("Собачье сердце", "Михаил Булгаков", 1925, "сатира", "978-5-389-06535-9", "regular"),
-        ("Улисс", "Джеймс Джойс", 1922, "модернизм", "978-5-389-03948-0", "regular"),
-        
-        # ReferenceBook
-        ("Энциклопедия науки", "Коллектив авторов", 2020, "энциклопедия", "978-5-17-090699-0", "reference"),
-        ("Словарь русского языка", "Сергей Ожегов", 1990, "словарь", "978-5-17-080195-1", "reference"),
-        
-        # FictionBook
-        ("О дивный новый мир", "Олдос Хаксли", 1932, "антиутопия", "978-5-17-090689-1", "fiction"),
-        ("Властелин колец", "Дж. Р. Р. Толкин", 1954, "фэнтези", "978-5-17-080185-2", "fiction"),
-    ]
-    
-    authors = ["Лев Толстой", "Михаил Булгаков", "Джордж Оруэлл", "Джоан Роулинг"]
-    genres = ["роман", "фэнтези", "антиутопия", "сатира", "энциклопедия", "словарь"]
-    years = [1869, 1925, 1949, 1967, 1997, 2020]
-    
+
+    def __init__(self, name: str, field: str, values: Sequence, report, batch: int = 1,
+                 weight: float = 1.0):
+        self.name = name
+        self.field = field
+        self.values = tuple(values)
+        self.report = report  # Вывод результата одиночного поиска
+        self.batch = batch
+        self.weight = weight
+
+    def choose(self, state: RunState, library: Library) -> tuple:
+        choice = state.rng.choice
+        return tuple(choice(self.values) for _ in range(state.batch.get(self.name, self.batch)))
+
+    def apply(self, library: Library, *values) -> None:
+        if len(values) == 1:
+            self.report(library, values[0])
+            return
+        found = {value: len(library.search_books(**{self.field: value})) for value in set(values)}
+        print(f"Пакет из {len(values)} поисков по полю '{self.field}' ({len(found)} разных): "
+              f"найдено {sum(found[value] for value in values)} книг")
+
+    def operations(self, args: tuple) -> int:
+        return len(args)
+
+
+for _handler in (
+    FunctionEvent("add_book", _apply_add_book, _choose_add_book),
+    FunctionEvent("remove_random_book", _apply_remove_random_book, _choose_remove_random_book),
+    SearchEvent("search_by_author", "author", AUTHORS, _apply_search_by_author),
+    SearchEvent("search_by_genre", "genre", GENRES, _apply_search_by_genre),
+    SearchEvent("search_by_year", "year", YEARS, _apply_search_by_year),
+    FunctionEvent("update_index", _apply_update_index),
+    FunctionEvent("try_nonexistent", _apply_try_nonexistent,
+                  lambda state, library: (state.rng.choice(FAKE_ISBNS),)),
+    FunctionEvent("demonstrate_inheritance", _apply_inheritance, _choose_inheritance),
+    # Только в начале запуска с читателями, случайно не выбирается
+    FunctionEvent("populate_patrons", _apply_populate_patrons, weight=0),
+    FunctionEvent("patron_borrow", _apply_patron_borrow, _choose_patron_borrow, requires_patrons=True),
+    FunctionEvent("patron_return", _apply_patron_return, _choose_patron_return, requires_patrons=True),
+    FunctionEvent("patron_loans", _apply_patron_loans, _choose_patron_loans, requires_patrons=True),
+):
+    register_event(_handler, replace=True)
+
+
+def count_operations(trace: SimulationTrace) -> int:
+    """Число операций над библиотекой в записи (пакетные события - по операциям)"""
+    return sum(handler_for(event).operations(args) for event, args in trace)
+
+
+def _execute(library: Library, events: Iterable, steps: int, profiler: Optional[EventProfile]) -> None:
+    """Выполнить события (пары обработчик, аргументы) с выводом хода симуляции"""
     print("\n" + "="*60)
     print("НАЧАЛО СИМУЛЯЦИИ БИБЛИОТЕКИ")
     print("="*60)
 
-    print(library.books.get_available_books())
-    
-    for step in range(1, steps + 1):
-        
-        
-        event = random.choice(events)
-        print("\nСобытие: " + event)
-
+    if len(library.books) <= 20:
+        print(library.books.get_available_books())
+    else:
+        print(f"Доступно книг: {library.storage.count_available()} из {len(library.books)}")
 
+    for step, (handler, args) in enumerate(events, 1):
+        started = time.perf_counter()
+        print("\nСобытие: " + handler.name)
         print(f"Шаг {step}/{steps}: ", end="")
-        
-        if event == "add_book":
-            """1. ДОБАВЛЕНИЕ НОВОЙ КНИГИ"""
-            if new_books_data:
-                title, author, year, genre, isbn, book_type = random.choice(new_books_data)
-                
-                # Создаем книгу нужного типа (демонстрация наследования)
-                if book_type == "reference":
-                    ref_type = random.choice(["справочник", "энциклопедия", "словарь"])
-                    new_book = ReferenceBook(title, author, year, genre, isbn, ref_type)
-                elif book_type == "fiction":
-                    lit_genre = random.choice(["проза", "поэзия", "драма"])
-                    new_book = FictionBook(title, author, year, genre, isbn, lit_genre)
-                else:
-                    new_book = RegularBook(title, author, year, genre, isbn)
-                
-                library.add_book(new_book)
-                new_books_data.remove((title, author, year, genre, isbn, book_type))
-            else:
-                print("Нет новых книг для добавления")
-                
-        elif event == "remove_random_book":
-            """2. УДАЛЕНИЕ СЛУЧАЙНОЙ КНИГИ"""
-            if len(library.books) > 0:
-                book_to_remove = random.choice(list(library.books))
-                library.remove_book(book_to_remove.isbn)
-            else:
-                print("Нет книг для удаления")
-                
-        elif event == "search_by_author":
-            """3. ПОИСК ПО АВТОРУ"""
-            author = random.choice(authors)
-            results = library.search_books(author=author)
-            print(f"Поиск книг автора '{author}': найдено {len(results)} книг")
-            if results:
-                for i, book in enumerate(results[:2], 1):
-                    print(f"  {i}. {book.title} ({book.__class__.__name__})")
-                    
-        elif event == "search_by_genre":
-            """3. ПОИСК ПО ЖАНРУ"""
-            genre = random.choice(genres)
-            results = library.search_books(genre=genre)
-            print(f"Поиск книг жанра '{genre}': найдено {len(results)} книг")
-            if results:
-                for i, book in enumerate(results[:2], 1):
-                    print(f"  {i}. {book.title} ({book.author})")
-                    
-        elif event == "search_by_year":
-            """3. ПОИСК ПО ГОДУ"""
-            year = random.choice(years)
-            results = library.search_books(year=year)
-            print(f"Поиск книг {year} года: найдено {len(results)} книг")
-            if results:
-                for i, book in enumerate(results[:2], 1):
-                    print(f"  {i}. {book.title} ({book.genre})")
-                    
-        elif event == "update_index":
-            """4. ОБНОВЛЕНИЕ ИНДЕКСА"""
-            print("Обновление индексов библиотеки...")
-            # Показываем статистику индексов
-            indexes = library.indexes
-            stats = {
-                'Всего книг в индексе ISBN': len(indexes['isbn']),
-                'Уникальных авторов': len(indexes['author']),
-                'Уникальных годов издания': len(indexes['year']),
-                'Уникальных жанров': len(indexes['genre']),
-            }
-            
-            print("Статистика индексов:")
-            for key, value in stats.items():
-                print(f"  {key}: {value}")
-            
-            # Показываем последние изменения
-            change_log = indexes.get_change_log()
-            if change_log:
-                print(f"Последние изменения ({min(3, len(change_log))} из {len(change_log)}):")
-                for change in change_log[-3:]:
-                    print(f"  - {change}")
-                    
-        elif event == "try_nonexistent":
-            """5. ПОПЫТКА ПОЛУЧИТЬ НЕСУЩЕСТВУЮЩУЮ КНИГУ"""
-            fake_isbns = ["000-0-00-000000-0", "999-9-99-999999-9", "123-4-56-789012-3"]
-            fake_isbn = random.choice(fake_isbns)
-            print(f"Попытка выдать книгу с несуществующим ISBN {fake_isbn}")
-            library.borrow_book(fake_isbn)
-            
-        elif event == "demonstrate_inheritance":
-            """ДОПОЛНИТЕЛЬНО: ДЕМОНСТРАЦИЯ НАСЛЕДОВАНИЯ"""
-            print("Демонстрация наследования (разные типы книг):")
-            
-            # Показываем книги по типам
-            regular_books = library.get_books_by_type(RegularBook)
-            reference_books = library.get_books_by_type(ReferenceBook)
-            fiction_books = library.get_books_by_type(FictionBook)
-            
-            if regular_books:
-                book = random.choice(regular_books)
-                print(f"  Обычная книга: {book.title}")
-                print(f"    Срок выдачи: {book.get_loan_period()} дней, Можно продлить: {'да' if book.can_be_extended() else 'нет'}")
-            
-            if reference_books:
-                book = random.choice(reference_books)
-                print(f"  Справочник: {book.title}")
-                print(f"    Срок выдачи: {book.get_loan_period()} дней, Можно продлить: {'да' if book.can_be_extended() else 'нет'}")
-                print(f"    Только в библиотеке: {'да' if book.is_for_library_use_only() else 'нет'}")
-            
-            if fiction_books:
-                book = random.choice(fiction_books)
-                print(f"  Художественная: {book.title}")
-                print(f"    Срок выдачи: {book.get_loan_period()} дней, Можно продлить: {'да' if book.can_be_extended() else 'нет'}")
-                print(f"    Популярный жанр: {'да' if book.is_popular_genre() else 'нет'}")
-    
+        handler.apply(library, *args)
+        if profiler is not None:
+            profiler.add(handler.name, time.perf_counter() - started, handler.operations(args))
+
     print("\n" + "="*60)
     print("ЗАВЕРШЕНИЕ СИМУЛЯЦИИ")
     print("="*60)
-    
+
+    if profiler is not None:
+        print("\nЗатраты по типам событий:")
+        print(profiler.report())
+
     # Финальный статус
     library.print_status()
-    
+
     # Дополнительно: показываем итоговую статистику по типам
     print("\nИтоговая статистика по типам книг:")
     print("-" * 40)
     regular_count = len(library.get_books_by_type(RegularBook))
     reference_count = len(library.get_books_by_type(ReferenceBook))
     fiction_count = len(library.get_books_by_type(FictionBook))
-    
+
     print(f"Обычные книги: {regular_count}")
     print(f"Справочные книги: {reference_count}")
     print(f"Художественная литература: {fiction_count}")
     print(f"Всего: {regular_count + reference_count + fiction_count}")
 
 
+def run_simulation(steps: int = 20, seed: Optional[int] = None,
+                   library: Optional[Library] = None, profile: bool = False,
+                   patrons: int = 0, events: Optional[Iterable[str]] = None,
+                   weights: Optional[Dict[str, float]] = None,
+                   batch: Optional[Dict[str, int]] = None) -> SimulationTrace:
+    """
+    Запуск псевдослучайной симуляции работы библиотеки.
+    Если library не передана, создается новая библиотека с начальным набором книг.
+    Случайности берутся из собственного random.Random(seed), глобальный
+    random не затрагивается. Возвращает запись сгенерированных событий.
+    profile=True печатает затраты времени по типам событий и пропускную способность.
+    patrons > 0 - перед шагами регистрируется столько читателей, и к событиям
+    добавляются выдачи, возвраты и запросы читателей.
+    events - имена событий (по умолчанию все зарегистрированные), weights -
+    веса вместо заданных обработчиками, batch - размеры пакетов событий
+    """
+    if seed is not None:
+        print(f"\nНачало симуляции с seed={seed}")
+    else:
+        print(f"\nНачало случайной симуляции")
+
+    if library is None:
+        library = Library(name="Симуляционная библиотека")
+    state = RunState(random.Random(seed))
+    state.batch.update(batch or {})
+    trace = SimulationTrace(seed)
+
+    if events is None:
+        handlers = [handler for handler in EVENT_HANDLERS.values()
+                    if patrons or not handler.requires_patrons]
+    else:
+        handlers = [handler_for(name) for name in events]
+    table = EventTable(handlers, weights)
+
+    def generate():
+        if patrons:
+            # Регистрация читателей - отдельное событие записи, чтобы воспроизведение
+            # получило ту же популяцию
+            args = (patrons, state.rng.getrandbits(32))
+            trace.append("populate_patrons", args)
+            yield EVENT_HANDLERS["populate_patrons"], args
+        sample = table.sample
+        rng = state.rng
+        for _ in range(steps):
+            handler = sample(rng)
+            args = handler.choose(state, library)
+            trace.append(handler.name, args)
+            yield handler, args
+
+    _execute(library, generate(), steps + bool(patrons), EventProfile() if profile else None)
+    return trace
+
+
+def replay_simulation(trace: SimulationTrace, library: Optional[Library] = None,
+                      profile: bool = False) -> Library:
+    """
+    Повторное выполнение записанных событий над библиотекой
+    (по умолчанию новой, с начальным набором книг). Возвращает библиотеку.
+    Пользовательские события записи должны быть зарегистрированы
+    """
+    print(f"\nВоспроизведение симуляции: {len(trace)} событий")
+    if library is None:
+        library = Library(name="Симуляционная библиотека")
+    events = ((handler_for(event), args) for event, args in trace)
+    _execute(library, events, len(trace), EventProfile() if profile else None)
+    return library
+
+
 if __name__ == "__main__":
     print("Запуск тестовой симуляции...")
-    run_simulation(steps=15, seed=42)
\ No newline at end of file
+    run_simulation(steps=15, seed=42)
@@ -0,0 +1,721 @@
+"""
+Хранилища каталога: общий интерфейс, хранение в памяти и SQLite
+"""
+import threading
+from abc import ABC, abstractmethod
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .book import Book
+from .feed import ChangeEvent, ADDED, REMOVED, BORROWED, RETURNED
+from .my_collections import BookCollection, IndexDict, field_key
+from .query import Q
+
+if TYPE_CHECKING:
+    import sqlite3
+    from random import Random
+    from .ranking import TextIndex
+    from .sync import CatalogDigest
+
+
+class StorageBackend(ABC):
+    """
+    Абстрактное хранилище книг библиотеки.
+    Library работает с каталогом только через этот интерфейс
+    """
+
+    @abstractmethod
+    def add(self, book: Book) -> None:
+        """Добавить книгу"""
+
+    def add_many(self, books: Iterable[Book]) -> None:
+        """Добавить несколько книг"""
+        for book in books:
+            self.add(book)
+
+    @abstractmethod
+    def remove(self, book: Book) -> bool:
+        """Удалить книгу"""
+
+    def remove_many(self, books: Iterable[Book]) -> int:
+        """Удалить несколько книг, вернуть число удаленных"""
+        return sum(1 for book in books if self.remove(book))
+
+    @abstractmethod
+    def get(self, isbn: str) -> Optional[Book]:
+        """Получить книгу по ISBN"""
+
+    def get_many(self, isbns: Iterable[str]) -> Dict[str, Book]:
+        """Книги по списку ISBN (отсутствующие пропускаются)"""
+        books = {}
+        for isbn in isbns:
+            book = self.get(isbn)
+            if book is not None:
+                books[isbn] = book
+        return books
+
+    def update(self, book: Book) -> None:
+        """Сохранить изменение состояния книги (выдача/возврат)"""
+
+    def update_many(self, books: Iterable[Book]) -> None:
+        """Сохранить изменения состояния нескольких книг"""
+        for book in books:
+            self.update(book)
+
+    @abstractmethod
+    def __contains__(self, isbn: str) -> bool:
+        """Есть ли книга с таким ISBN"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Количество книг"""
+
+    @abstractmethod
+    def __iter__(self) -> Iterator[Book]:
+        """Итерация по книгам в порядке добавления"""
+
+    def nth(self, index: int) -> Book:
+        """Книга по порядковому номеру (отрицательный - с конца)"""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Номер книги вне каталога")
+        return next(islice(iter(self), index, None))
+
+    def random_book(self, rng: 'Random') -> Optional[Book]:
+        """Случайная книга каталога (None для пустого)"""
+        count = len(self)
+        return self.nth(rng.randrange(count)) if count else None
+
+    @abstractmethod
+    def search(self, **predicates: Any) -> List[Book]:
+        """Поиск книг по условиям поле=значение (все условия одновременно)"""
+
+    def search_by_keyword(self, keyword: str) -> List[Book]:
+        """Поиск книг по ключевому слову"""
+        return [book for book in self if keyword in book]
+
+    def search_ranked(self, query: str, k: int = 20,
+                      weights: Optional[Dict[str, float]] = None) -> List[Tuple[Book, float]]:
+        """
+        Лучшие k книг по релевантности BM25 к запросу (пары книга, оценка).
+        По умолчанию индекс слов строится на время запроса
+        """
+        from .ranking import rank_books
+        return rank_books(self, query, k, weights)
+
+    def digest(self, bits: Optional[int] = None) -> 'CatalogDigest':
+        """
+        Дерево хэшей каталога для сравнения с другим каталогом.
+        По умолчанию строится обходом всех книг
+        """
+        from .sync import CatalogDigest, DEFAULT_BITS
+        return CatalogDigest.of_books(self, bits or DEFAULT_BITS)
+
+    def count_available(self) -> int:
+        """Количество доступных книг"""
+        return sum(1 for book in self if book.is_available)
+
+    def verify(self, sample: Optional[int] = None, rng: Optional['Random'] = None) -> List[str]:
+        """
+        Проверка согласованности хранилища (пустой список - все в порядке).
+        По умолчанию полная проверка - обход каталога: ISBN не повторяются,
+        их число совпадает с len; sample - только дешевые проверки
+        """
+        if sample is not None:
+            return []
+        problems = []
+        seen = set()
+        for book in self:
+            if book.isbn in seen:
+                problems.append(f"ISBN {book.isbn} встречается в каталоге дважды")
+            seen.add(book.isbn)
+        if len(seen) != len(self):
+            problems.append(f"В каталоге {len(seen)} разных ISBN, а len - {len(self)}")
+        return problems
+
+    def query(self, query: Q) -> List[Book]:
+        """Книги, удовлетворяющие логическому запросу"""
+        return [book for book in self if query.matches(book)]
+
+    @property
+    def books(self) -> Union[BookCollection, 'StorageBookView']:
+        """Каталог в виде коллекции книг"""
+        return StorageBookView(self)
+
+    @property
+    def indexes(self) -> Union[IndexDict, 'StorageIndexView']:
+        """Каталог в виде индексной коллекции"""
+        return StorageIndexView(self)
+
+
+class MemoryStorage(StorageBackend):
+    """Хранилище в памяти на BookCollection и IndexDict"""
+
+    def __init__(self, books: BookCollection = None, indexes: IndexDict = None):
+        self._books = books if books is not None else BookCollection()
+        self._indexes = indexes if indexes is not None else IndexDict()
+        self._text: Optional['TextIndex'] = None  # Строится при первом ранжированном поиске
+        self._digest: Optional['CatalogDigest'] = None  # Строится при первом сравнении каталогов
+
+    @property
+    def books(self) -> BookCollection:
+        return self._books
+
+    @property
+    def indexes(self) -> IndexDict:
+        return self._indexes
+
+    def add(self, book: Book) -> None:
+        self._books.add(book)
+        self._indexes.add_book(book)
+
+    def remove(self, book: Book) -> bool:
+        self._books.remove(book)
+        return self._indexes.remove_book(book)
+
+    def remove_many(self, books: Iterable[Book]) -> int:
+        books = list(books)
+        self._books.remove_many(books)
+        return sum(1 for book in books if self._indexes.remove_book(book))
+
+    def get(self, isbn: str) -> Optional[Book]:
+        return self._indexes.get_book_by_isbn(isbn)
+
+    def update(self, book: Book) -> None:
+        self._indexes.update_book(book)
+
+    def update_many(self, books: Iterable[Book]) -> None:
+        self._indexes.update_many(books)
+
+    def __contains__(self, isbn: str) -> bool:
+        return isbn in self._indexes
+
+    def __len__(self) -> int:
+        return len(self._books)
+
+    def __iter__(self) -> Iterator[Book]:
+        return iter(self._books)
+
+    def random_book(self, rng: 'Random') -> Optional[Book]:
+        """Выбор по слотам IndexDict: коллекция книг не уплотняется"""
+        return self._indexes.random_book(rng)
+
+    def search(self, **predicates: Any) -> List[Book]:
+        return self._indexes.search(**predicates)
+
+    def search_by_keyword(self, keyword: str) -> List[Book]:
+        return list(self._books.search_by_keyword(keyword))
+
+    def search_ranked(self, query: str, k: int = 20,
+                      weights: Optional[Dict[str, float]] = None) -> List[Tuple[Book, float]]:
+        """Индекс слов поддерживается по ленте изменений IndexDict"""
+        from .ranking import TextIndex
+        if self._text is None or (weights is not None and weights != self._text.weights):
+            if self._text is not None:
+                self._text.close()
+            self._text = TextIndex(self._indexes, weights)
+        book_at = self._indexes.book_at
+        return [(book_at(slot), score) for score, slot in self._text.top_k(query, k)]
+
+    def digest(self, bits: Optional[int] = None) -> 'CatalogDigest':
+        """Дерево хэшей поддерживается по ленте изменений IndexDict"""
+        from .sync import CatalogDigest, DEFAULT_BITS
+        bits = bits or DEFAULT_BITS
+        if self._digest is None or self._digest.bits != bits:
+            if self._digest is not None:
+                self._digest.close()
+            self._digest = CatalogDigest(self._indexes, bits)
+        return self._digest
+
+    def count_available(self) -> int:
+        return self._indexes.count(Q(available=True))
+
+    def verify(self, sample: Optional[int] = None, rng: Optional['Random'] = None) -> List[str]:
+        """Индексы и совпадение коллекции книг с таблицей ISBN: одни и те же объекты"""
+        problems = self._indexes.verify(sample, rng)
+        if len(self._books) != len(self._indexes):
+            problems.append(f"В коллекции {len(self._books)} книг, в индексах {len(self._indexes)}")
+        if sample is not None:
+            if rng is None:
+                from random import Random
+                rng = Random()
+            for _ in range(sample if len(self._indexes) else 0):
+                book = self._indexes.random_book(rng)
+                if book not in self._books:
+                    problems.append(f"Книги {book.isbn} из индексов нет в коллекции")
+            return problems
+        if len({book.isbn for book in self._books}) != len(self._books):
+            problems.append("В коллекции есть повторяющиеся ISBN")
+        get = self._indexes.get_book_by_isbn
+        for book in self._books:
+            if get(book.isbn) is not book:
+                problems.append(f"Книга {book.isbn} коллекции не совпадает с книгой индексов")
+        return problems
+
+    def query(self, query: Q) -> List[Book]:
+        return self._indexes.query(query)
+
+
+class SQLiteStorage(StorageBackend):
+    """
+    Хранилище во встроенной базе SQLite (журнал WAL).
+    У каждого потока свое соединение
+    """
+
+    _COLUMNS = "isbn, title, author, year, genre, type, is_borrowed, extra"
+    _BASE_FIELDS = ('title', 'author', 'year', 'genre', 'isbn', 'is_borrowed', 'type')
+    # Поле для search -> выражение SQL
+    _SQL_FIELDS = {
+        'isbn': 'isbn', 'title': 'title', 'author': 'author', 'year': 'year',
+        'genre': 'genre', 'type': 'type',
+        'reference_type': "json_extract(extra, '$.reference_type')",
+        'literary_genre': "json_extract(extra, '$.literary_genre')",
+        'available': "(is_borrowed = 0)",
+    }
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connections: List['sqlite3.Connection'] = []
+        self._lock = threading.Lock()
+        self._create_schema()
+
+    def _connection(self) -> 'sqlite3.Connection':
+        """Соединение текущего потока"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            import sqlite3
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Юникодный lower, как в Book.__contains__
+            conn.create_function("py_lower", 1, lambda s: s.lower() if s is not None else None,
+                                 deterministic=True)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _create_schema(self) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS books ("
+                "isbn TEXT PRIMARY KEY, title TEXT NOT NULL, author TEXT NOT NULL, "
+                "year INTEGER NOT NULL, genre TEXT NOT NULL, type TEXT NOT NULL, "
+                "is_borrowed INTEGER NOT NULL DEFAULT 0, extra TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_books_author ON books(author)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_books_year ON books(year)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_books_genre ON books(genre)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_books_borrowed ON books(is_borrowed)")
+
+    def close(self) -> None:
+        """Закрыть все соединения"""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    @classmethod
+    def _to_row(cls, book: Book) -> tuple:
+        import json
+        data = book.to_dict()
+        extra = {k: v for k, v in data.items() if k not in cls._BASE_FIELDS}
+        return (book.isbn, book.title, book.author, book.year, book.genre,
+                data['type'], int(not book.is_available),
+                json.dumps(extra, ensure_ascii=False) if extra else None)
+
+    @staticmethod
+    def _from_row(row: tuple) -> Book:
+        isbn, title, author, year, genre, book_type, is_borrowed, extra = row
+        data: Dict = {
+            'title': title, 'author': author, 'year': year, 'genre': genre,
+            'isbn': isbn, 'type': book_type, 'is_borrowed': bool(is_borrowed),
+        }
+        if extra:
+            import json
+            data.update(json.loads(extra))
+        return Book.from_dict(data)
+
+    def _select(self, where: str = "", params: tuple = ()) -> List[Book]:
+        sql = f"SELECT {self._COLUMNS} FROM books {where} ORDER BY rowid"
+        rows = self._connection().execute(sql, params).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def add(self, book: Book) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute(f"INSERT INTO books ({self._COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         self._to_row(book))
+
+    def add_many(self, books: Iterable[Book]) -> None:
+        conn = self._connection()
+        with conn:
+            conn.executemany(f"INSERT INTO books ({self._COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                             (self._to_row(book) for book in books))
+
+    def remove(self, book: Book) -> bool:
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute("DELETE FROM books WHERE isbn = ?", (book.isbn,))
+        return cursor.rowcount > 0
+
+    def remove_many(self, books: Iterable[Book]) -> int:
+        """Все удаления в одной транзакции SQLite"""
+        conn = self._connection()
+        with conn:
+            cursor = conn.executemany("DELETE FROM books WHERE isbn = ?", ((book.isbn,) for book in books))
+        return cursor.rowcount
+
+    def get(self, isbn: str) -> Optional[Book]:
+        row = self._connection().execute(
+            f"SELECT {self._COLUMNS} FROM books WHERE isbn = ?", (isbn,)).fetchone()
+        return self._from_row(row) if row else None
+
+    def get_many(self, isbns: Iterable[str]) -> Dict[str, Book]:
+        """Книги по списку ISBN (отсутствующие пропускаются)"""
+        isbns = list(isbns)
+        conn = self._connection()
+        result = {}
+        # Ограничение SQLite на число параметров запроса
+        for start in range(0, len(isbns), 500):
+            chunk = isbns[start:start + 500]
+            marks = ", ".join("?" * len(chunk))
+            for row in conn.execute(f"SELECT {self._COLUMNS} FROM books WHERE isbn IN ({marks})", chunk):
+                book = self._from_row(row)
+                result[book.isbn] = book
+        return result
+
+    def update(self, book: Book) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute("UPDATE books SET is_borrowed = ? WHERE isbn = ?",
+                         (int(not book.is_available), book.isbn))
+
+    def update_many(self, books: Iterable[Book]) -> None:
+        """Все изменения в одной транзакции SQLite"""
+        conn = self._connection()
+        with conn:
+            conn.executemany("UPDATE books SET is_borrowed = ? WHERE isbn = ?",
+                             ((int(not book.is_available), book.isbn) for book in books))
+
+    def __contains__(self, isbn: str) -> bool:
+        row = self._connection().execute(
+            "SELECT 1 FROM books WHERE isbn = ?", (isbn,)).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM books").fetchone()[0]
+
+    def __iter__(self) -> Iterator[Book]:
+        cursor = self._connection().execute(f"SELECT {self._COLUMNS} FROM books ORDER BY rowid")
+        for row in cursor:
+            yield self._from_row(row)
+
+    def search(self, **predicates: Any) -> List[Book]:
+        """
+        Условия по колонкам и полям подклассов выполняются в SQL,
+        остальные проверяются по атрибутам прочитанных книг
+        """
+        predicates = {field: value for field, value in predicates.items() if value is not None}
+        if not predicates:
+            return []
+
+        conditions, params, rest = [], [], {}
+        for field, value in predicates.items():
+            if field in self._SQL_FIELDS:
+                conditions.append(f"{self._SQL_FIELDS[field]} = ?")
+                params.append(value)
+            else:
+                rest[field] = value
+
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        books = self._select(where, tuple(params))
+        if rest:
+            checks = [(field_key(field), value) for field, value in rest.items()]
+            books = [book for book in books if all(key(book) == value for key, value in checks)]
+        return books
+
+    def search_by_keyword(self, keyword: str) -> List[Book]:
+        needle = keyword.lower()
+        return self._select(
+            "WHERE instr(py_lower(title), ?) > 0 OR instr(py_lower(author), ?) > 0 "
+            "OR instr(py_lower(genre), ?) > 0 OR instr(CAST(year AS TEXT), ?) > 0",
+            (needle, needle, needle, needle))
+
+    def count_available(self) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM books WHERE is_borrowed = 0").fetchone()[0]
+
+
+class CowStorage(StorageBackend):
+    """
+    Копирование при записи поверх базового хранилища.
+    Новые и измененные книги лежат в собственном MemoryStorage,
+    книги базы, которые удалены или изменены, скрываются.
+    База с IndexDict продолжает изменяться: по ее ленте изменений
+    ответвление сохраняет у себя прежнее состояние каждой книги,
+    которую меняет база. Базу без ленты изменять нельзя
+    """
+
+    def __init__(self, base: StorageBackend):
+        self._base = base
+        self._delta = MemoryStorage()
+        self._hidden: set = set()     # ISBN книг базы, удаленных или замененных
+        self._overrides: set = set()  # ISBN книг базы, замененных копией в _delta
+        self._subscription = None
+        indexes = base.indexes
+        if isinstance(indexes, IndexDict):
+            self._watch(indexes)
+
+    @property
+    def base(self) -> StorageBackend:
+        return self._base
+
+    def fork(self) -> 'CowStorage':
+        """Ответвление: та же база, копия собственных изменений"""
+        child = CowStorage(self._base)
+        child._delta.add_many(book.copy() for book in self._delta)
+        child._hidden = set(self._hidden)
+        child._overrides = set(self._overrides)
+        return child
+
+    def close(self) -> None:
+        """Отписаться от ленты изменений базы (после этого базу менять нельзя)"""
+        if self._subscription is not None:
+            self._subscription.close()
+            self._subscription = None
+
+    def _watch(self, indexes: IndexDict) -> None:
+        """
+        Подписка на ленту базы. Подписка не удерживает ответвление:
+        после его удаления она отменяется
+        """
+        import weakref
+        ref = weakref.ref(self)
+
+        def apply(events: List[ChangeEvent]) -> None:
+            storage = ref()
+            if storage is not None:
+                for event in events:
+                    storage._on_base_change(event)
+
+        self._subscription = indexes.subscribe(apply)
+        weakref.finalize(self, indexes.feed.unsubscribe, self._subscription)
+
+    def _on_base_change(self, event: ChangeEvent) -> None:
+        """Изменение в базе: ответвление продолжает видеть прежнее состояние"""
+        isbn = event.isbn
+        if event.kind == ADDED:
+            self._hidden.add(isbn)  # Книга базы, которой не было при ответвлении
+        elif event.kind == REMOVED:
+            if isbn in self._hidden:
+                self._hidden.discard(isbn)
+                self._overrides.discard(isbn)  # Своя копия остается как новая книга
+            else:
+                self._delta.add(event.book.copy())
+        elif isbn not in self._hidden:
+            book = event.book.copy()
+            if event.kind == BORROWED:
+                book.return_book()
+            elif event.kind == RETURNED:
+                book.borrow()
+            self._hidden.add(isbn)
+            self._overrides.add(isbn)
+            self._delta.add(book)
+
+    def _visible(self, books: Iterable[Book]) -> List[Book]:
+        hidden = self._hidden
+        return [book for book in books if book.isbn not in hidden]
+
+    def add(self, book: Book) -> None:
+        self._delta.add(book)
+
+    def remove(self, book: Book) -> bool:
+        if book.isbn in self._delta:
+            self._delta.remove(self._delta.get(book.isbn))
+            self._overrides.discard(book.isbn)
+            return True
+        if book.isbn in self._hidden or book.isbn not in self._base:
+            return False
+        self._hidden.add(book.isbn)
+        return True
+
+    def get(self, isbn: str) -> Optional[Book]:
+        """Книга из базы возвращается копией: изменения сохраняет update"""
+        book = self._delta.get(isbn)
+        if book is not None:
+            return book
+        if isbn in self._hidden:
+            return None
+        book = self._base.get(isbn)
+        return book.copy() if book is not None else None
+
+    def update(self, book: Book) -> None:
+        if book.isbn in self._delta:
+            self._delta.update(book)
+            return
+        self._hidden.add(book.isbn)
+        self._overrides.add(book.isbn)
+        self._delta.add(book)
+
+    def __contains__(self, isbn: str) -> bool:
+        return isbn in self._delta or (isbn not in self._hidden and isbn in self._base)
+
+    def __len__(self) -> int:
+        return len(self._base) - len(self._hidden) + len(self._delta)
+
+    def __iter__(self) -> Iterator[Book]:
+        """Книги базы в исходном порядке (замененные - своей копией), затем новые"""
+        for book in self._base:
+            if book.isbn in self._hidden:
+                if book.isbn in self._overrides:
+                    yield self._delta.get(book.isbn)
+            else:
+                yield book
+        for book in self._delta:
+            if book.isbn not in self._overrides:
+                yield book
+
+    def search(self, **predicates: Any) -> List[Book]:
+        return self._visible(self._base.search(**predicates)) + self._delta.search(**predicates)
+
+    def search_by_keyword(self, keyword: str) -> List[Book]:
+        return (self._visible(self._base.search_by_keyword(keyword))
+                + self._delta.search_by_keyword(keyword))
+
+    def query(self, query: Q) -> List[Book]:
+        return self._visible(self._base.query(query)) + self._delta.query(query)
+
+    def digest(self, bits: Optional[int] = None) -> 'CatalogDigest':
+        """
+        Дерево базы (у базы в памяти строится один раз) без скрытых книг
+        плюс дерево собственных изменений: O(числа изменений ответвления)
+        """
+        from .sync import _OverlayDigest
+        base = self._base.digest(bits)
+        return _OverlayDigest(base, self._delta.digest(base.bits),
+                              (self._base.get(isbn) for isbn in self._hidden))
+
+    def verify(self, sample: Optional[int] = None, rng: Optional['Random'] = None) -> List[str]:
+        """База, собственные изменения и скрытые ISBN (скрыты только книги базы)"""
+        problems = self._base.verify(sample, rng) + self._delta.verify(sample, rng)
+        if not self._overrides <= self._hidden:
+            problems.append("Замененные книги базы не отмечены скрытыми")
+        for isbn in self._overrides:
+            if isbn not in self._delta:
+                problems.append(f"Замененной книги {isbn} нет среди изменений")
+        if sample is None:
+            for isbn in self._hidden:
+                if isbn not in self._base:
+                    problems.append(f"Скрыта книга {isbn}, которой нет в базе")
+            for book in self._delta:
+                if book.isbn not in self._hidden and book.isbn in self._base:
+                    problems.append(f"Книга {book.isbn} видна и в базе, и среди изменений")
+        return problems
+
+    def count_available(self) -> int:
+        hidden_available = 0
+        for isbn in self._hidden:
+            book = self._base.get(isbn)
+            if book is not None and book.is_available:
+                hidden_available += 1
+        return self._base.count_available() - hidden_available + self._delta.count_available()
+
+
+class StorageBookView:
+    """
+    Представление хранилища с интерфейсом BookCollection.
+    Книги не держатся в памяти, а читаются из хранилища
+    """
+
+    def __init__(self, storage: StorageBackend):
+        self._storage = storage
+
+    def __len__(self) -> int:
+        return len(self._storage)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Book, BookCollection]:
+        if isinstance(index, slice):
+            return BookCollection(list(self._storage)[index])
+        return self._storage.nth(index)
+
+    def __iter__(self) -> Iterator[Book]:
+        return iter(self._storage)
+
+    def __repr__(self) -> str:
+        return f"BookCollection({len(self)} книг)"
+
+    def __contains__(self, book: Book) -> bool:
+        return book.isbn in self._storage
+
+    def add(self, book: Book) -> None:
+        self._storage.add(book)
+
+    def remove(self, book: Book) -> bool:
+        return self._storage.remove(book)
+
+    def get_available_books(self) -> List[Book]:
+        return [book for book in self._storage if book.is_available]
+
+    def get_borrowed_books(self) -> List[Book]:
+        return [book for book in self._storage if not book.is_available]
+
+    def search_by_keyword(self, keyword: str) -> BookCollection:
+        return BookCollection(self._storage.search_by_keyword(keyword))
+
+
+class StorageIndexView:
+    """Представление хранилища с интерфейсом IndexDict"""
+
+    _FIELDS = ('isbn', 'author', 'year', 'genre')
+
+    def __init__(self, storage: StorageBackend):
+        self._storage = storage
+
+    def __getitem__(self, key: str) -> Dict:
+        """Индекс по имени, собранный из хранилища"""
+        if key not in self._FIELDS:
+            raise KeyError(f"Доступные индексы: {list(self._FIELDS)}")
+        if key == 'isbn':
+            return {book.isbn: book for book in self._storage}
+        index: Dict = {}
+        for book in self._storage:
+            index.setdefault(getattr(book, key), []).append(book)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._storage)
+
+    def __contains__(self, isbn: str) -> bool:
+        return isbn in self._storage
+
+    def __iter__(self) -> Iterator[str]:
+        return (book.isbn for book in self._storage)
+
+    def add_book(self, book: Book) -> None:
+        self._storage.add(book)
+
+    def remove_book(self, book: Book) -> bool:
+        return self._storage.remove(book)
+
+    def search_by_author(self, author: str) -> List[Book]:
+        return self._storage.search(author=author)
+
+    def search_by_year(self, year: int) -> List[Book]:
+        return self._storage.search(year=year)
+
+    def search_by_genre(self, genre: str) -> List[Book]:
+        return self._storage.search(genre=genre)
+
+    def search(self, **predicates: Any) -> List[Book]:
+        return self._storage.search(**predicates)
+
+    def get_book_by_isbn(self, isbn: str) -> Optional[Book]:
+        return self._storage.get(isbn)
+
+    def get_change_log(self) -> List[str]:
+        return []
@@ -0,0 +1,286 @@
+"""
+Сравнение и синхронизация каталогов двух библиотек.
+
+Пространство ISBN делится на корзины по хэшу ISBN. Хэш корзины -
+сумма хэшей ее книг по модулю 2^128, узлы дерева над корзинами
+(по 16 детей) - суммы хэшей детей. Сумма обновляется за O(глубины)
+при каждом изменении каталога, поэтому дерево поддерживается по
+ленте изменений, а при сравнении спуск идет только в различающиеся
+узлы. Дельта содержит только книги из различающихся корзин
+"""
+import json
+from array import array
+from hashlib import blake2b
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .book import Book
+from .feed import ChangeEvent, ADDED, REMOVED, BORROWED, RETURNED
+
+if TYPE_CHECKING:
+    from .library import Library
+    from .my_collections import IndexDict
+
+MASK = (1 << 128) - 1
+FANOUT_BITS = 4  # 16 детей у узла дерева
+DEFAULT_BITS = 12  # 4096 корзин
+
+
+def _digest(data: bytes) -> int:
+    return int.from_bytes(blake2b(data, digest_size=16).digest(), 'big')
+
+
+def bucket_of(isbn: str, bits: int) -> int:
+    """Номер корзины ISBN"""
+    return int.from_bytes(blake2b(isbn.encode('utf-8'), digest_size=8).digest(), 'big') >> (64 - bits)
+
+
+def content_hash(book: Book) -> int:
+    """Хэш неизменяемых полей книги (без состояния выдачи)"""
+    data = book.to_dict()
+    data.pop('is_borrowed', None)
+    return _digest(json.dumps(data, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+
+
+def borrowed_hash(isbn: str) -> int:
+    """Слагаемое хэша книги, пока она выдана"""
+    return _digest(b'borrowed\0' + isbn.encode('utf-8'))
+
+
+def book_hash(book: Book) -> int:
+    """Хэш книги вместе с состоянием выдачи"""
+    value = content_hash(book)
+    if not book.is_available:
+        value += borrowed_hash(book.isbn)
+    return value & MASK
+
+
+class CatalogDigest:
+    """
+    Дерево сумм хэшей над корзинами ISBN (2^bits корзин, bits кратно 4).
+    При переданном indexes строится по IndexDict и поддерживается по его
+    ленте изменений; иначе - неизменяемый снимок списка книг (of_books)
+    """
+
+    def __init__(self, indexes: Optional['IndexDict'] = None, bits: int = DEFAULT_BITS):
+        if bits % FANOUT_BITS or not 0 < bits <= 24:
+            raise ValueError("bits должно быть кратно 4 и не больше 24")
+        self.bits = bits
+        self.depth = bits // FANOUT_BITS
+        # levels[0] - корень, levels[depth] - корзины
+        self.levels: List[List[int]] = [[0] * (1 << (FANOUT_BITS * level))
+                                        for level in range(self.depth + 1)]
+        self._members: List[array] = [array('I') for _ in range(1 << bits)]  # Корзина -> слоты
+        self._book_at: Callable[[int], Optional[Book]]
+        self._subscription = None
+        if indexes is not None:
+            self._book_at = indexes.book_at
+            for slot, book in indexes.iter_slots():
+                self._add(slot, book)
+            self._subscription = indexes.subscribe(self._apply, from_seq=indexes.feed.last_seq)
+
+    @classmethod
+    def of_books(cls, books: Iterable[Book], bits: int = DEFAULT_BITS) -> 'CatalogDigest':
+        """Снимок произвольного набора книг (для хранилищ без IndexDict)"""
+        digest = cls(bits=bits)
+        books = list(books)
+        digest._book_at = books.__getitem__
+        for slot, book in enumerate(books):
+            digest._add(slot, book)
+        return digest
+
+    def close(self) -> None:
+        """Прекратить синхронизацию с каталогом"""
+        if self._subscription is not None:
+            self._subscription.close()
+            self._subscription = None
+
+    @property
+    def root(self) -> int:
+        """Хэш всего каталога"""
+        return self.levels[0][0]
+
+    def _propagate(self, bucket: int, delta: int) -> None:
+        for level in range(self.depth, -1, -1):
+            row = self.levels[level]
+            index = bucket >> (FANOUT_BITS * (self.depth - level))
+            row[index] = (row[index] + delta) & MASK
+
+    def _add(self, slot: int, book: Book) -> None:
+        bucket = bucket_of(book.isbn, self.bits)
+        self._members[bucket].append(slot)
+        self._propagate(bucket, book_hash(book))
+
+    def _apply(self, events: List[ChangeEvent]) -> None:
+        """Применить пакет событий из ленты IndexDict"""
+        for event in events:
+            if event.kind == ADDED:
+                self._add(event.slot, event.book)
+            elif event.kind == REMOVED:
+                bucket = bucket_of(event.isbn, self.bits)
+                members = self._members[bucket]
+                del members[members.index(event.slot)]
+                self._propagate(bucket, -book_hash(event.book))
+            elif event.kind in (BORROWED, RETURNED):
+                delta = borrowed_hash(event.isbn)
+                self._propagate(bucket_of(event.isbn, self.bits),
+                                delta if event.kind == BORROWED else -delta)
+            else:
+                # Прежнее состояние неизвестно: корзина пересчитывается целиком
+                bucket = bucket_of(event.isbn, self.bits)
+                total = sum(book_hash(book) for book in self.books_in(bucket)) & MASK
+                self._propagate(bucket, total - self.levels[self.depth][bucket])
+
+    def books_in(self, bucket: int) -> List[Book]:
+        """Книги корзины"""
+        book_at = self._book_at
+        return [book_at(slot) for slot in self._members[bucket]]
+
+    def bucket_hashes(self, bucket: int) -> Dict[str, Tuple[int, bool]]:
+        """ISBN -> (хэш неизменяемых полей, выдана ли) для книг корзины"""
+        return {book.isbn: (content_hash(book), not book.is_available) for book in self.books_in(bucket)}
+
+    def changed_buckets(self, other: 'CatalogDigest') -> List[int]:
+        """
+        Корзины, хэши которых различаются. Спуск от корня только
+        в различающиеся узлы: работа пропорциональна числу изменений
+        """
+        if other.bits != self.bits:
+            raise ValueError(f"Разное число корзин: 2^{self.bits} и 2^{other.bits}")
+        frontier = [0] if self.root != other.root else []
+        for level in range(1, self.depth + 1):
+            mine, theirs = self.levels[level], other.levels[level]
+            frontier = [child
+                        for parent in frontier
+                        for child in range(parent << FANOUT_BITS, (parent + 1) << FANOUT_BITS)
+                        if mine[child] != theirs[child]]
+        return frontier
+
+
+class _OverlayDigest(CatalogDigest):
+    """
+    Снимок дерева CowStorage: дерево базы без скрытых книг плюс дерево
+    собственных изменений. Суммы складываются, поэтому построение не
+    требует обхода базы
+    """
+
+    def __init__(self, base: CatalogDigest, own: CatalogDigest, hidden: Iterable[Book]):
+        super().__init__(bits=base.bits)
+        self.levels = [[(mine + theirs) & MASK for mine, theirs in zip(row, own_row)]
+                       for row, own_row in zip(base.levels, own.levels)]
+        self._hidden = set()
+        for book in hidden:
+            self._hidden.add(book.isbn)
+            self._propagate(bucket_of(book.isbn, self.bits), -book_hash(book))
+        self._base = base
+        self._own = own
+
+    def books_in(self, bucket: int) -> List[Book]:
+        hidden = self._hidden
+        return ([book for book in self._base.books_in(bucket) if book.isbn not in hidden]
+                + self._own.books_in(bucket))
+
+
+class CatalogDelta:
+    """
+    Изменения, переводящие один каталог в другой: новые и замененные
+    книги целиком, удаленные - по ISBN, у книг с тем же содержимым -
+    только состояние выдачи
+    """
+
+    def __init__(self, upserts: Optional[List[Dict]] = None, removals: Optional[List[str]] = None,
+                 states: Optional[List[Tuple[str, bool]]] = None, buckets: int = 0):
+        self.upserts = upserts if upserts is not None else []
+        self.removals = removals if removals is not None else []
+        self.states = states if states is not None else []  # (ISBN, выдана ли)
+        self.buckets = buckets  # Сколько корзин сравнивалось
+
+    def __len__(self) -> int:
+        return len(self.upserts) + len(self.removals) + len(self.states)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __repr__(self) -> str:
+        return (f"CatalogDelta(добавить/заменить {len(self.upserts)}, удалить {len(self.removals)}, "
+                f"состояние {len(self.states)}, корзин {self.buckets})")
+
+    def to_dict(self) -> Dict:
+        """Конвертация в словарь для передачи"""
+        return {'upserts': self.upserts, 'removals': self.removals,
+                'states': [[isbn, borrowed] for isbn, borrowed in self.states]}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'CatalogDelta':
+        """Создание объекта из словаря"""
+        return cls(list(data.get('upserts', [])), list(data.get('removals', [])),
+                   [(isbn, bool(borrowed)) for isbn, borrowed in data.get('states', [])])
+
+    def save(self, path: str) -> None:
+        """Сохранить в файл JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> 'CatalogDelta':
+        """Загрузить из файла JSON"""
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def compute_delta(source: CatalogDigest, target: CatalogDigest) -> CatalogDelta:
+    """Дельта, после применения которой каталог target совпадет с source"""
+    delta = CatalogDelta()
+    buckets = source.changed_buckets(target)
+    delta.buckets = len(buckets)
+    for bucket in buckets:
+        theirs = target.bucket_hashes(bucket)
+        for book in source.books_in(bucket):
+            known = theirs.pop(book.isbn, None)
+            borrowed = not book.is_available
+            if known is None or known[0] != content_hash(book):
+                delta.upserts.append(book.to_dict())
+            elif known[1] != borrowed:
+                delta.states.append((book.isbn, borrowed))
+        delta.removals.extend(theirs)
+    return delta
+
+
+def apply_delta(library: 'Library', delta: CatalogDelta) -> int:
+    """
+    Применить дельту к библиотеке массовыми операциями хранилища
+    (время зависит от размера дельты, а не каталога).
+    Состояние выдачи меняется без записи в журнал выдач. Вернуть число изменений
+    """
+    storage = library.storage
+    replaced = []
+    new_books = []
+    for data in delta.upserts:
+        book = Book.from_dict(data)
+        if book.isbn in storage:
+            replaced.append(book)
+        else:
+            new_books.append(book)
+    removed = storage.get_many(list(delta.removals) + [book.isbn for book in replaced])
+    storage.remove_many(removed.values())
+    # Выдача читателю закрывается только для удаленных книг и для замененных,
+    # пришедших доступными (исправление описания выданной книги ее не закрывает)
+    for isbn in delta.removals:
+        library.patrons.checkin(isbn)
+    for book in replaced:
+        if book.is_available:
+            library.patrons.checkin(book.isbn)
+    storage.add_many(new_books + replaced)
+
+    changed = []
+    for isbn, borrowed in delta.states:
+        book = storage.get(isbn)
+        if book is None or book.is_available != borrowed:
+            continue
+        if borrowed:
+            book.borrow()
+        else:
+            book.return_book()
+            library.patrons.checkin(isbn)
+        changed.append(book)
+    storage.update_many(changed)
+    return len(delta.removals) + len(new_books) + len(replaced) + len(changed)
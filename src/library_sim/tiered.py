@@ -0,0 +1,342 @@
+"""
+Многоуровневое хранилище каталога с ограничением памяти.
+
+Индексы держат только номера слотов, объекты книг
+живут в горячем LRU-уровне ограниченного размера. Все книги записываются
+в холодное хранилище на диске (SQLite), вытесненные книги читаются
+оттуда при обращении
+"""
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .bitmap import Bitmap
+from .book import Book
+from .my_collections import field_key
+from .query import Q
+from .storage import SQLiteStorage, StorageBackend
+
+# Поля с большим числом значений хранят отсортированные массивы слотов,
+# с малым - битовые множества (плотные маски при малом числе корзин компактнее)
+LIST_FIELDS = ('author', 'year')
+BITMAP_FIELDS = ('genre', 'type', 'available')
+INDEXED_FIELDS = LIST_FIELDS + BITMAP_FIELDS
+_SCAN_BATCH = 500
+
+
+def _has(postings: array, slot: int) -> bool:
+    position = bisect_left(postings, slot)
+    return position < len(postings) and postings[position] == slot
+
+
+def current_rss_mb() -> Optional[float]:
+    """Текущий размер резидентной памяти процесса, МБ (None, если неизвестен)"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Пиковое значение: ru_maxrss в КБ на Linux и в байтах на macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+class TieredStorage(StorageBackend):
+    """
+    Горячий уровень - LRU из не более hot_capacity книг, холодный - SQLite
+    по пути path (запись сквозная, вытеснение ничего не пишет).
+    При max_rss_mb каждые rss_check_every обращений проверяется память
+    процесса; при превышении горячий уровень сокращается вдвое
+    """
+
+    def __init__(self, path: str, hot_capacity: int = 10_000,
+                 max_rss_mb: Optional[float] = None, rss_check_every: int = 1000,
+                 min_hot_capacity: int = 16):
+        self.cold = SQLiteStorage(path)
+        self.hot_capacity = hot_capacity
+        self.max_rss_mb = max_rss_mb
+        self.rss_check_every = rss_check_every
+        self.min_hot_capacity = min_hot_capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rss_shrinks = 0
+        self._accesses = 0
+
+        self._hot: 'OrderedDict[int, Book]' = OrderedDict()  # Номер слота -> Book
+        self._isbns: List[Optional[str]] = []                 # Номер слота -> ISBN
+        self._slot_of: Dict[str, int] = {}
+        self._live = Bitmap()
+        self._keys = {field: field_key(field) for field in INDEXED_FIELDS}
+        self._postings: Dict[str, Dict[Any, Bitmap]] = {field: {} for field in INDEXED_FIELDS}
+
+        # Каталог, уже сохраненный по этому пути, индексируется без загрузки в память
+        for book in self.cold:
+            self._index(book)
+
+    def close(self) -> None:
+        self.cold.close()
+
+    # Индексы
+
+    def _index(self, book: Book) -> int:
+        slot = len(self._isbns)
+        self._isbns.append(book.isbn)
+        self._slot_of[book.isbn] = slot
+        self._live.add(slot)
+        for field, key in self._keys.items():
+            postings = self._postings[field]
+            value = key(book)
+            entry = postings.get(value)
+            if entry is None:
+                entry = postings[value] = array('I') if field in LIST_FIELDS else Bitmap()
+            if field in LIST_FIELDS:
+                entry.append(slot)  # Новый слот больше прежних, массив остается отсортированным
+            else:
+                entry.add(slot)
+        return slot
+
+    def _unindex(self, book: Book, slot: int) -> None:
+        for field, key in self._keys.items():
+            value = key(book)
+            entry = self._postings[field].get(value)
+            if entry is None:
+                continue
+            if field in LIST_FIELDS:
+                position = bisect_left(entry, slot)
+                if position < len(entry) and entry[position] == slot:
+                    del entry[position]
+            else:
+                entry.discard(slot)
+            if not entry:
+                del self._postings[field][value]
+        self._live.discard(slot)
+        self._isbns[slot] = None
+
+    # Горячий уровень
+
+    def _admit(self, slot: int, book: Book) -> None:
+        self._hot[slot] = book
+        self._hot.move_to_end(slot)
+        while len(self._hot) > self.hot_capacity:
+            self._hot.popitem(last=False)
+            self.evictions += 1
+
+    def _touch(self) -> None:
+        self._accesses += 1
+        if self.max_rss_mb is not None and self._accesses % self.rss_check_every == 0:
+            self.enforce_memory_cap()
+
+    def enforce_memory_cap(self) -> bool:
+        """Сократить горячий уровень вдвое, если память процесса выше предела"""
+        rss = current_rss_mb()
+        if self.max_rss_mb is None or rss is None or rss <= self.max_rss_mb:
+            return False
+        self.hot_capacity = max(self.min_hot_capacity, len(self._hot) // 2)
+        while len(self._hot) > self.hot_capacity:
+            self._hot.popitem(last=False)
+            self.evictions += 1
+        self.rss_shrinks += 1
+        return True
+
+    def _books(self, slots: Iterable[int], admit: bool = True) -> List[Book]:
+        """Книги по номерам слотов: горячие из памяти, остальные одним запросом к диску"""
+        slots = list(slots)
+        hot = self._hot
+        found = {slot: hot[slot] for slot in slots if slot in hot}
+        missing = [self._isbns[slot] for slot in slots if slot not in found]
+        cold = self.cold.get_many(missing) if missing else {}
+        books = []
+        for slot in slots:
+            book = found.get(slot)
+            if book is None:
+                book = cold[self._isbns[slot]]
+                if admit:
+                    self._admit(slot, book)
+            elif admit and slot in hot:
+                hot.move_to_end(slot)
+            books.append(book)
+        if admit:
+            self.hits += len(found)
+            self.misses += len(missing)
+            self._touch()
+        return books
+
+    # Интерфейс StorageBackend
+
+    def add(self, book: Book) -> None:
+        self.cold.add(book)
+        self._admit(self._index(book), book)
+        self._touch()
+
+    def add_many(self, books: Iterable[Book]) -> None:
+        """Массовая загрузка сразу в холодный уровень"""
+        books = list(books)
+        self.cold.add_many(books)
+        for book in books:
+            self._index(book)
+
+    def remove(self, book: Book) -> bool:
+        slot = self._slot_of.get(book.isbn)
+        if slot is None:
+            return False
+        current = self._hot.pop(slot, None) or self.cold.get(book.isbn)
+        self._unindex(current, slot)
+        del self._slot_of[book.isbn]
+        return self.cold.remove(book)
+
+    def get(self, isbn: str) -> Optional[Book]:
+        slot = self._slot_of.get(isbn)
+        if slot is None:
+            return None
+        book = self._hot.get(slot)
+        if book is not None:
+            self.hits += 1
+            self._hot.move_to_end(slot)
+        else:
+            self.misses += 1
+            book = self.cold.get(isbn)
+            self._admit(slot, book)
+        self._touch()
+        return book
+
+    def get_many(self, isbns: Iterable[str]) -> Dict[str, Book]:
+        """Горячие книги из памяти, остальные одним запросом к диску"""
+        slots = [self._slot_of[isbn] for isbn in isbns if isbn in self._slot_of]
+        return {book.isbn: book for book in self._books(slots)}
+
+    def update(self, book: Book) -> None:
+        """Сохранить выдачу/возврат (прочие поля книги в каталоге не меняются)"""
+        slot = self._slot_of.get(book.isbn)
+        if slot is None:
+            return
+        self.cold.update(book)
+        self._relocate(slot, book)
+
+    def update_many(self, books: Iterable[Book]) -> None:
+        """Изменения записываются на диск одной транзакцией"""
+        books = [book for book in books if book.isbn in self._slot_of]
+        self.cold.update_many(books)
+        for book in books:
+            self._relocate(self._slot_of[book.isbn], book)
+
+    def _relocate(self, slot: int, book: Book) -> None:
+        available = self._postings['available']
+        for bits in available.values():
+            bits.discard(slot)
+        available.setdefault(book.is_available, Bitmap()).add(slot)
+        self._admit(slot, book)
+
+    def __contains__(self, isbn: str) -> bool:
+        return isbn in self._slot_of
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __iter__(self) -> Iterator[Book]:
+        """Полный обход не вытесняет горячие книги"""
+        batch = []
+        for slot in self._live:
+            batch.append(slot)
+            if len(batch) == _SCAN_BATCH:
+                yield from self._books(batch, admit=False)
+                batch = []
+        if batch:
+            yield from self._books(batch, admit=False)
+
+    def nth(self, index: int) -> Book:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Номер книги вне каталога")
+        for position, slot in enumerate(self._live):
+            if position == index:
+                return self.get(self._isbns[slot])
+
+    def _evaluate(self, query: Q) -> Bitmap:
+        if query.op == 'and':
+            result = self._evaluate(query.children[0])
+            for child in query.children[1:]:
+                result = result & self._evaluate(child)
+            return result
+        if query.op == 'or':
+            result = self._evaluate(query.children[0])
+            for child in query.children[1:]:
+                result = result | self._evaluate(child)
+            return result
+        if query.op == 'not':
+            return self._live - self._evaluate(query.children[0])
+        if query.field in self._postings:
+            entry = self._postings[query.field].get(query.value)
+            if entry is None:
+                return Bitmap()
+            return Bitmap(entry) if query.field in LIST_FIELDS else entry.copy()
+        key = field_key(query.field)
+        return Bitmap(self._slot_of[book.isbn] for book in self if key(book) == query.value)
+
+    def search(self, **predicates: Any) -> List[Book]:
+        predicates = {field: value for field, value in predicates.items() if value is not None}
+        if not predicates:
+            return []
+        listed = [field for field in predicates if field in LIST_FIELDS]
+        bitmapped = [field for field in predicates if field in BITMAP_FIELDS]
+        entries = {field: self._postings[field].get(predicates[field])
+                   for field in listed + bitmapped}
+        if any(entry is None for entry in entries.values()):
+            return []
+
+        if listed:
+            # Кандидаты из самого короткого массива, остальные поля - проверкой членства
+            driver = min(listed, key=lambda field: len(entries[field]))
+            others = [entries[field] for field in listed if field != driver]
+            masks = [entries[field] for field in bitmapped]
+            slots = [slot for slot in entries[driver]
+                     if all(_has(other, slot) for other in others)
+                     and all(slot in mask for mask in masks)]
+        elif bitmapped:
+            slots = self._live
+            for field in bitmapped:
+                slots = slots & entries[field]
+        else:
+            return self.query(Q(**predicates))
+        checks = [(field_key(field), value) for field, value in predicates.items()
+                  if field not in self._postings]
+        return [book for book in self._books(slots)
+                if all(key(book) == value for key, value in checks)]
+
+    def query(self, query: Q) -> List[Book]:
+        return self._books(self._evaluate(query))
+
+    def search_by_keyword(self, keyword: str) -> List[Book]:
+        """Поиск выполняет SQLite; для горячих книг возвращаются объекты из памяти"""
+        books = []
+        for book in self.cold.search_by_keyword(keyword):
+            slot = self._slot_of[book.isbn]
+            books.append(self._hot.get(slot, book))
+        return books
+
+    def count_available(self) -> int:
+        return len(self._postings['available'].get(True, Bitmap()))
+
+    def stats(self) -> Dict[str, Any]:
+        """Состояние уровней и статистика попаданий"""
+        accesses = self.hits + self.misses
+        return {
+            'books': len(self),
+            'hot': len(self._hot),
+            'hot_capacity': self.hot_capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / accesses if accesses else None,
+            'evictions': self.evictions,
+            'rss_shrinks': self.rss_shrinks,
+            'rss_mb': current_rss_mb(),
+        }
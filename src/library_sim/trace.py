@@ -0,0 +1,168 @@
+"""
+Компактная двоичная запись событий симуляции для воспроизведения.
+
+Формат: b'LSTR', версия, seed, таблица имен событий, затем записи
+(код события, число аргументов, аргументы). Целые числа хранятся
+как varint (знаковые - в zigzag), строка - длина и UTF-8 при первом
+появлении и номер в таблице уже встреченных строк при повторе
+"""
+from typing import Iterator, List, Optional, Tuple
+
+MAGIC = b'LSTR'
+VERSION = 1
+
+_NONE, _INT, _STR, _STR_REF = 0, 1, 2, 3
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+class _Reader:
+    """Последовательное чтение буфера"""
+
+    def __init__(self, data: bytes, position: int = 0):
+        self.data = data
+        self.position = position
+
+    def varint(self) -> int:
+        result = shift = 0
+        while True:
+            if self.position >= len(self.data):
+                raise ValueError("Запись симуляции обрезана")
+            byte = self.data[self.position]
+            self.position += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def string(self) -> str:
+        length = self.varint()
+        start, self.position = self.position, self.position + length
+        if self.position > len(self.data):
+            raise ValueError("Запись симуляции обрезана")
+        return self.data[start:self.position].decode('utf-8')
+
+
+class SimulationTrace:
+    """Последовательность событий симуляции: пары (имя события, аргументы)"""
+
+    def __init__(self, seed: Optional[int] = None,
+                 events: Optional[List[Tuple[str, tuple]]] = None):
+        self.seed = seed
+        self.events: List[Tuple[str, tuple]] = events if events is not None else []
+
+    def append(self, event: str, args: tuple) -> None:
+        """Добавить событие"""
+        self.events.append((event, args))
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def __iter__(self) -> Iterator[Tuple[str, tuple]]:
+        return iter(self.events)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, SimulationTrace):
+            return NotImplemented
+        return self.seed == other.seed and self.events == other.events
+
+    def to_bytes(self) -> bytes:
+        """Двоичное представление"""
+        out = bytearray(MAGIC)
+        out.append(VERSION)
+        if self.seed is None:
+            out.append(0)
+        else:
+            out.append(1)
+            _write_varint(out, _zigzag(self.seed))
+
+        codes = {}
+        for event, _ in self.events:
+            codes.setdefault(event, len(codes))
+        _write_varint(out, len(codes))
+        for name in codes:
+            encoded = name.encode('utf-8')
+            _write_varint(out, len(encoded))
+            out += encoded
+
+        strings = {}
+        _write_varint(out, len(self.events))
+        for event, args in self.events:
+            _write_varint(out, codes[event])
+            _write_varint(out, len(args))
+            for value in args:
+                if value is None:
+                    out.append(_NONE)
+                elif isinstance(value, int):
+                    out.append(_INT)
+                    _write_varint(out, _zigzag(value))
+                elif isinstance(value, str):
+                    if value in strings:
+                        out.append(_STR_REF)
+                        _write_varint(out, strings[value])
+                        continue
+                    strings[value] = len(strings)
+                    encoded = value.encode('utf-8')
+                    out.append(_STR)
+                    _write_varint(out, len(encoded))
+                    out += encoded
+                else:
+                    raise TypeError(f"Неподдерживаемый аргумент события: {value!r}")
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'SimulationTrace':
+        """Разбор двоичного представления"""
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("Это не запись симуляции")
+        if data[len(MAGIC)] != VERSION:
+            raise ValueError(f"Неподдерживаемая версия записи: {data[len(MAGIC)]}")
+        reader = _Reader(data, len(MAGIC) + 1)
+        has_seed = reader.varint()
+        seed = _unzigzag(reader.varint()) if has_seed else None
+
+        names = [reader.string() for _ in range(reader.varint())]
+        strings = []
+        events = []
+        for _ in range(reader.varint()):
+            name = names[reader.varint()]
+            args = []
+            for _ in range(reader.varint()):
+                tag = reader.varint()
+                if tag == _NONE:
+                    args.append(None)
+                elif tag == _INT:
+                    args.append(_unzigzag(reader.varint()))
+                elif tag == _STR:
+                    strings.append(reader.string())
+                    args.append(strings[-1])
+                elif tag == _STR_REF:
+                    args.append(strings[reader.varint()])
+                else:
+                    raise ValueError(f"Неизвестный тип аргумента: {tag}")
+            events.append((name, tuple(args)))
+        return cls(seed, events)
+
+    def save(self, path: str) -> None:
+        """Сохранить в файл"""
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> 'SimulationTrace':
+        """Загрузить из файла"""
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
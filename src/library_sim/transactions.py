@@ -0,0 +1,135 @@
+"""
+Пакетные операции над библиотекой "все или ничего".
+
+Транзакция собирает выдачи и возвраты, проверяя каждую сразу против
+текущего состояния каталога и уже собранных операций. Изменения
+применяются только при фиксации, одной группой: обновление хранилища,
+журнала выдач и реестра читателей
+"""
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from .book import Book, ReferenceBook
+
+if TYPE_CHECKING:
+    from .library import Library
+
+
+class TransactionError(ValueError):
+    """Операция транзакции отклонена; ничего не применено"""
+
+
+class Transaction:
+    """
+    Набор выдач и возвратов, применяемых вместе. Создается через
+    Library.transaction(), фиксируется при выходе из блока with
+    """
+
+    def __init__(self, library: 'Library'):
+        self.library = library
+        self._borrows: List[Tuple[Book, Optional[int]]] = []
+        self._returns: List[Book] = []
+        self._pending: Dict[int, List[Book]] = {}  # Читатель -> книги к выдаче
+        self._isbns = set()
+        self._prefetched: Dict[str, Book] = {}
+        self.committed = False
+
+    def __len__(self) -> int:
+        return len(self._borrows) + len(self._returns)
+
+    def _book(self, isbn: str) -> Book:
+        if self.committed:
+            raise TransactionError("Транзакция уже зафиксирована")
+        if isbn in self._isbns:
+            raise TransactionError(f"Книга {isbn} уже есть в транзакции")
+        book = self._prefetched.pop(isbn, None) or self.library.storage.get(isbn)
+        if book is None:
+            raise TransactionError(f"Книга с ISBN {isbn} не найдена")
+        return book
+
+    def prefetch(self, isbns: Iterable[str]) -> None:
+        """Прочитать книги будущих операций одним обращением к хранилищу"""
+        self._prefetched.update(self.library.storage.get_many(isbns))
+
+    def borrow(self, isbn: str, patron: Optional[int] = None) -> None:
+        """Добавить выдачу книги (читателю patron с учетом его лимитов)"""
+        book = self._book(isbn)
+        if isinstance(book, ReferenceBook) and book.is_for_library_use_only():
+            raise TransactionError(
+                f"{book.reference_type.capitalize()} '{book.title}' нельзя выдать на дом")
+        if not book.is_available:
+            raise TransactionError(f"Книга '{book.title}' уже выдана")
+        if patron is not None:
+            pending = self._pending.get(patron, [])
+            refusal = self.library.patrons.check(patron, book, pending)
+            if refusal is not None:
+                raise TransactionError(f"Отказ в выдаче '{book.title}': {refusal}")
+            self._pending[patron] = pending + [book]
+        self._isbns.add(isbn)
+        self._borrows.append((book, patron))
+
+    def return_book(self, isbn: str) -> None:
+        """Добавить возврат книги"""
+        book = self._book(isbn)
+        if book.is_available:
+            raise TransactionError(f"Книга '{book.title}' не была выдана")
+        self._isbns.add(isbn)
+        self._returns.append(book)
+
+    def commit(self) -> None:
+        """
+        Применить все операции. Состояние книг перепроверяется по
+        хранилищу: если книгу успели выдать или вернуть в обход
+        транзакции или выдача читателю не записалась, уже сделанные
+        изменения отменяются и выбрасывается TransactionError
+        """
+        if self.committed:
+            raise TransactionError("Транзакция уже зафиксирована")
+        library = self.library
+        with library._lock:
+            current = library.storage.get_many(self._isbns)
+            borrows = [(current.get(book.isbn), book, patron) for book, patron in self._borrows]
+            returns = [(current.get(book.isbn), book) for book in self._returns]
+            changed: List[Book] = []
+            loans: List[str] = []
+            try:
+                for book, planned, _ in borrows:
+                    if book is None or not book.borrow():
+                        raise TransactionError(f"Книгу '{planned.title}' успели выдать или удалить")
+                    changed.append(book)
+                for book, planned in returns:
+                    if book is None or not book.return_book():
+                        raise TransactionError(f"Книгу '{planned.title}' успели вернуть или удалить")
+                    changed.append(book)
+                library.storage.update_many(changed)
+                now = library.clock()
+                for book, _, patron in borrows:
+                    if patron is not None:
+                        library.patrons.checkout(patron, book, now)
+                        loans.append(book.isbn)
+            except Exception as error:
+                for isbn in loans:
+                    library.patrons.checkin(isbn)
+                for book in changed:
+                    if book.is_available:
+                        book.borrow()
+                    else:
+                        book.return_book()
+                library.storage.update_many(changed)
+                if type(error) is ValueError:
+                    raise TransactionError(str(error)) from error
+                raise
+
+            for book, _ in returns:
+                library.patrons.checkin(book.isbn)
+            if borrows:
+                library.history.record_many(((book.isbn, book.genre) for book, _, _ in borrows),
+                                            'borrow', now)
+            if returns:
+                library.history.record_many(((book.isbn, book.genre) for book, _ in returns),
+                                            'return', now)
+            self.committed = True
+
+    def summary(self) -> Dict[str, List[str]]:
+        """ISBN книг, выданных и возвращенных транзакцией"""
+        return {'borrowed': [book.isbn for book, _ in self._borrows],
+                'returned': [book.isbn for book in self._returns]}
@@ -11,13 +11,8 @@ from src.app import app
 
 
 def main():
-    print("ЛАБОРАТОРНАЯ РАБОТА №4: СИСТЕМА БИБЛИОТЕКИ")
-    print("="*60 + "\n")
-
-    app()
-    
-    
+    return app()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
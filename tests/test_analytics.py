@@ -0,0 +1,55 @@
+"""
+Тесты для векторной аналитики каталога
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.library_sim.analytics import CatalogArrays
+from src.library_sim.book import RegularBook
+from src.library_sim.library import Library
+
+WAR_AND_PEACE = "978-5-389-07435-1"
+POTTER = "978-5-389-07429-0"
+
+
+class TestCatalogArrays:
+    """Тестирование CatalogArrays"""
+
+    def setup_method(self):
+        """Настройка теста"""
+        self.library = Library("Тестовая библиотека")
+        self.arrays = CatalogArrays(self.library.indexes, capacity=4)
+
+    def test_count_by(self):
+        """Тест подсчета по группам"""
+        assert len(self.arrays) == 7
+        assert self.arrays.count_by('genre')['фэнтези'] == 2
+        assert self.arrays.count_by('type') == {'RegularBook': 2, 'ReferenceBook': 2, 'FictionBook': 3}
+        assert self.arrays.count_by('decade')[1860] == 2
+
+    def test_sync_with_feed(self):
+        """Тест синхронизации с изменениями каталога"""
+        self.library.borrow_book(WAR_AND_PEACE)
+        self.library.remove_book(POTTER)
+        self.library.add_book(RegularBook("Новая", "Автор", 2021, "роман", "999"), silent=True)
+        assert len(self.arrays) == 7
+        assert self.arrays.count_by('genre')['фэнтези'] == 1
+        ratios = self.arrays.mean_by('genre')
+        assert ratios['роман'] == pytest.approx(1 / 3)
+        assert ratios['фэнтези'] == 0.0
+
+    def test_histogram_and_percentile(self):
+        """Тест гистограммы и перцентилей"""
+        counts, edges = self.arrays.histogram('year', bins=4)
+        assert counts.sum() == 7 and len(edges) == 5
+        by_type, _ = self.arrays.histogram('year', bins=4, by='type')
+        assert by_type['FictionBook'].sum() == 3
+        assert self.arrays.percentile(50) == 1949
+        assert self.arrays.percentile(50, by='type')['RegularBook'] == pytest.approx(1867.5)
+
+    def test_close(self):
+        """Тест отключения синхронизации"""
+        self.arrays.close()
+        self.library.remove_book(POTTER)
+        assert len(self.arrays) == 7
@@ -0,0 +1,44 @@
+"""
+Тесты для нагрузочных замеров
+"""
+import json
+
+from src.library_sim.bench import bench_catalog, compare, main
+from src.library_sim.synthetic import generate_books
+
+
+class TestBench:
+    """Тестирование модуля bench"""
+
+    def test_generate_books_reproducible(self):
+        """Тест воспроизводимости синтетического каталога"""
+        first = [book.to_dict() for book in generate_books(50, seed=7)]
+        second = [book.to_dict() for book in generate_books(50, seed=7)]
+        assert first == second
+        assert len({book['isbn'] for book in first}) == 50
+
+    def test_bench_catalog_metrics(self):
+        """Тест набора метрик на маленьком каталоге"""
+        results = bench_catalog(200, ops=20, simulation_steps=10)
+        assert results['peak_memory_mb'] > 0
+        for name in ['add_book', 'remove_book', 'search_books[author]',
+                     'search_books[author+year+genre]', 'search_by_keyword',
+                     'borrow_book', 'return_book', 'print_status', 'run_simulation']:
+            assert results[name] > 0
+
+    def test_compare(self):
+        """Тест поиска регрессий"""
+        baseline = {'results': {'100': {'add_book': 1000.0, 'peak_memory_mb': 10.0}}}
+        report = {'results': {'100': {'add_book': 700.0, 'peak_memory_mb': 11.0}}}
+        assert compare(report, baseline, tolerance=0.2) == ["100: add_book 1000 -> 700"]
+        report = {'results': {'100': {'add_book': 900.0, 'peak_memory_mb': 13.0}}}
+        assert compare(report, baseline, tolerance=0.2) == ["100: peak_memory_mb 10 -> 13"]
+
+    def test_main_writes_json(self, tmp_path, capsys):
+        """Тест сохранения результатов и сравнения с самим собой"""
+        output = tmp_path / "bench.json"
+        args = ['--sizes', '100', '--ops', '5', '--steps', '5', '--no-memory']
+        assert main(args + ['--output', str(output)]) == 0
+        report = json.loads(output.read_text(encoding='utf-8'))
+        assert '100' in report['results']
+        assert main(args + ['--baseline', str(output), '--tolerance', '100']) == 0
@@ -0,0 +1,108 @@
+"""
+Тесты для битовых индексов и логических запросов
+"""
+from src.library_sim.bitmap import Bitmap
+from src.library_sim.book import RegularBook, FictionBook
+from src.library_sim.library import Library
+from src.library_sim.my_collections import IndexDict
+from src.library_sim.query import Q
+
+
+class TestBitmap:
+    """Тестирование Bitmap"""
+
+    def test_add_discard(self):
+        """Тест добавления и удаления через границу фрагментов"""
+        bitmap = Bitmap([1, 5, 70000])
+        bitmap.add(200000)
+        assert 70000 in bitmap
+        assert 2 not in bitmap
+        assert len(bitmap) == 4
+        bitmap.discard(70000)
+        bitmap.discard(3)
+        assert list(bitmap) == [1, 5, 200000]
+
+    def test_operations(self):
+        """Тест операций И, ИЛИ, разность"""
+        a = Bitmap(range(0, 100000, 2))
+        b = Bitmap(range(0, 100000, 3))
+        assert list(a & b) == list(range(0, 100000, 6))
+        assert len(a | b) == len(set(range(0, 100000, 2)) | set(range(0, 100000, 3)))
+        assert list((a - b))[:3] == [2, 4, 8]
+
+    def test_empty(self):
+        """Тест пустого множества"""
+        bitmap = Bitmap()
+        assert not bitmap
+        assert list(bitmap) == []
+        bitmap.add(7)
+        bitmap.discard(7)
+        assert bitmap == Bitmap()
+
+
+class TestBitmapQueries:
+    """Тестирование логических запросов к IndexDict"""
+
+    def setup_method(self):
+        """Настройка теста"""
+        self.prose = FictionBook("Хоббит", "Толкин", 1937, "фэнтези", "1", "проза")
+        self.poem = FictionBook("Руслан и Людмила", "Пушкин", 1820, "фэнтези", "2", "поэзия")
+        self.drama = FictionBook("Буря", "Шекспир", 1611, "фэнтези", "3", "драма")
+        self.regular = RegularBook("Сказки", "Гримм", 1812, "фэнтези", "4")
+        self.novel = FictionBook("Идиот", "Достоевский", 1869, "роман", "5", "проза")
+        self.index = IndexDict()
+        for book in [self.prose, self.poem, self.drama, self.regular, self.novel]:
+            self.index.add_book(book)
+
+    def test_combined_query(self):
+        """Тест запроса "доступные фэнтези FictionBook не поэзия" """
+        self.drama.borrow()
+        self.index.update_book(self.drama)
+        query = Q(available=True, genre="фэнтези", type="FictionBook") & ~Q(literary_genre="поэзия")
+        assert self.index.query(query) == [self.prose]
+        assert self.index.count(query) == 1
+
+    def test_or_and_unindexed(self):
+        """Тест ИЛИ и условий по полям без индекса"""
+        query = Q(genre="роман") | Q(author="Гримм") | Q(title="Буря")
+        assert self.index.query(query) == [self.drama, self.regular, self.novel]
+
+    def test_not_excludes_removed(self):
+        """Тест отрицания после удаления книги"""
+        self.index.remove_book(self.novel)
+        assert self.index.query(~Q(genre="фэнтези")) == []
+
+    def test_availability_index(self):
+        """Тест пересчета индекса доступности"""
+        self.prose.borrow()
+        self.index.update_book(self.prose)
+        assert self.index.lookup("available", False) == [self.prose]
+        self.prose.return_book()
+        self.index.update_book(self.prose)
+        assert self.index.lookup("available", False) == []
+        assert self.index.count(Q(available=True)) == 5
+
+    def test_matches_without_index(self):
+        """Тест проверки условия на книге"""
+        query = Q(genre="фэнтези") & ~Q(literary_genre="поэзия")
+        assert query.matches(self.prose)
+        assert not query.matches(self.poem)
+
+
+class TestLibraryFind:
+    """Тестирование Library.find"""
+
+    def test_find_after_borrow(self):
+        """Тест, что выдача обновляет битовый индекс доступности"""
+        library = Library("Тестовая библиотека")
+        query = Q(available=True, genre="фэнтези")
+        assert len(library.find(query)) == 2
+        library.borrow_book("978-5-389-07429-0")  # Гарри Поттер
+        assert [book.title for book in library.find(query)] == ["Мастер и Маргарита"]
+
+    def test_find_sqlite(self, tmp_path):
+        """Тест запроса к хранилищу без битовых индексов"""
+        from src.library_sim.storage import SQLiteStorage
+        library = Library("Тестовая библиотека", storage=SQLiteStorage(str(tmp_path / "db.sqlite")))
+        library.borrow_book("978-5-389-07429-0")
+        assert len(library.find(Q(available=True, genre="фэнтези"))) == 1
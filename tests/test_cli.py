@@ -0,0 +1,73 @@
+"""
+Тесты для командной строки
+"""
+import io
+import json
+
+from src.app import app
+from src.library_sim.cli import main
+
+WAR_AND_PEACE = "978-5-389-07435-1"
+
+
+def _json_lines(text):
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+class TestCli:
+    """Тестирование подкоманд"""
+
+    def test_simulate_quiet(self, capsys):
+        """Тест воспроизводимой симуляции с JSON-отчетом"""
+        assert main(['simulate', '--steps', '15', '--seed', '3', '--runs', '2', '--quiet']) == 0
+        first = json.loads(capsys.readouterr().out)
+        main(['simulate', '--steps', '15', '--seed', '3', '--runs', '2', '--quiet'])
+        second = json.loads(capsys.readouterr().out)
+        assert [run['seed'] for run in first['runs']] == [3, 4]
+        assert [run['total'] for run in first['runs']] == [run['total'] for run in second['runs']]
+
+    def test_save_load_query(self, tmp_path, capsys):
+        """Тест сохранения, загрузки и поиска по каталогу"""
+        path = str(tmp_path / "catalog.jsonl")
+        main(['save', path, '--synthetic', '50'])
+        assert json.loads(capsys.readouterr().out)['books'] == 57
+        main(['load', path])
+        assert json.loads(capsys.readouterr().out)['books'] == 57
+        main(['query', '--catalog', path, '--author', 'Лев Толстой'])
+        result = json.loads(capsys.readouterr().out)
+        assert result['count'] == 1 and result['books'][0]['isbn'] == WAR_AND_PEACE
+        main(['query', '--where', 'reference_type=словарь', '--jsonl'])
+        assert len(_json_lines(capsys.readouterr().out)) == 1
+
+    def test_batch_from_stdin(self, tmp_path, capsys, monkeypatch):
+        """Тест пакетных операций из stdin с сохранением каталога"""
+        ops = "\n".join([
+            json.dumps({'op': 'borrow', 'isbn': WAR_AND_PEACE}),
+            "не json",
+            json.dumps({'op': 'add', 'book': []}),
+            json.dumps({'op': 'status'}),
+        ])
+        monkeypatch.setattr('sys.stdin', io.StringIO(ops))
+        saved = str(tmp_path / "after.jsonl")
+        assert main(['batch', '--save', saved, '--strict']) == 1
+        results = _json_lines(capsys.readouterr().out)
+        assert [result['ok'] for result in results] == [True, False, False, True]
+        assert results[3]['result']['borrowed'] == 1
+
+        main(['stats', '--catalog', saved])
+        stats = json.loads(capsys.readouterr().out)
+        assert stats['borrowed'] == 1 and stats['types']['FictionBook'] == 3
+
+    def test_app_examples(self, capsys):
+        """Тест подкоманды примеров в app"""
+        assert app(['example', 'simulation']) == 0
+        assert "ЗАПУСК СИМУЛЯЦИИ" in capsys.readouterr().out
+
+    def test_trace_and_replay(self, tmp_path, capsys):
+        """Тест записи симуляции и воспроизведения с проверкой отпечатка"""
+        path = str(tmp_path / "run.trace")
+        main(['simulate', '--steps', '40', '--seed', '9', '--quiet', '--trace', path])
+        digest = json.loads(capsys.readouterr().out)['runs'][0]['digest']
+        assert main(['replay', path, '--quiet', '--expect', digest]) == 0
+        assert json.loads(capsys.readouterr().out)['steps'] == 40
+        assert main(['replay', path, '--quiet', '--expect', 'другой']) == 1
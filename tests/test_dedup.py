@@ -0,0 +1,84 @@
+"""
+Тесты для поиска почти дубликатов
+"""
+import pytest
+
+from src.library_sim.book import RegularBook, FictionBook
+from src.library_sim.dedup import DuplicateIndex, find_duplicates, jaccard, normalize, shingles
+from src.library_sim.library import Library
+from src.library_sim.ops import execute
+from src.library_sim.synthetic import generate_books
+
+WAR_AND_PEACE = "978-5-389-07435-1"
+
+
+class TestDuplicates:
+    """Тестирование поиска почти дубликатов"""
+
+    def setup_method(self):
+        """Настройка теста"""
+        self.library = Library("Тестовая библиотека")
+        self.library.verbose = False
+        self.editions = [
+            RegularBook("Война и мир (подарочное издание)", "Лев Толстой", 2010, "роман", "111"),
+            RegularBook("ВОЙНА И МИР.", "Толстой Лев", 1999, "роман", "222"),
+            FictionBook("Мастер и Маргарита", "М. Булгаков", 2001, "фэнтези", "333"),
+        ]
+
+    def test_normalize(self):
+        """Тест нормализации названия"""
+        assert normalize("Ёлка: сказка (2-е изд.)") == "елка сказка"
+        assert shingles(self.editions[0]) == shingles(RegularBook("Война и мир", "Лев Толстой",
+                                                                  1869, "роман", "1"))
+        assert jaccard(frozenset("abc"), frozenset("abd")) == pytest.approx(0.5)
+
+    def test_bulk_clusters(self):
+        """Тест кластеров изданий одного произведения"""
+        self.library.add_books(self.editions)
+        isbns = [sorted(book.isbn for book in cluster) for cluster in self.library.find_duplicates()]
+        assert isbns == [["111", "222", WAR_AND_PEACE], ["333", "978-5-17-067580-4"]]
+        # Строгий порог: только совпадающие после нормализации
+        strict = self.library.find_duplicates(0.99)
+        assert [sorted(book.isbn for book in cluster) for cluster in strict] == [["111", WAR_AND_PEACE]]
+
+    def test_incremental(self, capsys):
+        """Тест сравнения новой книги с каталогом при добавлении"""
+        index = self.library.track_duplicates()
+        self.library.verbose = True
+        self.library.add_book(self.editions[0])
+        assert "Возможные дубликаты: 'Война и мир' (978-5-389-07435-1)" in capsys.readouterr().out
+        assert [len(cluster) for cluster in self.library.find_duplicates()] == [2]
+
+        self.library.remove_book(WAR_AND_PEACE)
+        assert self.library.find_duplicates() == []
+        assert len(index) == len(self.library.storage)
+
+    def test_matches_exact_comparison(self):
+        """Тест совпадения найденных пар с попарным сравнением"""
+        books = list(generate_books(400, seed=2))
+        books += [RegularBook(book.title + "!", book.author, 2024, book.genre, f"copy-{i}")
+                  for i, book in enumerate(books[:40])]
+        index = DuplicateIndex(threshold=0.9)
+        for slot, book in enumerate(books):
+            index.add(slot, book)
+        found = {frozenset((first.isbn, second.isbn)) for first, second, _ in index.pairs()}
+        sets = [shingles(book) for book in books]
+        expected = {frozenset((books[i].isbn, books[j].isbn))
+                    for i in range(len(books)) for j in range(i + 1, len(books))
+                    if jaccard(sets[i], sets[j]) >= 0.9}
+        assert found <= expected
+        assert len(found) >= 0.9 * len(expected) and len(expected) >= 40
+
+    def test_find_duplicates_function(self):
+        """Тест поиска по произвольному набору книг"""
+        assert find_duplicates(self.editions[:2], threshold=0.5) != []
+        assert find_duplicates(self.editions[2:]) == []
+        with pytest.raises(ValueError):
+            DuplicateIndex(threshold=0)
+
+    def test_duplicates_op(self):
+        """Тест операции duplicates"""
+        self.library.add_books(self.editions)
+        result = execute(self.library, {'op': 'duplicates'})
+        assert [sorted(book['isbn'] for book in cluster) for cluster in result['result']][0] == [
+            "111", "222", WAR_AND_PEACE]
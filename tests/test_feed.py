@@ -0,0 +1,114 @@
+"""
+Тесты для ленты изменений IndexDict
+"""
+import asyncio
+
+import pytest
+from src.library_sim.book import RegularBook
+from src.library_sim.feed import ChangeFeed
+from src.library_sim.library import Library
+from src.library_sim.my_collections import IndexDict
+
+WAR_AND_PEACE = "978-5-389-07435-1"
+
+
+class TestChangeFeed:
+    """Тестирование подписок на изменения"""
+
+    def setup_method(self):
+        """Настройка теста"""
+        self.library = Library("Тестовая библиотека")
+        self.indexes = self.library.indexes
+        self.received = []
+
+    def test_typed_events(self):
+        """Тест типов событий и номеров"""
+        self.indexes.subscribe(self.received.extend)
+        self.library.borrow_book(WAR_AND_PEACE)
+        self.library.return_book(WAR_AND_PEACE)
+        self.library.add_book(RegularBook("Новая", "Автор", 2020, "роман", "999"), silent=True)
+        self.library.remove_book("999")
+
+        assert [event.kind for event in self.received] == ["borrowed", "returned", "added", "removed"]
+        seqs = [event.seq for event in self.received]
+        assert seqs == sorted(seqs) and len(set(seqs)) == 4
+        assert self.received[0].isbn == WAR_AND_PEACE
+        assert self.received[0].slot == self.indexes.slot_of(WAR_AND_PEACE)
+
+    def test_failed_borrow_publishes_nothing(self):
+        """Тест отсутствия события при неудачной выдаче"""
+        self.library.borrow_book(WAR_AND_PEACE)
+        self.indexes.subscribe(self.received.extend)
+        self.library.borrow_book(WAR_AND_PEACE)
+        assert self.received == []
+
+    def test_batches(self):
+        """Тест пакетной доставки"""
+        batches = []
+        subscription = self.indexes.subscribe(batches.append, batch_size=3)
+        isbns = list(self.indexes)
+        # Словарь и энциклопедия не выдаются на дом
+        for isbn in isbns[:2] + isbns[4:6]:
+            self.library.borrow_book(isbn)
+        assert [len(batch) for batch in batches] == [3]
+        subscription.close()
+        assert [len(batch) for batch in batches] == [3, 1]
+
+    def test_resume_from_seq(self):
+        """Тест возобновления с номера события"""
+        # Начальный набор книг уже опубликован как события added
+        start = self.indexes.feed.last_seq
+        self.library.borrow_book(WAR_AND_PEACE)
+        self.library.return_book(WAR_AND_PEACE)
+        self.indexes.subscribe(self.received.extend, from_seq=start)
+        assert [event.kind for event in self.received] == ["borrowed", "returned"]
+
+        replay = []
+        self.indexes.subscribe(replay.extend, from_seq=0)
+        assert len(replay) == start + 2
+
+    def test_resume_gap(self):
+        """Тест ошибки при возобновлении с вытесненного номера"""
+        feed = ChangeFeed(retention=2)
+        index = IndexDict()
+        index.feed = feed
+        for number in range(5):
+            index.add_book(RegularBook("Книга", "Автор", 2020, "роман", str(number)))
+        with pytest.raises(ValueError):
+            feed.subscribe(self.received.extend, from_seq=1)
+        feed.subscribe(self.received.extend, from_seq=3)
+        assert [event.isbn for event in self.received] == ["3", "4"]
+
+    def test_async_stream(self):
+        """Тест асинхронного итератора"""
+        async def consume():
+            batches = []
+            stream = self.indexes.feed.stream(batch_size=2)
+            consumer = asyncio.ensure_future(stream.__anext__())
+            await asyncio.sleep(0)
+            self.library.borrow_book(WAR_AND_PEACE)
+            self.library.return_book(WAR_AND_PEACE)
+            batches.append(await consumer)
+            await stream.aclose()
+            return batches
+
+        batches = asyncio.run(consume())
+        assert [[event.kind for event in batch] for batch in batches] == [["borrowed", "returned"]]
+        assert self.indexes.feed.stats()['subscriptions'] == 0
+
+    def test_async_stream_overflow(self):
+        """Тест ограниченной очереди: медленный читатель получает все события по порядку"""
+        async def consume():
+            stream = self.indexes.feed.stream(max_pending=2)
+            consumer = asyncio.ensure_future(stream.__anext__())
+            await asyncio.sleep(0)
+            for number in range(10):
+                self.library.add_book(RegularBook("Книга", "Автор", 2020, "роман", str(number)), silent=True)
+            seqs = [event.seq for event in await consumer]
+            while len(seqs) < 10:
+                seqs.extend(event.seq for event in await stream.__anext__())
+            await stream.aclose()
+            return seqs
+
+        seqs = asyncio.run(consume())
+        assert seqs == list(range(seqs[0], seqs[0] + 10))
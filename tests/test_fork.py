@@ -0,0 +1,125 @@
+"""
+Тесты для ответвлений библиотеки с копированием при записи
+"""
+from src.library_sim.book import RegularBook
+from src.library_sim.library import Library
+from src.library_sim.metrics import Metrics
+from src.library_sim.query import Q
+from src.library_sim.simulation import run_simulation
+from src.library_sim.storage import CowStorage, SQLiteStorage
+
+WAR_AND_PEACE = "978-5-389-07435-1"
+POTTER = "978-5-389-07429-0"
+
+
+class TestLibraryFork:
+    """Тестирование Library.fork"""
+
+    def setup_method(self):
+        """Настройка теста"""
+        self.library = Library("Тестовая библиотека")
+        self.initial = [book.to_dict() for book in self.library.books]
+
+    def test_fork_shares_base(self):
+        """Тест общей базы у родителя и ответвлений"""
+        first = self.library.fork("Ветка 1")
+        second = self.library.fork("Ветка 2")
+        assert isinstance(first.storage, CowStorage)
+        assert first.storage.base is second.storage.base is self.library.storage
+        assert [book.to_dict() for book in first.books] == self.initial
+
+    def test_borrow_is_isolated(self):
+        """Тест, что выдача в ответвлении не видна в других"""
+        fork = self.library.fork()
+        assert fork.borrow_book(WAR_AND_PEACE) == True
+        assert fork.get_book(WAR_AND_PEACE).is_available == False
+        assert self.library.get_book(WAR_AND_PEACE).is_available == True
+        assert self.library.borrow_book(WAR_AND_PEACE) == True
+        assert fork.borrow_book(WAR_AND_PEACE) == False
+        assert fork.storage.count_available() == len(self.initial) - 1
+
+    def test_add_remove_isolated(self):
+        """Тест добавления и удаления в ответвлении"""
+        fork = self.library.fork()
+        fork.add_book(RegularBook("Новая", "Автор", 2020, "роман", "999"), silent=True)
+        fork.remove_book(POTTER)
+        assert len(fork.books) == len(self.initial)
+        assert "999" in fork.indexes
+        assert POTTER not in fork.indexes
+        assert fork.get_book(POTTER) is None
+        assert POTTER in self.library.indexes
+        assert "999" not in self.library.indexes
+
+    def test_order_and_search(self):
+        """Тест порядка книг и поиска с учетом изменений"""
+        fork = self.library.fork()
+        fork.borrow_book(WAR_AND_PEACE)
+        assert [book.isbn for book in fork.books] == [book['isbn'] for book in self.initial]
+        results = fork.search_books(author="Лев Толстой")
+        assert len(results) == 1 and results[0].is_available == False
+        assert len(fork.find(Q(available=True, genre="роман"))) == 1
+        assert len(fork.search_by_keyword("война")) == 1
+
+    def test_fork_of_fork(self):
+        """Тест ответвления от ответвления"""
+        fork = self.library.fork()
+        fork.borrow_book(WAR_AND_PEACE)
+        grandchild = fork.fork()
+        grandchild.return_book(WAR_AND_PEACE)
+        assert grandchild.get_book(WAR_AND_PEACE).is_available == True
+        assert fork.get_book(WAR_AND_PEACE).is_available == False
+
+    def test_simulation_on_forks(self):
+        """Тест запуска симуляций на ответвлениях одной базы"""
+        for seed in range(3):
+            run_simulation(steps=30, seed=seed, library=self.library.fork())
+        assert [book.to_dict() for book in self.library.books] == self.initial
+
+    def test_parent_changes_isolated(self):
+        """Тест, что изменения родителя после ответвления не видны в нем"""
+        fork = self.library.fork()
+        self.library.borrow_book(WAR_AND_PEACE)
+        self.library.remove_book(POTTER)
+        self.library.add_book(RegularBook("Новая", "Автор", 2020, "роман", "999"), silent=True)
+        assert fork.get_book(WAR_AND_PEACE).is_available == True
+        assert fork.get_book(POTTER) is not None
+        assert "999" not in fork.indexes
+        assert sorted(book.isbn for book in fork.books) == sorted(book['isbn'] for book in self.initial)
+        assert fork.storage.count_available() == len(self.initial)
+        assert len(fork.find(Q(available=True, genre="роман"))) == 2
+        assert fork.verify() == []
+
+    def test_parent_indexes_after_fork(self):
+        """Тест подписки и объявления индекса у родителя после ответвления"""
+        events = []
+        self.library.indexes.subscribe(events.extend)
+        self.library.fork()
+        self.library.indexes.subscribe(events.extend)
+        self.library.indexes.register_index('publisher', kind='bitmap')
+        assert 'publisher' in self.library.indexes.get_index_names()
+        assert Metrics().snapshot(self.library)['index_buckets']['genre']
+        self.library.borrow_book(WAR_AND_PEACE)
+        self.library.return_book(WAR_AND_PEACE)
+        assert [event.kind for event in events] == ['borrowed', 'borrowed', 'returned', 'returned']
+
+    def test_dropped_fork_unsubscribes(self):
+        """Тест, что удаленное ответвление не остается подписчиком"""
+        before = self.library.indexes.feed.stats()['subscriptions']
+        fork = self.library.fork()
+        assert self.library.indexes.feed.stats()['subscriptions'] == before + 1
+        del fork
+        assert self.library.indexes.feed.stats()['subscriptions'] == before
+
+    def test_sqlite_parent_keeps_writing(self, tmp_path):
+        """Тест, что ответвление каталога SQLite не меняет хранилище родителя"""
+        path = str(tmp_path / "catalog.db")
+        library = Library("SQLite", storage=SQLiteStorage(path))
+        library.verbose = False
+        fork = library.fork()
+        library.borrow_book(WAR_AND_PEACE)
+        fork.remove_book(POTTER)
+        assert isinstance(library.storage, SQLiteStorage)
+        assert fork.get_book(WAR_AND_PEACE).is_available == True
+        reopened = SQLiteStorage(path)
+        assert reopened.get(WAR_AND_PEACE).is_available == False
+        assert POTTER in reopened
@@ -0,0 +1,81 @@
+"""
+Тесты для журнала выдач
+"""
+import pytest
+from src.library_sim.history import LoanHistory, DAY, HOUR
+from src.library_sim.library import Library
+
+
+class TestLoanHistory:
+    """Тестирование LoanHistory"""
+
+    def setup_method(self):
+        """Настройка теста"""
+        self.history = LoanHistory(chunk_size=4, max_chunks_in_memory=2)
+        # Неделя: по две выдачи фэнтези и одной выдаче романа каждый день
+        for day in range(7):
+            base = day * DAY
+            self.history.record("111", "borrow", base + 1 * HOUR, "фэнтези")
+            self.history.record("222", "borrow", base + 5 * HOUR, "фэнтези")
+            self.history.record("333", "borrow", base + 20 * HOUR, "роман")
+            self.history.record("111", "return", base + 23 * HOUR, "фэнтези")
+
+    def test_len(self):
+        """Тест количества событий"""
+        assert len(self.history) == 28
+
+    def test_count_full_range(self):
+        """Тест подсчета за всю неделю"""
+        assert self.history.count("borrow") == 21
+        assert self.history.count("borrow", genre="фэнтези") == 14
+        assert self.history.count("return") == 7
+
+    def test_count_partial_days(self):
+        """Тест подсчета по интервалу с неполными днями"""
+        start = 2 * HOUR  # после первой выдачи нулевого дня
+        end = 2 * DAY + 6 * HOUR  # включая утренние выдачи третьего дня
+        assert self.history.count("borrow", start, end, genre="фэнтези") == 5
+        assert self.history.count("borrow", start, end) == 7
+
+    def test_count_by_genre(self):
+        """Тест разбивки по жанрам"""
+        result = self.history.count_by_genre("borrow", 0, 2 * DAY)
+        assert result == {"фэнтези": 4, "роман": 2}
+
+    def test_timeline(self):
+        """Тест ряда по дням"""
+        series = self.history.timeline("borrow", granularity="day")
+        assert len(series) == 7
+        assert all(n == 3 for _, n in series)
+
+    def test_chunks_bounded(self):
+        """Тест ограничения фрагментов в памяти без каталога для вытеснения"""
+        assert len(self.history._chunks) <= 2
+        assert self.history.dropped_events > 0
+        # Агрегаты по-прежнему учитывают все события
+        assert self.history.count("borrow") == 21
+
+    def test_spill_to_disk(self, tmp_path):
+        """Тест вытеснения фрагментов на диск и перебора сырых событий"""
+        history = LoanHistory(chunk_size=2, max_chunks_in_memory=1, spill_dir=str(tmp_path))
+        for i in range(7):
+            history.record(str(i), "borrow", float(i))
+        assert history.dropped_events == 0
+        events = list(history.iter_events())
+        assert [isbn for isbn, _, _ in events] == [str(i) for i in range(7)]
+        assert len(list(history.iter_events(2, 5))) == 3
+
+    def test_unknown_event(self):
+        """Тест неизвестного типа события"""
+        with pytest.raises(ValueError):
+            self.history.record("111", "lost", 0.0)
+
+    def test_library_records_loans(self):
+        """Тест записи выдач и возвратов библиотекой"""
+        library = Library("Тестовая библиотека")
+        library.clock = lambda: 10 * DAY
+        isbn = "978-5-17-067580-4"  # Мастер и Маргарита, фэнтези
+        library.borrow_book(isbn)
+        library.return_book(isbn)
+        assert library.history.count("borrow", genre="фэнтези") == 1
+        assert library.history.count("return", 10 * DAY, 11 * DAY) == 1
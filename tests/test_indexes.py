@@ -0,0 +1,196 @@
+"""
+Тесты для реестра индексов IndexDict
+"""
+from random import Random
+
+import pytest
+from src.library_sim.book import RegularBook, ReferenceBook, FictionBook
+from src.library_sim.library import Library
+from src.library_sim.my_collections import BookCollection, IndexDict
+from src.library_sim.storage import MemoryStorage
+
+
+class TestIndexRegistry:
+    """Тестирование объявляемых индексов"""
+
+    def setup_method(self):
+        """Настройка теста"""
+        self.regular = RegularBook("Война и мир", "Лев Толстой", 1869, "роман", "111")
+        self.dictionary = ReferenceBook("Толковый словарь", "Владимир Даль", 1880, "словарь", "222", "словарь")
+        self.handbook = ReferenceBook("Справочник химика", "Коллектив", 1990, "химия", "333", "справочник")
+        self.poem = FictionBook("Евгений Онегин", "Александр Пушкин", 1833, "роман", "444", "поэзия")
+        self.prose = FictionBook("Мастер и Маргарита", "Михаил Булгаков", 1967, "фэнтези", "555", "проза")
+        self.index = IndexDict()
+        for book in [self.regular, self.dictionary, self.handbook, self.poem, self.prose]:
+            self.index.add_book(book)
+
+    def test_default_indexes(self):
+        """Тест индексов, объявленных по умолчанию"""
+        assert self.index.lookup("reference_type", "словарь") == [self.dictionary]
+        assert self.index.lookup("literary_genre", "поэзия") == [self.poem]
+        assert self.index.lookup("type", "FictionBook") == [self.poem, self.prose]
+        assert self.index.lookup("library_use_only", True) == [self.dictionary]
+        # Книги без атрибута в индекс не попадают
+        assert len(self.index["literary_genre"]) == 2
+
+    @pytest.mark.parametrize("kind", ["hash", "sorted", "bitmap"])
+    def test_register_bulk_and_incremental(self, kind):
+        """Тест построения нового индекса по вычисляемому свойству"""
+        self.index.register_index("decade", key=lambda book: book.year // 10 * 10, kind=kind)
+        assert self.index.lookup("decade", 1860) == [self.regular]
+
+        late = RegularBook("Анна Каренина", "Лев Толстой", 1867, "роман", "666")
+        self.index.add_book(late)
+        assert self.index.lookup("decade", 1860) == [self.regular, late]
+
+        self.index.remove_book(self.regular)
+        assert self.index.lookup("decade", 1860) == [late]
+        self.index.remove_book(late)
+        assert self.index.lookup("decade", 1860) == []
+        assert 1860 not in self.index["decade"]
+
+    def test_register_errors(self):
+        """Тест ошибок объявления индексов"""
+        with pytest.raises(ValueError):
+            self.index.register_index("author")
+        with pytest.raises(ValueError):
+            self.index.register_index("publisher", kind="btree")
+        with pytest.raises(KeyError):
+            self.index.lookup("publisher", "Эксмо")
+
+    def test_drop_index(self):
+        """Тест удаления индекса"""
+        self.index.register_index("publisher")
+        self.index.drop_index("publisher")
+        assert "publisher" not in self.index.get_index_names()
+
+    def test_range_search(self):
+        """Тест поиска по диапазону упорядоченного индекса"""
+        results = self.index.range_search("year", 1860, 1900)
+        assert results == [self.regular, self.dictionary]
+        with pytest.raises(KeyError):
+            self.index.range_search("author", "А", "Я")
+
+    def test_search_predicates(self):
+        """Тест поиска по произвольным условиям"""
+        assert self.index.search(genre="роман", type="FictionBook") == [self.poem]
+        assert self.index.search(genre="роман", literary_genre="проза") == []
+        # Поле без индекса проверяется по атрибуту
+        assert self.index.search(title="Толковый словарь") == [self.dictionary]
+        assert self.index.search(author=None) == []
+
+
+    def test_postings_are_slot_ids(self):
+        """Тест хранения номеров слотов вместо книг"""
+        postings = self.index["author"].postings("Лев Толстой")
+        assert list(postings) == [self.index.slot_of("111")]
+        assert postings.typecode == 'I'
+        assert self.index.search(author="Александр Пушкин", genre="роман", year=1833) == [self.poem]
+        self.index.remove_book(self.poem)
+        assert self.index.search(author="Александр Пушкин") == []
+        assert "Александр Пушкин" not in self.index["author"]
+
+    def test_isbn_index_view(self):
+        """Тест индекса ISBN поверх таблицы номеров"""
+        isbns = self.index["isbn"]
+        assert isbns["222"] is self.dictionary
+        assert list(isbns) == ["111", "222", "333", "444", "555"]
+        self.index.remove_book(self.dictionary)
+        assert "222" not in isbns and len(isbns) == 4
+        assert self.index.get_book_by_isbn("222") is None
+
+    def test_slots_are_reused(self):
+        """Тест повторного использования слотов удаленных книг"""
+        slot = self.index.slot_of("222")
+        self.index.remove_book(self.dictionary)
+        other = ReferenceBook("Словарь синонимов", "Коллектив", 2001, "словарь", "777", "словарь")
+        self.index.add_book(other)
+        assert self.index.slot_of("777") == slot
+        assert self.index.lookup("reference_type", "словарь") == [other]
+        assert self.index.search(author="Коллектив") == [other, self.handbook]  # По номеру слота
+        for _ in range(100):
+            self.index.remove_book(other)
+            self.index.add_book(other)
+        assert len(self.index._slots) == 5
+        assert self.index.verify() == []
+
+
+class TestBookCollectionRemoval:
+    """Тестирование удаления из BookCollection"""
+
+    def test_remove_keeps_order(self):
+        """Тест порядка книг и доступа по номеру после удалений"""
+        books = [RegularBook(f"Книга {number}", "Автор", 2020, "роман", str(number)) for number in range(10)]
+        collection = BookCollection(list(books))
+        assert collection.remove(books[3]) == True
+        assert collection.remove(books[3]) == False
+        assert books[3] not in collection and books[4] in collection
+        assert len(collection) == 9
+        assert [book.isbn for book in collection] == [str(number) for number in range(10) if number != 3]
+        assert collection[3] is books[4]
+        for book in books[5:]:
+            collection.remove(book)
+        collection.add(books[3])
+        assert [book.isbn for book in collection] == ["0", "1", "2", "4", "3"]
+        assert collection[-1] is books[3]
+
+    def test_repeated_isbn(self):
+        """Тест повторяющихся ISBN: удаляется первый экземпляр, как в list.remove"""
+        first, second = (RegularBook(f"Книга {number}", "Автор", 2020, "роман", str(number)) for number in range(2))
+        collection = BookCollection([first, first, second])
+        assert collection.remove(first) == True
+        assert first in collection and len(collection) == 2
+        assert list(collection) == [first, second]
+        assert collection.remove(first) == True
+        assert first not in collection and collection.remove(first) == False
+        collection.add(second)
+        collection.remove(second)
+        assert list(collection) == [second]
+
+    def test_random_pick_without_compaction(self):
+        """Тест случайного выбора книги после удалений без уплотнения коллекции"""
+        storage = MemoryStorage()
+        books = [RegularBook(f"Книга {number}", "Автор", 2020, "роман", str(number)) for number in range(10)]
+        storage.add_many(books)
+        storage.remove(books[3])
+        rng = Random(1)
+        picked = {storage.random_book(rng).isbn for _ in range(200)}
+        assert picked == {str(number) for number in range(10) if number != 3}
+        assert storage.books._holes == 1
+        assert MemoryStorage().random_book(rng) is None
+        assert storage.verify(sample=20, rng=rng) == []
+
+
+class TestLibrarySearch:
+    """Тестирование Library.search_books с произвольными условиями"""
+
+    def setup_method(self):
+        """Настройка теста"""
+        self.library = Library("Тестовая библиотека")
+
+    def test_search_by_custom_fields(self):
+        """Тест поиска по полям подклассов"""
+        results = self.library.search_books(reference_type="словарь")
+        assert [book.title for book in results] == ["Толковый словарь"]
+
+        results = self.library.search_books(genre="фэнтези", literary_genre="проза")
+        assert len(results) == 2
+
+    def test_search_is_conjunction(self):
+        """Тест, что все условия выполняются одновременно"""
+        assert len(self.library.search_books(author="Неизвестный", year=1869)) == 0
+
+    def test_get_books_by_type(self):
+        """Тест получения книг по типу через индекс"""
+        assert len(self.library.get_books_by_type(FictionBook)) == 3
+        assert len(self.library.get_books_by_type(ReferenceBook)) == 2
+        assert len(self.library.get_books_by_type(RegularBook)) == 2
+
+    def test_sqlite_custom_fields(self, tmp_path):
+        """Тест условий по полям подклассов в SQLite"""
+        from src.library_sim.storage import SQLiteStorage
+        library = Library("Тестовая библиотека", storage=SQLiteStorage(str(tmp_path / "db.sqlite")))
+        assert len(library.search_books(reference_type="энциклопедия")) == 1
+        assert len(library.search_books(literary_genre="проза", genre="фэнтези")) == 2
+        assert len(library.search_books(library_use_only=True)) == 2
+        assert len(library.get_books_by_type(FictionBook)) == 3
@@ -0,0 +1,85 @@
+"""
+Тесты для метрик операций
+"""
+from src.library_sim.library import Library
+from src.library_sim.metrics import LatencyHistogram, Metrics, _bucket_bounds, _bucket_index
+from src.library_sim.simulation import run_simulation
+
+
+class TestLatencyHistogram:
+    """Тестирование LatencyHistogram"""
+
+    def test_bucket_bounds_contain_value(self):
+        """Тест, что корзина содержит значение и точность не хуже 1/8"""
+        for value in [0, 1, 15, 16, 17, 100, 1000, 123456, 10 ** 9]:
+            low, high = _bucket_bounds(_bucket_index(value))
+            assert low <= value <= high
+            assert high - low <= max(1, low // 8)
+
+    def test_percentiles(self):
+        """Тест оценки перцентилей"""
+        histogram = LatencyHistogram()
+        for value in range(1, 1001):
+            histogram.record(value * 1000)
+        assert histogram.count == 1000
+        assert 450_000 <= histogram.percentile(50) <= 570_000
+        assert histogram.percentile(100) == 1_000_000
+        assert histogram.cumulative()[-1][1] == 1000
+
+
+class TestLibraryMetrics:
+    """Тестирование замеров Library"""
+
+    def setup_method(self):
+        """Настройка теста"""
+        self.library = Library("Тестовая библиотека")
+
+    def test_disabled_by_default(self):
+        """Тест отсутствия оберток без включения замеров"""
+        assert self.library.metrics is None
+        assert 'borrow_book' not in self.library.__dict__
+
+    def test_snapshot(self):
+        """Тест снимка метрик с попаданиями и промахами"""
+        metrics = self.library.enable_metrics()
+        self.library.borrow_book("978-5-389-07435-1")
+        self.library.borrow_book("000-0-00-000000-0")
+        self.library.search_books(genre="фэнтези")
+        snapshot = metrics.snapshot(self.library)
+
+        borrow = snapshot['operations']['borrow_book']
+        assert borrow['count'] == 2
+        assert borrow['hits'] == 1
+        assert borrow['misses'] == 1
+        assert snapshot['operations']['search_books']['hits'] == 1
+        assert sum(snapshot['index_buckets']['genre'].values()) == len(self.library.indexes['genre'])
+
+    def test_disable(self):
+        """Тест выключения замеров"""
+        metrics = self.library.enable_metrics()
+        self.library.disable_metrics()
+        self.library.return_book("978-5-389-07435-1")
+        assert metrics.histograms == {}
+        assert self.library.metrics is None
+
+    def test_prometheus_file(self, tmp_path):
+        """Тест выгрузки в формате Prometheus"""
+        metrics = self.library.enable_metrics(Metrics())
+        self.library.search_by_keyword("мир")
+        path = tmp_path / "library.prom"
+        metrics.write_prometheus(str(path), self.library)
+        text = path.read_text(encoding='utf-8')
+        assert 'library_operation_seconds_count{operation="search_by_keyword"} 1' in text
+        assert 'le="+Inf"' in text
+        assert 'library_index_buckets{index="author"' in text
+
+
+class TestSimulationProfile:
+    """Тестирование режима профилирования симуляции"""
+
+    def test_profile_report(self, capsys):
+        """Тест печати затрат по событиям"""
+        run_simulation(steps=10, seed=1, profile=True)
+        output = capsys.readouterr().out
+        assert "Затраты по типам событий" in output
+        assert "Доля" in output
@@ -0,0 +1,130 @@
+"""
+Тесты для читателей и лимитов выдачи
+"""
+import random
+
+import pytest
+
+from src.library_sim.book import FictionBook
+from src.library_sim.library import Library
+from src.library_sim.ops import execute
+from src.library_sim.patrons import DAY, PatronRegistry
+from src.library_sim.simulation import replay_simulation, run_simulation
+
+WAR_AND_PEACE = "978-5-389-07435-1"
+CRIME = "978-5-17-090665-5"
+MASTER = "978-5-17-067580-4"
+ORWELL = "978-5-17-080115-9"
+POTTER = "978-5-389-07429-0"
+DICTIONARY = "978-5-17-090689-1"
+
+
+class TestPatronRegistry:
+    """Тестирование PatronRegistry"""
+
+    def setup_method(self):
+        """Настройка теста"""
+        self.library = Library("Тестовая библиотека")
+        self.library.verbose = False
+        self.library.clock = lambda: 1000.0
+        self.student = self.library.patrons.add_patron("Анна", category='student')
+        self.staff = self.library.patrons.add_patron("Борис", category='staff')
+
+    def test_reverse_index(self):
+        """Тест книг читателя и обратного индекса ISBN -> читатель"""
+        assert self.library.borrow_book(WAR_AND_PEACE, patron=self.student) == True
+        assert self.library.borrow_book(MASTER, patron=self.staff) == True
+        assert self.library.patrons.borrower_of(WAR_AND_PEACE) == self.student
+        assert [book.isbn for book in self.library.patron_books(self.staff)] == [MASTER]
+        loan = self.library.patrons.loan(MASTER)
+        assert loan.due == 1000.0 + 21 * DAY
+
+        assert self.library.return_book(WAR_AND_PEACE) == True
+        assert self.library.patrons.borrower_of(WAR_AND_PEACE) is None
+        assert len(self.library.patron_books(self.student)) == 0
+        assert self.library.patrons.active_loans() == 1
+
+    def test_loan_count_limit(self):
+        """Тест лимита числа книг на руках"""
+        for number in range(3):
+            self.library.add_book(FictionBook(f"Книга {number}", "Автор", 2000, "роман", f"N{number}"),
+                                  silent=True)
+        assert self.library.borrow_book(WAR_AND_PEACE, patron=self.student) == True
+        assert self.library.borrow_book(CRIME, patron=self.student) == True
+        assert self.library.borrow_book(ORWELL, patron=self.student) == False  # 14 + 14 + 21 > 42
+        assert self.library.borrow_book("N0", patron=self.staff) == True
+        assert self.library.get_book(ORWELL).is_available
+
+        registry = self.library.patrons
+        category = registry.category(self.student)
+        assert category.max_loans == 3 and "лимит 42" in registry.check(self.student, self.library.get_book(ORWELL))
+        self.library.return_book(CRIME)
+        assert self.library.borrow_book(ORWELL, patron=self.student) == True
+
+    def test_extensions(self):
+        """Тест продления с учетом can_be_extended и лимита категории"""
+        self.library.borrow_book(MASTER, patron=self.student)
+        assert self.library.extend_loan(MASTER) == True
+        assert self.library.extend_loan(MASTER) == False  # Студенту одно продление
+        assert self.library.patrons.loan(MASTER).due == 1000.0 + 42 * DAY
+        self.library.borrow_book(POTTER, patron=self.staff)
+        assert self.library.extend_loan(POTTER) and self.library.extend_loan(POTTER)
+        assert self.library.extend_loan(WAR_AND_PEACE) == False  # Не выдана читателю
+
+    def test_unknown_patron(self):
+        """Тест выдачи незарегистрированному читателю"""
+        assert self.library.borrow_book(WAR_AND_PEACE, patron=99) == False
+        assert self.library.get_book(WAR_AND_PEACE).is_available
+        with pytest.raises(KeyError):
+            self.library.patrons.loans_of(99)
+        with pytest.raises(ValueError):
+            self.library.patrons.add_patron(category='vip')
+
+    def test_remove_and_fork(self):
+        """Тест снятия выдачи при удалении книги и копии реестра в ответвлении"""
+        self.library.borrow_book(WAR_AND_PEACE, patron=self.student)
+        self.library.borrow_book(CRIME, patron=self.student)
+        child = self.library.fork()
+        self.library.remove_book(WAR_AND_PEACE)
+        assert self.library.patrons.loans_of(self.student)[0].isbn == CRIME
+        assert child.patrons.borrower_of(WAR_AND_PEACE) == self.student
+        child.return_book(CRIME)
+        assert self.library.patrons.borrower_of(CRIME) == self.student
+
+    def test_population(self):
+        """Тест сгенерированной популяции читателей"""
+        registry = PatronRegistry()
+        patrons = registry.add_patrons(100_000, random.Random(1))
+        assert len(patrons) == len(registry) == 100_000
+        stats = registry.stats()
+        assert sum(stats['categories'].values()) == 100_000
+        assert stats['categories']['standard'] > stats['categories']['student'] > stats['categories']['staff']
+        assert registry.name(5) == "Читатель 5"
+
+
+class TestPatronSimulation:
+    """Тестирование симуляции с читателями"""
+
+    def test_simulation_with_patrons(self, capsys):
+        """Тест воспроизведения симуляции с популяцией читателей"""
+        library = Library("Симуляционная библиотека")
+        trace = run_simulation(steps=200, seed=4, library=library, patrons=1000)
+        assert trace.events[0] == ("populate_patrons", trace.events[0][1])
+        assert len(trace) == 201
+        assert any(event == "patron_borrow" for event, _ in trace)
+        replayed = replay_simulation(trace)
+        assert len(replayed.patrons) == 1000
+        assert replayed.patrons.active_loans() == library.patrons.active_loans()
+        assert {isbn: replayed.patrons.borrower_of(isbn) for isbn in replayed.storage.indexes} == \
+            {isbn: library.patrons.borrower_of(isbn) for isbn in library.storage.indexes}
+
+    def test_patron_operations(self):
+        """Тест операций с читателями"""
+        library = Library("Тестовая библиотека")
+        library.verbose = False
+        patron = execute(library, {'op': 'register', 'name': "Вера"})['result']
+        assert execute(library, {'op': 'borrow', 'isbn': DICTIONARY, 'patron': patron})['result'] == False
+        assert execute(library, {'op': 'borrow', 'isbn': MASTER, 'patron': patron})['result'] == True
+        result = execute(library, {'op': 'patron', 'patron': patron})['result']
+        assert result['name'] == "Вера" and [loan['isbn'] for loan in result['loans']] == [MASTER]
+        assert execute(library, {'op': 'patron', 'patron': 7})['ok'] == False
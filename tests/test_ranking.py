@@ -0,0 +1,112 @@
+"""
+Тесты для ранжированного поиска
+"""
+import math
+
+import pytest
+
+from src.library_sim.book import RegularBook
+from src.library_sim.library import Library
+from src.library_sim.my_collections import ScoredBookCollection
+from src.library_sim.ops import execute
+from src.library_sim.ranking import TextIndex, tokenize
+from src.library_sim.storage import SQLiteStorage
+from src.library_sim.synthetic import generate_books
+
+MASTER = "978-5-389-07435-1"
+
+
+def brute_force(index: TextIndex, query: str, k: int):
+    """Оценки BM25 всех книг без отсечения (для сравнения)"""
+    words = []
+    for term in tokenize(query):
+        words.extend(word for word in index.expand(term) if word not in words)
+    average = index._total_length / len(index)
+    scores = {}
+    for word in words:
+        slots, freqs = index._postings[word]
+        idf = math.log(1 + (len(index) - len(slots) + 0.5) / (len(slots) + 0.5))
+        for slot, freq in zip(slots, freqs):
+            norm = index.k1 * (1 - index.b + index.b * index._lengths[slot] / average)
+            scores[slot] = scores.get(slot, 0.0) + idf * freq * (index.k1 + 1) / (freq + norm)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+
+class TestTextIndex:
+    """Тестирование TextIndex"""
+
+    def setup_method(self):
+        """Настройка теста"""
+        self.library = Library("Тестовая библиотека")
+        self.library.verbose = False
+        self.library.add_books(generate_books(3000, seed=2))
+        self.index = TextIndex(self.library.indexes)
+
+    def test_wand_matches_full_scoring(self):
+        """Тест совпадения отбора WAND с полным подсчетом"""
+        for query in ["мир война", "мастер ночь 1850", "роман", "зим", "тень сад огонь", "автор 7"]:
+            expected = brute_force(self.index, query, 10)
+            result = self.index.top_k(query, 10)
+            assert [slot for slot, _ in expected] == [slot for _, slot in result]
+            assert [score for score, _ in result] == pytest.approx([score for _, score in expected])
+
+    def test_follows_feed(self):
+        """Тест обновления индекса по ленте изменений"""
+        book = RegularBook("Редкостный переплет", "Автор", 2020, "роман", "999")
+        self.library.add_book(book, silent=True)
+        assert [self.library.indexes.book_at(slot) for _, slot in self.index.top_k("редкостный")] == [book]
+        self.library.remove_book("999")
+        assert self.index.top_k("редкостный") == []
+        assert len(self.index) == 3007
+
+    def test_prefix_expansion(self):
+        """Тест поиска по началу слова и чисел целиком"""
+        assert self.index.expand("зим") == ["зима"]
+        assert self.index.expand("18") == ["18"]
+        assert "1850" in self.index.expand("1850")
+
+
+class TestLibraryRanked:
+    """Тестирование ранжированного поиска в библиотеке"""
+
+    def setup_method(self):
+        """Настройка теста"""
+        self.library = Library("Тестовая библиотека")
+        self.library.verbose = False
+
+    def test_scored_collection(self):
+        """Тест коллекции с оценками"""
+        results = self.library.search_ranked("война мир толстой")
+        assert isinstance(results, ScoredBookCollection)
+        assert results[0].isbn == MASTER
+        assert results.scores == sorted(results.scores, reverse=True)
+        top = results[:1]
+        assert isinstance(top, ScoredBookCollection) and top.scores == results.scores[:1]
+        assert results.score_of(results[0]) == results.scores[0]
+
+    def test_subset_of_keyword_search(self):
+        """Тест, что найденные книги содержат ключевое слово"""
+        for keyword in ["мир", "фэнтези", "1949", "булгаков"]:
+            ranked = {book.isbn for book in self.library.search_ranked(keyword, k=100)}
+            found = {book.isbn for book in self.library.search_by_keyword(keyword)}
+            assert ranked and ranked <= found
+
+    def test_field_weights(self):
+        """Тест влияния весов полей"""
+        self.library.add_book(RegularBook("Булгаков", "Иван Петров", 2000, "биография", "999"), silent=True)
+        by_title = self.library.search_ranked("булгаков", weights={'title': 5.0, 'author': 1.0})
+        by_author = self.library.search_ranked("булгаков", weights={'title': 1.0, 'author': 5.0})
+        assert by_title[0].isbn == "999"
+        assert by_author[0].isbn == "978-5-17-067580-4"
+
+    def test_other_storage(self, tmp_path):
+        """Тест ранжирования в хранилище без индекса слов"""
+        library = Library("Тестовая библиотека", storage=SQLiteStorage(str(tmp_path / "catalog.db")))
+        assert library.search_ranked("война мир")[0].isbn == MASTER
+        library.storage.close()
+
+    def test_rank_operation(self):
+        """Тест операции rank"""
+        result = execute(self.library, {'op': 'rank', 'query': "фэнтези", 'k': 1})
+        assert result['ok'] and len(result['result']) == 1
+        assert result['result'][0]['genre'] == "фэнтези" and result['result'][0]['score'] > 0
@@ -0,0 +1,196 @@
+"""
+Тесты для HTTP/JSON сервера библиотеки
+"""
+import asyncio
+import json
+
+from src.library_sim.library import Library
+from src.library_sim.ops import execute, execute_many
+from src.library_sim.server import LibraryServer
+
+WAR_AND_PEACE = "978-5-389-07435-1"
+
+
+async def _request(reader, writer, method, path, payload=None, headers=()):
+    """Отправить запрос по открытому соединению и прочитать ответ"""
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    lines = [f"{method} {path} HTTP/1.1", "Host: test", f"Content-Length: {len(body)}", *headers]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    response_headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1').strip()
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        response_headers[name.lower()] = value.strip()
+
+    if response_headers.get('transfer-encoding') == 'chunked':
+        data = b''
+        while True:
+            size = int(await reader.readline(), 16)
+            chunk = await reader.readexactly(size + 2)
+            if size == 0:
+                break
+            data += chunk[:-2]
+        return status, response_headers, data.decode('utf-8')
+    data = await reader.readexactly(int(response_headers['content-length']))
+    return status, response_headers, json.loads(data)
+
+
+async def _raw_request(host, port, data, eof=False):
+    """Отправить произвольные байты в новом соединении, вернуть код ответа"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(data)
+        if eof:
+            writer.write_eof()
+        await writer.drain()
+        line = await reader.readline()
+        return int(line.split()[1]) if line else None
+    finally:
+        writer.close()
+
+
+class TestOperations:
+    """Тестирование исполнителя операций"""
+
+    def setup_method(self):
+        """Настройка теста"""
+        self.library = Library("Тестовая библиотека")
+        self.library.verbose = False
+
+    def test_execute(self):
+        """Тест выполнения операций и ошибок"""
+        assert execute(self.library, {'op': 'borrow', 'isbn': WAR_AND_PEACE}) == {'ok': True, 'result': True}
+        assert execute(self.library, {'op': 'status'})['result']['borrowed'] == 1
+        assert execute(self.library, {'op': 'nope'})['ok'] == False
+        assert execute(self.library, {'op': 'get', 'isbn': 'нет'})['ok'] == False
+        assert execute(self.library, {'op': 'borrow'})['ok'] == False
+        assert execute(self.library, {'op': 'add', 'book': 'x'})['ok'] == False
+        assert execute(self.library, {'op': 'bulk', 'books': [[]]})['ok'] == False
+
+    def test_batch_continues_after_error(self):
+        """Тест пакета операций с ошибкой в середине"""
+        results = execute_many(self.library, [
+            {'op': 'borrow', 'isbn': WAR_AND_PEACE},
+            {'op': 'get'},
+            {'op': 'search', 'author': 'Лев Толстой'},
+        ])
+        assert [result['ok'] for result in results] == [True, False, True]
+        assert results[2]['result'][0]['is_borrowed'] == True
+
+
+class TestLibraryServer:
+    """Тестирование сервера через сокет"""
+
+    def setup_method(self):
+        """Настройка теста"""
+        self.library = Library("Тестовая библиотека")
+        self.library.verbose = False
+        self.server = LibraryServer(self.library, port=0, stream_chunk=2)
+
+    def run(self, scenario):
+        async def main():
+            await self.server.start()
+            reader, writer = await asyncio.open_connection(self.server.host, self.server.port)
+            try:
+                return await scenario(reader, writer)
+            finally:
+                writer.close()
+                await self.server.close()
+        return asyncio.run(main())
+
+    def test_keep_alive(self):
+        """Тест нескольких запросов в одном соединении"""
+        async def scenario(reader, writer):
+            first = await _request(reader, writer, 'POST', '/borrow', {'isbn': WAR_AND_PEACE})
+            second = await _request(reader, writer, 'GET', '/status')
+            third = await _request(reader, writer, 'GET', f'/books/{WAR_AND_PEACE}')
+            return first, second, third
+
+        first, second, third = self.run(scenario)
+        assert first[0] == 200 and first[1]['connection'] == 'keep-alive'
+        assert second[2]['result']['borrowed'] == 1
+        assert third[2]['result']['is_borrowed'] == True
+        assert self.server.connections == 1 and self.server.requests == 3
+
+    def test_search_and_stream(self):
+        """Тест поиска с обычным и потоковым ответом"""
+        async def scenario(reader, writer):
+            plain = await _request(reader, writer, 'GET', '/search?genre=%D1%84%D1%8D%D0%BD%D1%82%D0%B5%D0%B7%D0%B8')
+            stream = await _request(reader, writer, 'GET', '/search', headers=("Accept: application/x-ndjson",))
+            return plain, stream
+
+        plain, stream = self.run(scenario)
+        assert len(plain[2]['books']) == 2
+        lines = stream[2].splitlines()
+        assert len(lines) == 7
+        assert json.loads(lines[0])['isbn'] == WAR_AND_PEACE
+
+    def test_batch_and_bulk(self):
+        """Тест пакетного и массового запросов"""
+        book = {'type': 'RegularBook', 'title': 'Новая', 'author': 'Автор', 'year': 2020,
+                'genre': 'роман', 'isbn': '999'}
+
+        async def scenario(reader, writer):
+            bulk = await _request(reader, writer, 'POST', '/bulk', {'books': [book, book]})
+            batch = await _request(reader, writer, 'POST', '/batch', {'ops': [
+                {'op': 'borrow', 'isbn': '999'}, {'op': 'return', 'isbn': '999'}]})
+            return bulk, batch
+
+        bulk, batch = self.run(scenario)
+        assert bulk[2] == {'ok': True, 'result': 1}
+        assert [result['result'] for result in batch[2]['results']] == [True, True]
+
+    def test_errors_and_close(self):
+        """Тест кодов ошибок и закрытия соединения"""
+        async def scenario(reader, writer):
+            missing = await _request(reader, writer, 'GET', '/nope')
+            wrong_method = await _request(reader, writer, 'GET', '/borrow')
+            closing = await _request(reader, writer, 'GET', '/status', headers=("Connection: close",))
+            return missing, wrong_method, closing, await reader.read()
+
+        missing, wrong_method, closing, rest = self.run(scenario)
+        assert missing[0] == 404 and wrong_method[0] == 405
+        assert closing[1]['connection'] == 'close' and rest == b''
+
+    def test_malformed_requests(self):
+        """Тест ответа 400 на некорректный Content-Length, длинную строку и обрезанное тело"""
+        async def scenario(reader, writer):
+            host, port = self.server.host, self.server.port
+            head = b"POST /borrow HTTP/1.1\r\nHost: test\r\n"
+            return [
+                await _raw_request(host, port, head + b"Content-Length: abc\r\n\r\n"),
+                await _raw_request(host, port, head + b"Content-Length: -5\r\n\r\n"),
+                await _raw_request(host, port, head + b"X-Long: " + b"a" * 100_000 + b"\r\n\r\n"),
+                await _raw_request(host, port, head + b"Content-Length: 10\r\n\r\n{}", eof=True),
+                await _request(reader, writer, 'GET', '/status'),
+            ]
+
+        *statuses, status = self.run(scenario)
+        assert statuses == [400, 400, 400, 400]
+        assert status[0] == 200
+
+    def test_bad_book_and_internal_error(self):
+        """Тест книги не в виде объекта и ответа 500 без обрыва соединения"""
+        def broken():
+            raise RuntimeError("сбой хранилища")
+
+        async def scenario(reader, writer):
+            add = await _request(reader, writer, 'POST', '/add', {'book': 'x'})
+            batch = await _request(reader, writer, 'POST', '/batch', {'ops': [
+                {'op': 'add', 'book': []}, {'op': 'status'}]})
+            self.library.storage.count_available = broken
+            failed = await _request(reader, writer, 'GET', '/status')
+            del self.library.storage.count_available
+            after = await _request(reader, writer, 'GET', '/status')
+            return add, batch, failed, after
+
+        add, batch, failed, after = self.run(scenario)
+        assert add[0] == 400 and add[2]['ok'] == False
+        assert [result['ok'] for result in batch[2]['results']] == [False, True]
+        assert failed[0] == 500 and 'сбой хранилища' in failed[2]['error']
+        assert after[0] == 200
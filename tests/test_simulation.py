@@ -2,7 +2,15 @@
 Тесты для симуляции
 """
 import random
-from src.library_sim.simulation import run_simulation
+
+import pytest
+
+from src.library_sim.events import (AliasTable, EventHandler, FunctionEvent, register_event,
+                                    simulation_event, unregister_event)
+from src.library_sim.library import Library
+from src.library_sim.simulation import (SEARCH_EVENTS, count_operations, replay_simulation,
+                                        run_simulation)
+from src.library_sim.trace import SimulationTrace
 
 
 class TestSimulation:
@@ -38,4 +46,110 @@ class TestSimulation:
         random.seed(42)
         numbers2 = [random.randint(1, 100) for _ in range(5)]
         
-        assert numbers1 == numbers2
\ No newline at end of file
+        assert numbers1 == numbers2
+
+
+class TestSimulationTrace:
+    """Тестирование записи и воспроизведения симуляции"""
+
+    def test_seed_reproducible(self, capsys):
+        """Тест одинаковой записи и вывода при одинаковом seed"""
+        first = run_simulation(steps=40, seed=7)
+        first_output = capsys.readouterr().out
+        second = run_simulation(steps=40, seed=7)
+        assert first == second and len(first) == 40
+        assert capsys.readouterr().out == first_output
+        assert run_simulation(steps=40, seed=8) != first
+
+    def test_global_random_untouched(self):
+        """Тест, что симуляция не меняет глобальный random"""
+        random.seed(42)
+        state = random.getstate()
+        run_simulation(steps=20, seed=1)
+        assert random.getstate() == state
+
+    def test_replay_identical(self, capsys):
+        """Тест воспроизведения записи с тем же результатом"""
+        library = Library("Симуляционная библиотека")
+        trace = run_simulation(steps=60, seed=3, library=library)
+        recorded_output = capsys.readouterr().out
+
+        replayed = replay_simulation(SimulationTrace.from_bytes(trace.to_bytes()))
+        replay_output = capsys.readouterr().out
+        assert [book.to_dict() for book in replayed.books] == [book.to_dict() for book in library.books]
+        # Вывод совпадает, кроме строки заголовка
+        assert replay_output.split("\n", 2)[2] == recorded_output.split("\n", 2)[2]
+
+    def test_trace_file(self, tmp_path):
+        """Тест сохранения записи в файл"""
+        trace = run_simulation(steps=25, seed=-5)
+        path = str(tmp_path / "run.trace")
+        trace.save(path)
+        loaded = SimulationTrace.load(path)
+        assert loaded == trace and loaded.seed == -5
+        assert len(trace.to_bytes()) < 25 * 40
+
+
+class TestEventRegistry:
+    """Тестирование реестра событий и выбора с весами"""
+
+    def teardown_method(self):
+        """Удаление пользовательских событий"""
+        unregister_event("overdue_sweep")
+
+    def test_alias_table(self):
+        """Тест частот выбора, пропорциональных весам"""
+        table = AliasTable([1, 0, 3, 6])
+        rng = random.Random(5)
+        counts = [0] * 4
+        for _ in range(100000):
+            counts[table.sample(rng)] += 1
+        assert counts[1] == 0
+        for index, weight in ((0, 0.1), (2, 0.3), (3, 0.6)):
+            assert abs(counts[index] / 100000 - weight) < 0.01
+        with pytest.raises(ValueError):
+            AliasTable([0, 0])
+
+    def test_custom_event(self, capsys):
+        """Тест пользовательского события без изменения основного цикла"""
+        @simulation_event("overdue_sweep", choose=lambda state, library: (state.rng.randrange(10),),
+                          weight=5)
+        def overdue_sweep(library, days):
+            print(f"Просрочено больше {days} дней: 0")
+
+        library = Library("Симуляционная библиотека")
+        trace = run_simulation(steps=40, seed=2, library=library)
+        assert sum(1 for event, _ in trace if event == "overdue_sweep") > 10
+        with pytest.raises(ValueError):
+            register_event(FunctionEvent("overdue_sweep", overdue_sweep))
+
+        recorded = capsys.readouterr().out
+        replay_simulation(trace)
+        assert capsys.readouterr().out.split("\n", 2)[2] == recorded.split("\n", 2)[2]
+        unregister_event("overdue_sweep")
+        with pytest.raises(ValueError):
+            replay_simulation(trace)
+
+    def test_handler_requires_apply(self):
+        """Тест, что обработчик без apply нельзя создать"""
+        class Incomplete(EventHandler):
+            name = "incomplete"
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+    def test_events_and_weights(self):
+        """Тест выбора набора событий и весов"""
+        trace = run_simulation(steps=50, seed=1, events=["search_by_author", "search_by_year"],
+                               weights={"search_by_year": 0})
+        assert {event for event, _ in trace} == {"search_by_author"}
+
+    def test_search_batch(self, capsys):
+        """Тест пакетного поиска с подсчетом операций"""
+        trace = run_simulation(steps=30, seed=4, events=SEARCH_EVENTS, profile=True,
+                               batch=dict.fromkeys(SEARCH_EVENTS, 25))
+        assert all(len(args) == 25 for _, args in trace)
+        assert count_operations(trace) == 750
+        output = capsys.readouterr().out
+        assert "Пакет из 25 поисков" in output
+        assert "Шагов: 30, операций: 750" in output
@@ -0,0 +1,65 @@
+"""
+Тесты для быстрого запуска: ленивый импорт и начальный каталог
+"""
+import subprocess
+import sys
+
+from src.library_sim.book import RegularBook
+from src.library_sim.library import Library
+from src.library_sim.seed import SEED_CATALOG, clone_seed_books
+
+
+class TestLazyImport:
+    """Тестирование ленивой загрузки подмодулей"""
+
+    def test_package_import_is_lazy(self):
+        """Тест, что импорт Library не загружает симуляцию, SQLite, json и random"""
+        code = (
+            "import sys; from src.library_sim import Library; Library(); "
+            "print('src.library_sim.simulation' in sys.modules, 'sqlite3' in sys.modules, "
+            "'json' in sys.modules, 'random' in sys.modules)"
+        )
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                                text=True, check=True).stdout
+        assert output.strip() == "False False False False"
+
+    def test_exports(self):
+        """Тест доступа к экспортируемым именам"""
+        import src.library_sim as package
+        assert package.run_simulation.__name__ == "run_simulation"
+        assert "Library" in dir(package)
+
+
+class TestSeedCatalog:
+    """Тестирование предсобранного каталога"""
+
+    def test_clones_are_independent(self):
+        """Тест независимости копий начальных книг"""
+        first, second = clone_seed_books(), clone_seed_books()
+        assert len(first) == len(SEED_CATALOG)
+        first[0].borrow()
+        assert second[0].is_available == True
+        assert first[0] is not second[0]
+
+    def test_empty_library(self):
+        """Тест создания пустой библиотеки"""
+        library = Library("Пустая", populate=False)
+        assert len(library.books) == 0
+        assert library.add_book(RegularBook("Книга", "Автор", 2020, "роман", "1")) == True
+
+    def test_seeded_library(self):
+        """Тест начального набора книг"""
+        library = Library("Тестовая библиотека")
+        assert len(library.books) == len(SEED_CATALOG)
+        assert library.search_books(reference_type="словарь")[0].title == "Толковый словарь"
+
+    def test_catalog_roundtrip(self, tmp_path):
+        """Тест сохранения и загрузки каталога"""
+        library = Library("Тестовая библиотека")
+        library.borrow_book("978-5-389-07435-1")
+        path = str(tmp_path / "catalog.jsonl")
+        assert library.save_catalog(path) == len(SEED_CATALOG)
+
+        loaded = Library.from_catalog(path, name="Копия")
+        assert [book.to_dict() for book in loaded.books] == [book.to_dict() for book in library.books]
+        assert loaded.get_book("978-5-389-07435-1").is_available == False
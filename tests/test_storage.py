@@ -0,0 +1,118 @@
+"""
+Тесты для хранилищ каталога
+"""
+import threading
+
+from src.library_sim.book import RegularBook, ReferenceBook, FictionBook
+from src.library_sim.library import Library
+from src.library_sim.storage import MemoryStorage, SQLiteStorage
+
+
+class TestSQLiteStorage:
+    """Тестирование SQLiteStorage"""
+
+    def setup_method(self):
+        """Настройка теста"""
+        self.book1 = RegularBook("Война и мир", "Лев Толстой", 1869, "роман", "111")
+        self.book2 = ReferenceBook("Толковый словарь", "Владимир Даль", 1880, "словарь", "222", "словарь")
+        self.book3 = FictionBook("Анна Каренина", "Лев Толстой", 1877, "роман", "333", "драма")
+
+    def test_add_get(self, tmp_path):
+        """Тест добавления и чтения книг с сохранением типа"""
+        storage = SQLiteStorage(str(tmp_path / "catalog.db"))
+        storage.add_many([self.book1, self.book2, self.book3])
+
+        assert len(storage) == 3
+        assert "222" in storage
+        book = storage.get("333")
+        assert isinstance(book, FictionBook)
+        assert book.literary_genre == "драма"
+        assert storage.get("999") is None
+        assert [b.isbn for b in storage] == ["111", "222", "333"]
+
+    def test_wal_mode(self, tmp_path):
+        """Тест режима журнала WAL"""
+        storage = SQLiteStorage(str(tmp_path / "catalog.db"))
+        mode = storage._connection().execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+
+    def test_search(self, tmp_path):
+        """Тест поиска с условиями в SQL"""
+        storage = SQLiteStorage(str(tmp_path / "catalog.db"))
+        storage.add_many([self.book1, self.book2, self.book3])
+
+        assert len(storage.search(author="Лев Толстой")) == 2
+        assert len(storage.search(author="Лев Толстой", year=1877)) == 1
+        assert storage.search(author="Неизвестный", year=1869) == []
+        assert [b.isbn for b in storage.search_by_keyword("каренина")] == ["333"]
+        assert len(storage.search_by_keyword("18")) == 3
+
+    def test_update_and_remove(self, tmp_path):
+        """Тест сохранения выдачи и удаления"""
+        storage = SQLiteStorage(str(tmp_path / "catalog.db"))
+        storage.add_many([self.book1, self.book3])
+
+        book = storage.get("111")
+        book.borrow()
+        storage.update(book)
+        assert storage.get("111").is_available == False
+        assert storage.count_available() == 1
+
+        assert storage.remove(book) == True
+        assert storage.remove(book) == False
+        assert len(storage) == 1
+
+    def test_connection_per_thread(self, tmp_path):
+        """Тест отдельных соединений для потоков"""
+        storage = SQLiteStorage(str(tmp_path / "catalog.db"))
+        storage.add(self.book1)
+        main_conn = storage._connection()
+        found = []
+
+        def worker():
+            found.append((storage._connection() is not main_conn, storage.get("111").title))
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        assert found == [(True, "Война и мир")]
+        storage.close()
+
+
+class TestLibraryStorage:
+    """Тестирование Library с разными хранилищами"""
+
+    def test_memory_storage_default(self):
+        """Тест хранилища по умолчанию"""
+        library = Library("Тестовая библиотека")
+        assert isinstance(library.storage, MemoryStorage)
+        assert library.books is library.storage.books
+        assert library.indexes is library.storage.indexes
+
+    def test_sqlite_library_persists(self, tmp_path):
+        """Тест сохранения состояния библиотеки между запусками"""
+        path = str(tmp_path / "catalog.db")
+        library = Library("Тестовая библиотека", storage=SQLiteStorage(path))
+        initial = len(library.books)
+        assert initial > 0
+        assert library.borrow_book("978-5-389-07435-1") == True
+        library.add_book(RegularBook("Новая книга", "Автор", 2023, "роман", "999"))
+        library.storage.close()
+
+        reopened = Library("Тестовая библиотека", storage=SQLiteStorage(path))
+        assert len(reopened.books) == initial + 1
+        assert reopened.get_book("978-5-389-07435-1").is_available == False
+        assert reopened.borrow_book("978-5-389-07435-1") == False
+        assert len(reopened.search_books(genre="роман")) == 3
+        assert "999" in reopened.indexes
+
+    def test_add_books_skips_duplicates(self):
+        """Тест массового добавления"""
+        library = Library("Тестовая библиотека")
+        books = [
+            RegularBook("Книга 1", "Автор", 2020, "роман", "1"),
+            RegularBook("Книга 1", "Автор", 2020, "роман", "1"),
+            RegularBook("Война и мир", "Лев Толстой", 1869, "роман", "978-5-389-07435-1"),
+        ]
+        assert library.add_books(books) == 1
+        assert library.get_book("1") is not None
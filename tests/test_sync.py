@@ -0,0 +1,160 @@
+"""
+Тесты для сравнения и синхронизации каталогов
+"""
+import time
+
+import pytest
+
+from src.library_sim.book import RegularBook, FictionBook
+from src.library_sim.library import Library
+from src.library_sim.storage import MemoryStorage, SQLiteStorage
+from src.library_sim.sync import CatalogDelta, CatalogDigest, apply_delta, compute_delta
+from src.library_sim.synthetic import generate_books, make_isbn
+
+WAR_AND_PEACE = "978-5-389-07435-1"
+CRIME = "978-5-17-090665-5"
+MASTER = "978-5-17-067580-4"
+
+
+def state(library):
+    return sorted((book.to_dict()['isbn'], book.is_available, book.title) for book in library.storage)
+
+
+class TestSync:
+    """Тестирование сравнения и синхронизации каталогов"""
+
+    def setup_method(self):
+        """Настройка теста"""
+        self.main = Library("Главная")
+        self.branch = Library("Филиал")
+        self.main.verbose = self.branch.verbose = False
+
+    def test_equal_catalogs(self):
+        """Тест совпадения хэшей одинаковых каталогов"""
+        assert self.main.storage.digest().root == self.branch.storage.digest().root
+        delta = self.branch.diff(self.main)
+        assert not delta and delta.buckets == 0
+
+    def test_sync_changes(self):
+        """Тест переноса добавления, удаления, выдачи и замены книги"""
+        self.main.add_book(RegularBook("Новая", "Автор", 2021, "роман", "999"), silent=True)
+        self.main.remove_book(CRIME)
+        self.main.borrow_book(WAR_AND_PEACE)
+        self.branch.borrow_book(MASTER)
+        self.main.storage.remove(self.main.get_book("978-5-17-080115-9"))
+        self.main.storage.add(FictionBook("1984 (новое издание)", "Оруэлл", 2022, "антиутопия",
+                                          "978-5-17-080115-9"))
+
+        delta = self.branch.diff(self.main)
+        assert sorted(book['isbn'] for book in delta.upserts) == ["978-5-17-080115-9", "999"]
+        assert delta.removals == [CRIME]
+        assert sorted(delta.states) == [(MASTER, False), (WAR_AND_PEACE, True)]
+
+        self.branch.sync_from(self.main)
+        assert state(self.branch) == state(self.main)
+        assert self.branch.storage.digest().root == self.main.storage.digest().root
+        assert not self.branch.diff(self.main)
+        # Поиск по индексам видит перенесенные изменения
+        assert self.branch.search_books(available=False)[0].isbn == WAR_AND_PEACE
+
+    def test_digest_follows_feed(self):
+        """Тест совпадения поддерживаемого дерева с построенным заново"""
+        digest = self.main.storage.digest()
+        self.main.borrow_book(WAR_AND_PEACE)
+        self.main.remove_book(CRIME)
+        self.main.add_book(RegularBook("Новая", "Автор", 2021, "роман", "999"), silent=True)
+        fresh = CatalogDigest.of_books(self.main.storage)
+        assert digest.levels == fresh.levels
+        self.main.return_book(WAR_AND_PEACE)
+        assert digest.root == CatalogDigest.of_books(self.main.storage).root
+
+    def test_only_changed_buckets(self):
+        """Тест сравнения только различающихся корзин"""
+        for library in (self.main, self.branch):
+            library.add_books(RegularBook(f"Книга {i}", "Автор", 2000, "роман", f"isbn-{i}")
+                              for i in range(2000))
+        self.main.borrow_book("isbn-7")
+        delta = self.branch.diff(self.main)
+        assert delta.buckets == 1
+        assert delta.states == [("isbn-7", True)]
+
+    def test_fork_digest(self):
+        """Тест дерева ответвления без обхода базы"""
+        fork = self.main.fork()
+        fork.borrow_book(WAR_AND_PEACE)
+        fork.remove_book(CRIME)
+        fork.add_book(RegularBook("Новая", "Автор", 2021, "роман", "999"), silent=True)
+        assert fork.storage.digest().levels == CatalogDigest.of_books(fork.storage).levels
+        self.branch.sync_from(fork)
+        assert state(self.branch) == state(fork)
+        self.branch.sync_from(self.main)
+        assert state(self.branch) == state(self.main)
+
+    def test_sqlite(self, tmp_path):
+        """Тест синхронизации каталога в SQLite"""
+        library = Library("SQLite", storage=SQLiteStorage(str(tmp_path / "catalog.db")))
+        library.verbose = False
+        self.main.borrow_book(CRIME)
+        self.main.remove_book(MASTER)
+        library.sync_from(self.main)
+        assert state(library) == state(self.main)
+
+    def test_delta_roundtrip(self, tmp_path):
+        """Тест сохранения и применения дельты"""
+        self.main.borrow_book(CRIME)
+        self.main.add_book(RegularBook("Новая", "Автор", 2021, "роман", "999"), silent=True)
+        path = str(tmp_path / "delta.json")
+        self.branch.diff(self.main).save(path)
+        delta = CatalogDelta.load(path)
+        assert len(delta) == 2
+
+        assert apply_delta(self.branch, delta) == 2
+        assert state(self.branch) == state(self.main)
+
+    def test_sync_closes_loans(self):
+        """Тест закрытия выдач читателям для удаленных и возвращенных книг"""
+        patron = self.branch.patrons.add_patron()
+        self.branch.borrow_book(WAR_AND_PEACE, patron=patron)
+        self.branch.sync_from(self.main)
+        assert self.branch.patrons.borrower_of(WAR_AND_PEACE) is None
+
+    def test_correction_keeps_loan(self):
+        """Тест, что исправление описания выданной книги не закрывает выдачу читателю"""
+        patron = self.branch.patrons.add_patron()
+        self.branch.borrow_book(WAR_AND_PEACE, patron=patron)
+        book = self.main.get_book(WAR_AND_PEACE)
+        self.main.storage.remove(book)
+        corrected = book.copy()
+        corrected.title = "Война и мир (исправленное издание)"
+        corrected.borrow()
+        self.main.storage.add(corrected)
+
+        self.branch.sync_from(self.main)
+        assert self.branch.get_book(WAR_AND_PEACE).title == corrected.title
+        assert self.branch.patrons.borrower_of(WAR_AND_PEACE) == patron
+
+    def test_apply_cost_follows_delta(self):
+        """Тест, что время применения дельты зависит от ее размера, а не от каталога"""
+        def apply_seconds(size):
+            library = Library("Каталог", populate=False)
+            library.verbose = False
+            library.add_books(generate_books(size))
+            apply_delta(library, CatalogDelta(removals=[make_isbn(0)]))  # Первое удаление строит таблицу позиций
+            replaced = [book.to_dict() for book in generate_books(100, start=size - 200, seed=1)]
+            delta = CatalogDelta(upserts=replaced, removals=[make_isbn(number) for number in range(size - 100, size)])
+            started = time.perf_counter()
+            assert apply_delta(library, delta) == 200
+            seconds = time.perf_counter() - started
+            assert len(library.storage) == size - 101
+            assert library.verify() == []
+            return seconds
+
+        small, large = apply_seconds(2_000), apply_seconds(40_000)
+        assert large < small * 5
+
+    def test_bits_mismatch(self):
+        """Тест сравнения деревьев с разным числом корзин"""
+        with pytest.raises(ValueError):
+            compute_delta(CatalogDigest(MemoryStorage().indexes, bits=8), CatalogDigest(bits=12))
+        with pytest.raises(ValueError):
+            CatalogDigest(bits=10)
@@ -0,0 +1,78 @@
+"""
+Тесты для многоуровневого хранилища
+"""
+from src.library_sim.library import Library
+from src.library_sim.query import Q
+from src.library_sim.synthetic import generate_books
+from src.library_sim.tiered import TieredStorage
+
+WAR_AND_PEACE = "978-5-389-07435-1"
+POTTER = "978-5-389-07429-0"
+
+
+class TestTieredStorage:
+    """Тестирование TieredStorage"""
+
+    def make_library(self, tmp_path, **options):
+        storage = TieredStorage(str(tmp_path / "cold.db"), **options)
+        library = Library("Тестовая библиотека", storage=storage)
+        library.verbose = False
+        return library, storage
+
+    def test_hot_tier_bounded(self, tmp_path):
+        """Тест ограничения горячего уровня и статистики попаданий"""
+        library, storage = self.make_library(tmp_path, hot_capacity=3)
+        library.add_books(generate_books(200, seed=1))
+        assert len(storage) == 207
+        assert storage.stats()['hot'] == 0
+
+        library.get_book(WAR_AND_PEACE)
+        library.get_book(WAR_AND_PEACE)
+        assert (storage.hits, storage.misses) == (1, 1)
+        for book in library.search_books(genre="роман"):
+            pass
+        assert storage.stats()['hot'] <= 3
+        assert storage.evictions > 0
+
+    def test_state_survives_eviction(self, tmp_path):
+        """Тест сохранения выдачи после вытеснения книги"""
+        library, storage = self.make_library(tmp_path, hot_capacity=1)
+        assert library.borrow_book(WAR_AND_PEACE) == True
+        library.get_book(POTTER)  # Вытесняет "Войну и мир"
+        book = library.get_book(WAR_AND_PEACE)
+        assert book.is_available == False
+        assert library.borrow_book(WAR_AND_PEACE) == False
+        assert storage.count_available() == 6
+
+    def test_search_query_and_remove(self, tmp_path):
+        """Тест поиска по индексам слотов и удаления"""
+        library, storage = self.make_library(tmp_path, hot_capacity=2)
+        assert [book.isbn for book in library.search_books(author="Лев Толстой")] == [WAR_AND_PEACE]
+        assert len(library.find(Q(type="FictionBook") & ~Q(genre="фэнтези"))) == 1
+        assert len(library.search_books(literary_genre="проза")) == 3
+        assert len(library.search_by_keyword("гарри")) == 1
+        assert library.remove_book(POTTER) == True
+        assert len(library.search_books(genre="фэнтези")) == 1
+        assert [book.isbn for book in library.books][-1] != POTTER
+        assert library.books[0].isbn == WAR_AND_PEACE
+
+    def test_reopen_rebuilds_indexes(self, tmp_path):
+        """Тест открытия сохраненного холодного хранилища"""
+        library, storage = self.make_library(tmp_path)
+        library.borrow_book(WAR_AND_PEACE)
+        storage.close()
+        reopened, _ = self.make_library(tmp_path)
+        assert len(reopened.storage) == 7
+        assert reopened.storage.count_available() == 6
+        assert len(reopened.search_books(year=1869)) == 1
+
+    def test_rss_cap_shrinks_hot_tier(self, tmp_path):
+        """Тест сокращения горячего уровня при превышении памяти"""
+        library, storage = self.make_library(tmp_path, hot_capacity=100, max_rss_mb=0.001,
+                                             rss_check_every=1, min_hot_capacity=2)
+        library.add_books(generate_books(50, seed=2))
+        for _ in range(5):
+            library.search_books(genre="роман")
+        stats = storage.stats()
+        assert stats['rss_shrinks'] > 0
+        assert stats['hot'] <= stats['hot_capacity'] == 2
@@ -0,0 +1,135 @@
+"""
+Тесты для пакетных операций "все или ничего"
+"""
+import pytest
+
+from src.library_sim.library import Library
+from src.library_sim.ops import execute
+from src.library_sim.storage import SQLiteStorage
+from src.library_sim.transactions import TransactionError
+
+WAR_AND_PEACE = "978-5-389-07435-1"
+CRIME = "978-5-17-090665-5"
+DICTIONARY = "978-5-17-090689-1"
+MASTER = "978-5-17-067580-4"
+ORWELL = "978-5-17-080115-9"
+POTTER = "978-5-389-07429-0"
+
+
+class TestTransactions:
+    """Тестирование транзакций выдачи и возврата"""
+
+    def setup_method(self):
+        """Настройка теста"""
+        self.library = Library("Тестовая библиотека")
+        self.library.verbose = False
+
+    def available(self):
+        return {book.isbn for book in self.library.storage if book.is_available}
+
+    def test_borrow_many(self):
+        """Тест пакетной выдачи с одной группой записей в журнал"""
+        assert self.library.borrow_many([WAR_AND_PEACE, CRIME, MASTER]) == True
+        assert self.available() == {DICTIONARY, "978-5-17-080185-2", ORWELL, POTTER}
+        assert len(self.library.search_books(available=False)) == 3
+        assert len(self.library.history) == 3
+        assert {event for _, event, _ in self.library.history.iter_events()} == {'borrow'}
+        assert len({timestamp for _, _, timestamp in self.library.history.iter_events()}) == 1
+
+        assert self.library.return_many([CRIME, MASTER]) == True
+        assert self.library.storage.count_available() == 6
+
+    def test_all_or_nothing(self):
+        """Тест отмены всей выдачи при одном отказе"""
+        before = self.available()
+        assert self.library.borrow_many([WAR_AND_PEACE, CRIME, DICTIONARY]) == False  # Словарь
+        assert self.library.borrow_many([WAR_AND_PEACE, "нет-такого"]) == False
+        assert self.library.borrow_many([WAR_AND_PEACE, WAR_AND_PEACE]) == False
+        assert self.available() == before
+        assert len(self.library.history) == 0
+        assert self.library.return_many([WAR_AND_PEACE]) == False
+
+    def test_patron_limits_in_batch(self):
+        """Тест учета лимитов читателя по всей группе"""
+        student = self.library.patrons.add_patron(category='student')
+        # 14 + 14 + 21 дней превышает лимит студента 42
+        assert self.library.borrow_many([WAR_AND_PEACE, CRIME, MASTER], patron=student) == False
+        assert self.library.patrons.loans_of(student) == []
+        assert self.library.borrow_many([WAR_AND_PEACE, CRIME], patron=student) == True
+        assert self.library.patrons.borrower_of(CRIME) == student
+        assert self.library.return_many([WAR_AND_PEACE, CRIME]) == True
+        assert self.library.patrons.active_loans() == 0
+
+    def test_exception_in_block(self):
+        """Тест отмены транзакции при исключении внутри блока"""
+        with pytest.raises(RuntimeError):
+            with self.library.transaction() as tx:
+                tx.borrow(WAR_AND_PEACE)
+                raise RuntimeError("сбой кассы")
+        assert self.library.get_book(WAR_AND_PEACE).is_available
+
+        with pytest.raises(TransactionError):
+            with self.library.transaction() as tx:
+                tx.borrow(MASTER)
+                tx.return_book(POTTER)
+        assert self.library.get_book(MASTER).is_available
+
+    def test_rollback_on_storage_failure(self):
+        """Тест восстановления состояния книг при ошибке хранилища"""
+        storage = self.library.storage
+        original = storage.update_many
+        calls = []
+
+        def failing(books):
+            calls.append(list(books))
+            if len(calls) == 1:
+                raise OSError("диск недоступен")
+            original(calls[-1])
+
+        storage.update_many = failing
+        with pytest.raises(OSError):
+            self.library.borrow_many([WAR_AND_PEACE, CRIME])
+        assert self.library.get_book(WAR_AND_PEACE).is_available
+        assert self.library.get_book(CRIME).is_available
+
+    def test_state_rechecked_at_commit(self):
+        """Тест отмены транзакции, если книгу выдали в обход нее до фиксации"""
+        with pytest.raises(TransactionError):
+            with self.library.transaction() as tx:
+                tx.borrow(WAR_AND_PEACE)
+                tx.borrow(CRIME)
+                self.library.borrow_book(CRIME)
+        assert self.library.get_book(WAR_AND_PEACE).is_available
+        assert len(self.library.history) == 1
+
+    def test_rollback_on_checkout_failure(self):
+        """Тест отмены выдач и записей читателей, если выдача читателю не записалась"""
+        reader = self.library.patrons.add_patron()
+        other = self.library.patrons.add_patron()
+        with pytest.raises(TransactionError):
+            with self.library.transaction() as tx:
+                tx.borrow(WAR_AND_PEACE, patron=reader)
+                tx.borrow(CRIME, patron=reader)
+                self.library.patrons.checkout(other, self.library.get_book(CRIME), 0)
+        assert self.library.get_book(WAR_AND_PEACE).is_available
+        assert self.library.get_book(CRIME).is_available
+        assert self.library.patrons.loans_of(reader) == []
+        assert len(self.library.history) == 0
+
+    def test_sqlite_storage(self, tmp_path):
+        """Тест транзакции в хранилище SQLite"""
+        library = Library("Тестовая библиотека", storage=SQLiteStorage(str(tmp_path / "catalog.db")))
+        library.verbose = False
+        assert library.borrow_many([WAR_AND_PEACE, POTTER]) == True
+        assert library.storage.count_available() == 5
+        assert library.return_many([POTTER]) == True
+        assert not library.get_book(WAR_AND_PEACE).is_available
+        library.storage.close()
+
+    def test_operations(self):
+        """Тест операций borrow_many и return_many"""
+        result = execute(self.library, {'op': 'borrow_many', 'isbns': [WAR_AND_PEACE, ORWELL]})
+        assert result == {'ok': True, 'result': {'borrowed': [WAR_AND_PEACE, ORWELL], 'returned': []}}
+        result = execute(self.library, {'op': 'return_many', 'isbns': [WAR_AND_PEACE, CRIME]})
+        assert result['ok'] == False and "не была выдана" in result['error']
+        assert not self.library.get_book(WAR_AND_PEACE).is_available
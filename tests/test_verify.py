@@ -0,0 +1,149 @@
+"""
+Тесты для проверки инвариантов и дифференциальной проверки
+"""
+import json
+
+from src.library_sim.cli import main
+from src.library_sim.differential import Canary, ReferenceModel, run_differential
+from src.library_sim.library import Library
+from src.library_sim.ops import execute
+from src.library_sim.query import Q
+from src.library_sim.storage import MemoryStorage
+
+WAR_AND_PEACE = "978-5-389-07435-1"
+
+
+class TestVerify:
+    """Тестирование Library.verify"""
+
+    def setup_method(self):
+        """Настройка теста"""
+        self.library = Library("Тестовая библиотека")
+        self.library.verbose = False
+
+    def test_consistent(self):
+        """Тест согласованной библиотеки в обоих режимах"""
+        patron = self.library.patrons.add_patron("Анна")
+        self.library.borrow_book(WAR_AND_PEACE, patron=patron)
+        self.library.remove_book("978-5-17-067580-4")
+        assert self.library.verify() == []
+        assert self.library.verify(sample=20, seed=1) == []
+        assert self.library.fork().verify() == []
+        assert execute(self.library, {'op': 'verify', 'sample': 5}) == {
+            'ok': True, 'result': {'ok': True, 'problems': []}}
+
+    def test_stale_index(self):
+        """Тест изменения книги без обновления индексов"""
+        self.library.get_book(WAR_AND_PEACE).borrow()
+        problems = self.library.verify()
+        assert any("'available'" in problem for problem in problems)
+        assert any("Доступных книг" in problem for problem in problems)
+
+    def test_missing_bucket_entry(self):
+        """Тест удаления книги, которой нет в корзине индекса"""
+        indexes = self.library.indexes
+        book = self.library.get_book(WAR_AND_PEACE)
+        slot = indexes._slot_of[WAR_AND_PEACE]
+        assert indexes._registry['author'].delete(book.author, book, slot)
+        assert any(WAR_AND_PEACE in problem for problem in self.library.verify())
+
+        self.library.remove_book(WAR_AND_PEACE)
+        problems = self.library.verify()
+        assert any(problem.startswith(f"Удаление {WAR_AND_PEACE}") for problem in problems)
+
+    def test_loan_without_book(self):
+        """Тест выдачи, оставшейся у читателя после удаления книги мимо библиотеки"""
+        patron = self.library.patrons.add_patron("Борис")
+        self.library.borrow_book(WAR_AND_PEACE, patron=patron)
+        self.library.storage.remove(self.library.get_book(WAR_AND_PEACE))
+        assert any("отсутствует в каталоге" in problem for problem in self.library.verify())
+
+
+class TestDifferential:
+    """Тестирование сравнения с эталонной моделью"""
+
+    def test_reference_model(self):
+        """Тест эталонной модели на начальном наборе книг"""
+        library = Library()
+        model = ReferenceModel(library.storage)
+        assert model.borrow_many([WAR_AND_PEACE, WAR_AND_PEACE]) is False
+        assert model.borrow_book(WAR_AND_PEACE) and not model.borrow_book(WAR_AND_PEACE)
+        assert len(model.find(Q(available=False))) == 1
+        assert model.search_books(author=None) == []
+        assert library.get_book(WAR_AND_PEACE).is_available  # Модель хранит копии
+
+    def test_run(self):
+        """Тест воспроизводимого прогона без расхождений"""
+        first = run_differential(3000, seed=1, books=100, verify_every=500)
+        second = run_differential(3000, seed=1, books=100, verify_every=100, sample=20)
+        assert first.ok and second.ok
+        assert first.operations == second.operations == 3000
+
+    def test_detects_bug(self):
+        """Тест обнаружения хранилища, забывающего обновлять индексы"""
+        library = Library()
+        library.storage.update = lambda book: None
+        report = run_differential(2000, seed=1, library=library)
+        assert not report.ok
+        assert report.mismatch_count > 0 and report.mismatches
+        assert report.to_dict()['ok'] is False
+
+    def test_canary(self):
+        """Тест выборочной проверки поиска в работе"""
+        library = Library()
+        library.verbose = False
+        canary = Canary(library, rate=1.0, verify_every=1, seed=1).enable()
+        assert len(library.search_books(genre="роман")) == len(library.search_books(None, None, "роман"))
+        library.find(Q(available=True))
+        assert canary.stats() == {'checked': 3, 'mismatches': 0, 'problems': 0, 'ok': True}
+
+        library.get_book(WAR_AND_PEACE).borrow()  # Индекс доступности устарел
+        library.find(Q(available=True))
+        assert not canary.ok
+        canary.disable()
+        assert 'find' not in library.__dict__
+
+    def test_canary_sampled_check(self):
+        """Тест, что Canary находит пропуск по выборке и не обходит каталог"""
+        class NoScanStorage(MemoryStorage):
+            def __iter__(self):
+                raise AssertionError("Canary не должен обходить каталог")
+
+        library = Library(storage=NoScanStorage())
+        library.verbose = False
+        canary = Canary(library, rate=1.0, sample=50, verify_every=1, seed=1).enable()
+        library.search_books(genre="роман")
+        library.find(Q(available=True))
+        assert canary.ok and canary.checked == 2
+
+        book = library.get_book(WAR_AND_PEACE)
+        library.indexes._registry['genre'].delete(book.genre, book, library.indexes.slot_of(WAR_AND_PEACE))
+        library.search_books(genre="роман")
+        assert "пропущено из выборки" in canary.mismatches[0]
+
+    def test_canary_and_metrics_stack(self):
+        """Тест, что Canary и замеры снимаются, не трогая обертки друг друга"""
+        library = Library()
+        library.verbose = False
+        canary = Canary(library, rate=1.0, verify_every=0, seed=1).enable()
+        metrics = library.enable_metrics()
+        canary.disable()
+        library.search_books(genre="роман")
+        assert metrics.histograms['search_books'].count == 1
+        assert canary.checked == 0
+
+        library.disable_metrics()
+        metrics = library.enable_metrics()
+        canary = Canary(library, rate=1.0, verify_every=0, seed=1).enable()
+        library.disable_metrics()
+        library.search_books(genre="роман")
+        assert canary.checked == 1 and metrics.histograms == {}
+        canary.disable()
+        assert len(library.search_books(genre="роман")) == 2
+        assert canary.checked == 1 and metrics.histograms == {}
+
+    def test_cli_check(self, capsys):
+        """Тест подкоманды check"""
+        assert main(['check', '--ops', '500', '--books', '50', '--sample', '10']) == 0
+        report = json.loads(capsys.readouterr().out)
+        assert report['ok'] and report['operations'] == 500